@@ -17,17 +17,29 @@ from pathlib import Path
 from packaging import version
 from PyQt5.QtWidgets import QMessageBox, QProgressDialog, QApplication
 from PyQt5.QtCore import QThread, pyqtSignal, QTimer
-from config import APP_CONFIG
+from config import APP_CONFIG, UI_CONFIG, UPDATE_CONFIG
+from utils import STAGE_UPDATE, ProgressReporter, format_file_size, get_stage_logger
+
+update_logger = get_stage_logger(STAGE_UPDATE)
 
 class DownloadThread(QThread):
     """Thread สำหรับดาวน์โหลดไฟล์"""
     progress = pyqtSignal(int)
+    status = pyqtSignal(str)  # ข้อความความเร็วและเวลาที่เหลือ
     finished = pyqtSignal(bool, str)
     
     def __init__(self, url, output_path):
         super().__init__()
         self.url = url
         self.output_path = output_path
+        # รวมการแจ้ง progress ไม่ให้ส่งทุก chunk ขนาด 8KB
+        self.reporter = ProgressReporter(self._emit_progress, UI_CONFIG.get('progress_update_hz', 10), unit='KB')
+    
+    def _emit_progress(self, message, done, total):
+        """ส่ง progress เป็นเปอร์เซ็นต์และข้อความสถานะ"""
+        if total > 0:
+            self.progress.emit(int((done / total) * 100))
+        self.status.emit(message)
         
     def run(self):
         """ดาวน์โหลดไฟล์พร้อมแสดง progress"""
@@ -45,14 +57,65 @@ class DownloadThread(QThread):
                         file.write(chunk)
                         downloaded += len(chunk)
                         if total_size > 0:
-                            progress_value = int((downloaded / total_size) * 100)
-                            self.progress.emit(progress_value)
+                            self.reporter.report(
+                                f"ดาวน์โหลดแล้ว {format_file_size(downloaded)} / {format_file_size(total_size)}",
+                                downloaded // 1024, total_size // 1024)
                             
+            self.reporter.flush()
             self.finished.emit(True, "ดาวน์โหลดสำเร็จ")
             
         except Exception as e:
             self.finished.emit(False, f"เกิดข้อผิดพลาด: {str(e)}")
 
+class VersionManifestCache:
+    """ไฟล์ cache ของข้อมูลเวอร์ชัน (manifest) พร้อม ETag/Last-Modified สำหรับตรวจสอบซ้ำแบบ conditional request"""
+    
+    def __init__(self, path):
+        self.path = path
+        
+    def load(self):
+        """โหลด cache (dict ว่างถ้าไม่มีไฟล์หรือไฟล์เสีย)"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(entry, dict) or not isinstance(entry.get('manifest'), list):
+            return {}
+        return entry
+    
+    def save(self, entry):
+        """บันทึก cache (เขียนไฟล์ชั่วคราวก่อนแล้วค่อยแทนที่ เพื่อไม่ให้ไฟล์เสียถ้าถูกขัดจังหวะ)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(entry, file, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+class UpdateCheckThread(QThread):
+    """Thread สำหรับตรวจสอบเวอร์ชันใหม่ (GUI ไม่ต้องรอ server ข้อมูลเวอร์ชัน)"""
+    finished = pyqtSignal(object)  # ข้อมูลเวอร์ชันล่าสุด (dict) หรือ None ถ้าตรวจสอบไม่ได้
+    
+    def __init__(self, updater):
+        super().__init__()
+        self.updater = updater
+        
+    def run(self):
+        """ดึงข้อมูลเวอร์ชัน (จาก cache หรือ server) แล้วส่งเวอร์ชันล่าสุดกลับไปที่ GUI thread"""
+        try:
+            latest_version_data = self.updater._latest_version_data(self.updater.fetch_version_manifest())
+        except requests.exceptions.RequestException:
+            # ข้อผิดพลาดการเชื่อมต่อ - ไม่แจ้งเตือน
+            latest_version_data = None
+        except Exception:
+            update_logger.exception("background update check failed")
+            latest_version_data = None
+        finally:
+            AutoUpdater._update_check_in_progress = False
+        self.finished.emit(latest_version_data)
+
 class AutoUpdater:
     """คลาสสำหรับจัดการการอัปเดตอัตโนมัติ"""
     
@@ -67,6 +130,9 @@ class AutoUpdater:
         self.update_script = "update_app.bat"  # สำรอง fallback
         self.progress_dialog = None
         self.download_thread = None
+        self.update_check_thread = None
+        self.manifest_cache = VersionManifestCache(
+            UPDATE_CONFIG.get('manifest_cache_path', 'logs/version_manifest.json'))
         
     def check_internet_connection(self):
         """ตรวจสอบการเชื่อมต่ออินเทอร์เน็ต"""
@@ -146,6 +212,7 @@ class AutoUpdater:
                         self._show_error_message(f"ติดตั้งล้มเหลว: {str(e)}")
             
             self.download_thread.progress.connect(update_progress)
+            self.download_thread.status.connect(progress_dialog.setLabelText)
             self.download_thread.finished.connect(download_finished)
             self.download_thread.start()
             
@@ -166,9 +233,68 @@ class AutoUpdater:
                 return False
         return False
 
+    def fetch_version_manifest(self, max_age_hours=None, use_stale_cache=True):
+        """
+        ดึงข้อมูลเวอร์ชัน (list ของ dict) โดยใช้ cache บนดิสก์
+        
+        - ตรวจสอบครั้งล่าสุดไม่เกิน max_age_hours: ใช้ cache โดยไม่ติดต่อ network
+        - เกินกว่านั้น: ส่ง If-None-Match/If-Modified-Since ตาม cache ถ้า server ตอบ 304 ใช้ cache เดิมต่อ
+        
+        Args:
+            max_age_hours: อายุ cache ที่ใช้ได้โดยไม่ตรวจสอบใหม่ (None = min_check_hours ใน UPDATE_CONFIG,
+                0 = ตรวจสอบกับ server ทุกครั้ง)
+            use_stale_cache: ติดต่อ server ไม่ได้แต่มี cache ให้ใช้ cache เดิม (ตรวจสอบใหม่ครั้งถัดไป)
+            
+        Raises:
+            requests.exceptions.RequestException: ติดต่อ server ไม่ได้ (และไม่ใช้ cache)
+        """
+        if max_age_hours is None:
+            max_age_hours = UPDATE_CONFIG.get('min_check_hours', 24)
+        entry = self.manifest_cache.load()
+        age_seconds = time.time() - entry.get('checked_at', 0)
+        if entry and 0 <= age_seconds < max_age_hours * 3600:
+            return entry['manifest']
+        
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        
+        try:
+            # ดาวน์โหลดข้อมูลเวอร์ชันจาก Google Apps Script
+            response = requests.get(self.version_url, headers=headers,
+                                    timeout=UPDATE_CONFIG.get('request_timeout', 10))
+            if response.status_code == 304 and entry:
+                entry['checked_at'] = time.time()
+                self.manifest_cache.save(entry)
+                return entry['manifest']
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            if entry and use_stale_cache:
+                update_logger.warning("version check failed, using cached manifest: %s", e)
+                return entry['manifest']
+            raise
+        
+        manifest = response.json()
+        if manifest and isinstance(manifest, list):
+            self.manifest_cache.save({
+                'manifest': manifest,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'checked_at': time.time()
+            })
+        return manifest
+    
+    def _latest_version_data(self, version_data_list):
+        """หาเวอร์ชันล่าสุดจาก version_code ที่สูงสุด (None ถ้าข้อมูลเวอร์ชันไม่ถูกต้อง)"""
+        if not version_data_list or not isinstance(version_data_list, list):
+            return None
+        return max(version_data_list, key=lambda x: x.get('version_code', 0))
+
     def check_for_updates(self, silent=False):
         """
-        ตรวจสอบการอัปเดต
+        ตรวจสอบการอัปเดต (ผู้ใช้สั่งเอง จึงตรวจสอบกับ server ทุกครั้ง ถ้า server ตอบ 304 ใช้ cache)
         
         Args:
             silent (bool): ถ้า True จะไม่แสดง popup เมื่อไม่มีอัปเดต
@@ -181,19 +307,13 @@ class AutoUpdater:
         self.__class__._update_check_in_progress = True
         
         try:
-            # ดาวน์โหลดข้อมูลเวอร์ชันจาก Google Apps Script
-            response = requests.get(self.version_url, timeout=10)
-            response.raise_for_status()
-            
-            # response เป็น array, หาเวอร์ชันล่าสุด
-            version_data_list = response.json()
-            if not version_data_list or not isinstance(version_data_list, list):
+            latest_version_data = self._latest_version_data(
+                self.fetch_version_manifest(max_age_hours=0, use_stale_cache=False))
+            if latest_version_data is None:
                 if not silent:
                     self._show_error_message("ข้อมูลเวอร์ชันไม่ถูกต้อง")
                 return False
             
-            # หาเวอร์ชันล่าสุดจาก version_code ที่สูงสุด
-            latest_version_data = max(version_data_list, key=lambda x: x.get('version_code', 0))
             latest_version = latest_version_data.get('version_name', '1.0.0')
             
             # เก็บข้อมูลเวอร์ชันใหม่ไว้ใน parent
@@ -221,57 +341,47 @@ class AutoUpdater:
     
     def check_for_updates_background(self, callback=None):
         """
-        ตรวจสอบการอัปเดตแบบเบื้องหลัง (ไม่แสดง popup)
+        ตรวจสอบการอัปเดตแบบเบื้องหลังใน thread แยก (ไม่แสดง popup และคืนค่าทันทีโดยไม่รอ network)
+        
+        ใช้ข้อมูลเวอร์ชันจาก cache ถ้าตรวจสอบครั้งล่าสุดไม่เกิน min_check_hours (เปิดโปรแกรมซ้ำจึงไม่ติดต่อ network)
         
         Args:
-            callback (function): ฟังก์ชันที่จะเรียกเมื่อพบเวอร์ชันใหม่
+            callback (function): ฟังก์ชันที่จะเรียกใน GUI thread เมื่อพบเวอร์ชันใหม่
+            
+        Returns:
+            UpdateCheckThread: thread ที่กำลังตรวจสอบ (None ถ้ามีการตรวจสอบอื่นค้างอยู่)
+            ผู้เรียกต้องเก็บไว้จนกว่า thread จะทำงานเสร็จ
         """
         # ป้องกันการเรียกตรวจสอบซ้ำ
         if self.__class__._update_check_in_progress:
             print("⚠️ Auto-update check already in progress, skipping...")
-            return False
+            return None
         
         self.__class__._update_check_in_progress = True
+        self.update_check_thread = UpdateCheckThread(self)
+        self.update_check_thread.finished.connect(
+            lambda latest_version_data: self._on_background_check_finished(latest_version_data, callback))
+        self.update_check_thread.start()
+        return self.update_check_thread
+    
+    def _on_background_check_finished(self, latest_version_data, callback):
+        """Slot (GUI thread) เมื่อตรวจสอบเวอร์ชันเบื้องหลังเสร็จ"""
+        if latest_version_data is None:
+            return
+        latest_version = latest_version_data.get('version_name', '1.0.0')
         
-        try:
-            # ดาวน์โหลดข้อมูลเวอร์ชันจาก Google Apps Script
-            response = requests.get(self.version_url, timeout=10)
-            response.raise_for_status()
-            
-            # response เป็น array, หาเวอร์ชันล่าสุด
-            version_data_list = response.json()
-            if not version_data_list or not isinstance(version_data_list, list):
-                return False
-            
-            # หาเวอร์ชันล่าสุดจาก version_code ที่สูงสุด
-            latest_version_data = max(version_data_list, key=lambda x: x.get('version_code', 0))
-            latest_version = latest_version_data.get('version_name', '1.0.0')
-            
-            # เก็บข้อมูลเวอร์ชันใหม่ไว้ใน parent
-            if self.parent:
-                self.parent.update_available_data = latest_version_data
-            
-            # เปรียบเทียบเวอร์ชัน
-            if self._is_newer_version(latest_version, self.current_version):
-                # พบเวอร์ชันใหม่ - เรียก callback
-                if callback:
-                    callback(latest_version_data)
-                elif self.parent and hasattr(self.parent, 'on_update_available'):
-                    self.parent.on_update_available(latest_version_data)
-                return True
-            else:
-                # ไม่มีเวอร์ชันใหม่ - ไม่ต้องแจ้งเตือน
-                return False
-                
-        except requests.exceptions.RequestException:
-            # ข้อผิดพลาดการเชื่อมต่อ - ไม่แจ้งเตือน
-            return False
-        except Exception as e:
-            # ข้อผิดพลาดอื่นๆ - ไม่แจ้งเตือน
-            print(f"Background update check error: {e}")
-            return False
-        finally:
-            self.__class__._update_check_in_progress = False
+        # เก็บข้อมูลเวอร์ชันใหม่ไว้ใน parent
+        if self.parent:
+            self.parent.update_available_data = latest_version_data
+        
+        # เปรียบเทียบเวอร์ชัน
+        if self._is_newer_version(latest_version, self.current_version):
+            # พบเวอร์ชันใหม่ - เรียก callback
+            if callback:
+                callback(latest_version_data)
+            elif self.parent and hasattr(self.parent, 'on_update_available'):
+                self.parent.on_update_available(latest_version_data)
+        # ไม่มีเวอร์ชันใหม่ - ไม่ต้องแจ้งเตือน
 
     def _is_newer_version(self, latest, current):
         """เปรียบเทียบเวอร์ชัน"""
@@ -402,7 +512,12 @@ class AutoUpdater:
             # แสดงข้อความสำเร็จและตำแหน่งไฟล์
             self._show_download_success(target_exe_name, str(downloaded_file_path), version_name)
         
+        def update_status(message):
+            if self.progress_dialog:
+                self.progress_dialog.setLabelText(f"กำลังดาวน์โหลด {version_name}...\n{message}")
+        
         self.download_thread.progress.connect(update_progress)
+        self.download_thread.status.connect(update_status)
         self.download_thread.finished.connect(download_finished)
         self.download_thread.start()
         
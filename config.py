@@ -33,7 +33,8 @@ UI_CONFIG = {
     'status_font_size': 10,
     'enable_sorting': True,
     'enable_alternating_colors': True,
-    'selection_behavior': 'rows'  # 'rows' or 'items'
+    'selection_behavior': 'rows',  # 'rows' or 'items'
+    'progress_update_hz': 10  # จำนวนครั้งสูงสุดต่อวินาทีที่ worker thread อัปเดต progress ไปยังหน้าจอ
 }
 
 # การตั้งค่าสี
@@ -77,3 +78,38 @@ PANDAS_CONFIG = {
     'excel_engine_xlsx': 'openpyxl',
     'excel_engine_xls': 'xlrd'
 }
+
+# การตั้งค่าการตรวจสอบอัปเดต
+UPDATE_CONFIG = {
+    'manifest_cache_path': 'logs/version_manifest.json',  # ไฟล์ cache ข้อมูลเวอร์ชันพร้อม ETag/Last-Modified
+    'min_check_hours': 24,  # ใช้ข้อมูลเวอร์ชันจาก cache โดยไม่ติดต่อ server ภายในกี่ชั่วโมงหลังตรวจสอบครั้งล่าสุด
+    'request_timeout': 10  # เวลารอ server ข้อมูลเวอร์ชัน (วินาที)
+}
+
+# การตั้งค่าการเชื่อมโยงข้อมูลกับ MySQL
+LINKAGE_CONFIG = {
+    'default_strategy': 'per_row',  # 'per_row', 'in_list', 'temp_table', 'parallel_in_list' หรือ 'snapshot'
+    'batch_size': 2000,  # จำนวนคีย์ต่อ 1 query / INSERT ในโหมดค้นหาแบบกลุ่ม
+    'pool_size': 4,  # จำนวน connection สำหรับโหมดค้นหาแบบกลุ่มขนาน
+    'adaptive_batch_size': True,  # ปรับขนาด batch และจำนวน batch พร้อมกันตามเวลาที่ใช้จริง (batch_size เป็นค่าเริ่มต้น)
+    'target_batch_seconds': 1.0,  # เวลาเป้าหมายต่อ 1 batch (วินาที)
+    'min_batch_size': 200,  # ขนาด batch ต่ำสุดเมื่อปรับอัตโนมัติ
+    'max_batch_size': 20000,  # ขนาด batch สูงสุดเมื่อปรับอัตโนมัติ (จำนวนพร้อมกันสูงสุดคือ pool_size)
+    'use_prepared_statements': True,  # ใช้ server-side prepared statement (prepare ครั้งเดียวต่อ connection)
+    'cache_path': 'logs/person_lookup_cache.db',  # ไฟล์ SQLite เก็บแคชผลการค้นหา
+    'cache_ttl_hours': 168,  # อายุของผลลัพธ์ในแคช (ชั่วโมง)
+    'snapshot_dir': 'logs/snapshots',  # โฟลเดอร์เก็บ snapshot ตาราง person
+    'snapshot_chunk_size': 10000,  # จำนวนแถวต่อการ fetch เมื่อดาวน์โหลด snapshot
+    'snapshot_full_refresh_days': 7,  # ดาวน์โหลดทั้งตารางใหม่ทุกกี่วัน (ระหว่างนั้น sync เฉพาะแถวที่เปลี่ยน)
+    'use_key_filter': True,  # คัดคีย์ที่ไม่มีในตาราง person แน่นอนด้วย Bloom filter ก่อน query
+    'key_filter_min_keys': 2000,  # สร้าง filter ครั้งแรกเมื่อมีคีย์ต้องค้นหาอย่างน้อยเท่านี้ (ถ้ามีไฟล์แล้วใช้เสมอ)
+    'key_filter_error_rate': 0.01,  # อัตรา false positive ของ filter (คีย์ที่ไม่มีแต่ยังต้อง query)
+    'key_filter_rebuild_hours': 24,  # สร้าง filter ใหม่ทั้งตารางทุกกี่ชั่วโมง (ระหว่างนั้นเพิ่มเฉพาะแถวที่เปลี่ยน)
+    'journal_path': 'logs/linkage_journal.db',  # ไฟล์ SQLite เก็บ checkpoint ของงานที่ยังไม่เสร็จ
+    'journal_ttl_hours': 720,  # อายุของ checkpoint (ชั่วโมง)
+    'reconnect_attempts': 5,  # จำนวนครั้งที่พยายามเชื่อมต่อใหม่เมื่อการเชื่อมต่อหลุดระหว่างค้นหา
+    'reconnect_base_delay': 1.0,  # เวลารอก่อนเชื่อมต่อใหม่ครั้งแรก (วินาที) ครั้งต่อไปรอนานขึ้นเท่าตัว
+    'health_check_seconds': 60,  # ping MySQL ทุกกี่วินาที (เบื้องหลัง) ควรน้อยกว่า wait_timeout ของ server
+    'fuzzy_min_score': 0.85,  # คะแนนความคล้ายขั้นต่ำ (0-1) ของชื่อ-นามสกุลเมื่อจับคู่ด้วยชื่อ
+    'fuzzy_pair_chunk_size': 200000  # จำนวนคู่ที่เปรียบเทียบต่อครั้ง (จำกัดหน่วยความจำ)
+}
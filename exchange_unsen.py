@@ -1,6 +1,8 @@
 import sys
 import os
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 from PyQt5 import QtWidgets, QtCore, QtGui
@@ -15,6 +17,21 @@ from PyQt5.QtCore import (
 from PyQt5.QtGui import QFont
 
 from ui_components import ExchangeUnsenUI
+from linkage import (LINKAGE_STRATEGIES, STRATEGY_PER_ROW,
+                     STRATEGY_IN_LIST, STRATEGY_TEMP_TABLE, STRATEGY_PARALLEL,
+                     STRATEGY_SNAPSHOT, STRATEGY_LOCAL_JOIN, CID_CHECK_COLUMN, FOUND_COLUMNS,
+                     PROCESSED_COLUMN, PROCESSED_YES, PROCESSED_NO,
+                     CASCADE_COLUMNS, CASCADE_OPTION, MATCHED_BY_COLUMN, MATCHED_BY_NAME, NAME_SCORE_COLUMN,
+                     MATCH_COUNT_COLUMN, AMBIGUOUS_COLUMN, AMBIGUOUS_YES,
+                     SOURCE_PROFILES, SOURCE_RESULT_COLUMNS, source_column,
+                     AdaptiveBatchSizer, ambiguity_flags, attach_results, build_result_table, describe_dedup,
+                     lookup_in_list, lookup_temp_table, match_rows, merge_shard_results,
+                     normalize_cid, normalize_keys, validate_cid)
+from lookup_cache import LinkageJournal, PersonLookupCache
+from name_matching import best_name_matches, name_candidates
+from person_snapshot import match_snapshot
+from utils import (ProgressReporter, file_sha1, format_duration, get_stage_logger, setup_logging,
+                   STAGE_LOAD, STAGE_LINK, STAGE_EXPORT)
 
 # Import auto updater
 try:
@@ -28,16 +45,34 @@ except ImportError as e:
 # Import configuration
 try:
     from config import (APP_CONFIG, FILE_CONFIG, UI_CONFIG, 
-                       COLOR_CONFIG, MESSAGES, PANDAS_CONFIG)
-    from mysql_config import MySQLConfigDialog, MySQLConnection
+                       COLOR_CONFIG, MESSAGES, PANDAS_CONFIG, LINKAGE_CONFIG)
+    from mysql_config import (MySQLConfigDialog, MySQLConfigManager, MySQLConnection, MySQLConnectionPool,
+                              ConnectionHealthMonitor, CONNECTION_CONNECTED, CONNECTION_DISCONNECTED,
+                              CONNECTION_LOST, CONNECTION_RECONNECTING, is_connection_lost)
 except ImportError:
     # Default configuration if config.py is not available
     APP_CONFIG = {'name': 'Excel Reader', 'window_size': (1000, 700)}
     FILE_CONFIG = {'excel_filter': "Excel Files (*.xlsx *.xls);;All Files (*)"}
     UI_CONFIG = {'font_family': 'Tahoma', 'font_size': 9}
     MESSAGES = {'ready': 'พร้อมใช้งาน'}
+    LINKAGE_CONFIG = {'default_strategy': 'per_row', 'batch_size': 2000}
     MySQLConfigDialog = None
+    MySQLConfigManager = None
     MySQLConnection = None
+    MySQLConnectionPool = None
+    ConnectionHealthMonitor = None
+    CONNECTION_CONNECTED, CONNECTION_DISCONNECTED = 'connected', 'disconnected'
+    CONNECTION_LOST, CONNECTION_RECONNECTING = 'lost', 'reconnecting'
+    is_connection_lost = lambda error: False
+
+
+# logger แยกตามขั้นตอน (เขียนผ่าน QueueListener ไม่บล็อก thread ที่เรียก)
+load_logger = get_stage_logger(STAGE_LOAD)
+link_logger = get_stage_logger(STAGE_LINK)
+export_logger = get_stage_logger(STAGE_EXPORT)
+
+# จำนวน query error ที่ log แยกรายการ (ที่เกินนับรวมไว้ใน log สรุปตอนจบ)
+LOG_SAMPLE_ERRORS = 5
 
 
 class FilterDialog(QDialog):
@@ -298,11 +333,14 @@ class ExcelLoaderThread(QThread):
     def __init__(self, file_path):
         super().__init__()
         self.file_path = file_path
+        self.reporter = ProgressReporter(lambda message, _done, _total: self.progress.emit(message),
+                                         UI_CONFIG.get('progress_update_hz', 10), unit='แถว')
     
     def run(self):
         """ฟังก์ชันหลักที่รันใน thread"""
         try:
-            self.progress.emit("กำลังอ่านไฟล์ Excel...")
+            started = time.monotonic()
+            self.reporter.report("กำลังอ่านไฟล์ Excel...")
             
             # อ่านไฟล์ Excel
             if self.file_path.endswith('.xlsx') or self.file_path.endswith('.xls'):
@@ -313,107 +351,968 @@ class ExcelLoaderThread(QThread):
             if data.empty:
                 raise ValueError("ไฟล์ Excel ไม่มีข้อมูล")
             
-            self.progress.emit("อ่านไฟล์สำเร็จ")
+            elapsed = time.monotonic() - started
+            load_logger.info("excel loaded file=%s rows=%d columns=%d elapsed=%.2fs",
+                             os.path.basename(self.file_path), len(data), len(data.columns), elapsed)
+            self.reporter.report(f"อ่านไฟล์สำเร็จ {len(data):,} แถว (ใช้เวลา {format_duration(elapsed)})")
             self.finished.emit(data)
             
         except Exception as e:
+            load_logger.exception("excel load failed file=%s", os.path.basename(self.file_path))
             self.error.emit(f"ไม่สามารถอ่านไฟล์ Excel ได้: {str(e)}")
 
 
+class MySQLConnectThread(QThread):
+    """Thread สำหรับเชื่อมต่อ MySQL (รอ server ได้นานถึง connection_timeout จึงไม่ทำใน GUI thread)"""
+    finished = pyqtSignal(bool, str)  # สำเร็จหรือไม่, ข้อความ
+    
+    def __init__(self, mysql_connection):
+        super().__init__()
+        self.mysql_connection = mysql_connection
+    
+    def run(self):
+        """ฟังก์ชันหลักที่รันใน thread"""
+        try:
+            success, message = self.mysql_connection.connect()
+        except Exception as e:
+            success, message = False, f"Error: {str(e)}"
+        
+        if self.isInterruptionRequested():
+            # ผู้ใช้ยกเลิกระหว่างรอ (หยุด connect กลางคันไม่ได้) จึงตัดการเชื่อมต่อที่ได้มาทิ้ง
+            if success:
+                self.mysql_connection.disconnect()
+            success, message = False, "ยกเลิกการเชื่อมต่อแล้ว"
+        self.finished.emit(success, message)
+
+
 class MySQLSearchThread(QThread):
     """Thread สำหรับค้นหาข้อมูลใน MySQL"""
     finished = pyqtSignal(object, int, int)  # ส่งข้อมูล DataFrame, found_count, not_found_count
     error = pyqtSignal(str)  # ส่งข้อความ error
     progress = pyqtSignal(str, int, int)  # ส่งข้อความสถานะ, progress_value, max_value
     
-    def __init__(self, data, selected_column, mysql_connection):
+    def __init__(self, data, selected_column, mysql_connection,
+                 strategy=STRATEGY_PER_ROW, batch_size=None, use_cache=True, source_path=None,
+                 rows_to_search=None, match_names=False, owner=None):
         super().__init__()
-        self.data = data.copy()  # สำเนาข้อมูลเพื่อความปลอดภัย
+        # thread ที่สั่งงาน (เชื่อมโยงหลายระบบ: object นี้ทำงานใน thread ของ owner และยกเลิกตาม owner)
+        self.owner = owner
+        self.data = data  # อ่านอย่างเดียว ผลลัพธ์ถูกสร้างเป็น DataFrame ใหม่
+        self.source_path = source_path  # ไฟล์ Excel ต้นทาง (ใช้สร้างรหัสงานของ checkpoint)
+        # index ของแถวที่ต้องการค้นหา (None = ทุกแถว) ใช้ทำต่อเฉพาะแถวที่ยังไม่ได้ค้นหาหลังยกเลิก
+        # แถวอื่นจะคงผลลัพธ์เดิมไว้
+        self.rows_to_search = rows_to_search
         self.selected_column = selected_column
         self.mysql_connection = mysql_connection
+        self.strategy = strategy
+        self.cascade = selected_column == CASCADE_OPTION  # เชื่อมโยงหลายคีย์ cid -> hn -> pid
+        self.match_names = match_names  # จับคู่แถวที่ยังไม่พบด้วยชื่อ-นามสกุลแบบ fuzzy เป็นขั้นสุดท้าย
+        self.key_column = None  # คอลัมน์คีย์ของขั้นที่กำลังค้นหา
+        self.active_strategy = strategy  # วิธีค้นหาของขั้นปัจจุบัน (เปลี่ยนเป็น local_join ถ้าคอลัมน์ไม่มี index)
+        self.key_count = 0  # จำนวนแถวที่มีคีย์ที่ถูกค้นหา (รวมทุกขั้น)
+        self.unique_key_count = 0  # จำนวนคีย์ที่ไม่ซ้ำ (รวมทุกขั้น)
+        self._person_snapshot = None  # snapshot/ตาราง person ที่อ่านแล้ว ใช้ซ้ำทุกขั้นของแบบหลายคีย์
+        self._key_filter = None  # Bloom filter คีย์ของตาราง person ที่อัปเดตแล้ว ใช้ซ้ำทุกขั้น
+        self._key_filter_checked = False  # โหลด/อัปเดต filter แล้ว (สำเร็จหรือไม่ก็ตาม) ไม่ต้องลองซ้ำ
+        self.batch_size = batch_size or LINKAGE_CONFIG.get('batch_size', 2000)
+        self.pool_size = LINKAGE_CONFIG.get('pool_size', 4)
+        self.batch_sizer = None  # ปรับขนาด batch ตามเวลาที่ใช้จริง (โหมดค้นหาแบบกลุ่ม)
+        self.use_cache = use_cache
+        self.cache = None
+        self.cache_scope = None
+        self.failed_keys = set()  # คีย์ที่ query error (ไม่บันทึกลงแคช)
+        self.journal = None
+        self.run_id = None
+        self.checkpoint_count = 0  # จำนวนคีย์ที่บันทึก checkpoint ไว้แล้วของงานนี้
+        self.dedup_summary = ''  # สรุปผลการตัดคีย์ซ้ำ
+        self.row_flags = None  # คอลัมน์ตรวจสอบรายแถว (เช่น cid_check) ที่แนบไปกับผลลัพธ์
+        self.keyed_rows = None  # index ของทุกแถวที่มีคีย์ให้ค้นหา (ใช้นับผลลัพธ์)
+        self.processed_keys = set()  # คีย์ที่ได้คำตอบแล้ว (พบ/ไม่พบ) ใช้ทำเครื่องหมายเมื่อถูกยกเลิก
+        self.match_counts = {}  # คีย์ -> จำนวนแถวใน person ที่พบ (นับจากผลลัพธ์ของการค้นหาแบบกลุ่ม)
+        self.cancelled = False  # ถูกยกเลิกกลางคัน (ผลลัพธ์เป็นบางส่วน)
+        self.remaining_rows = 0  # จำนวนแถวที่ยังไม่ได้ค้นหาเมื่อถูกยกเลิก
+        self.query_error_count = 0  # จำนวน query ที่ error (log เฉพาะ LOG_SAMPLE_ERRORS ครั้งแรก)
+        self._error_lock = threading.Lock()
+        # รวมการแจ้ง progress ไม่ให้ส่งทุกคีย์ (ป้องกัน event loop ของ GUI ทำงานไม่ทัน)
+        self.reporter = ProgressReporter(self.progress.emit, UI_CONFIG.get('progress_update_hz', 10), unit='คีย์')
+    
+    def isInterruptionRequested(self):
+        """ถูกขอให้หยุดหรือไม่ (รวมถึงเมื่อ owner ถูกขอให้หยุด)"""
+        if self.owner is not None and self.owner.isInterruptionRequested():
+            return True
+        return super().isInterruptionRequested()
     
     def run(self):
         """ฟังก์ชันหลักที่รันใน thread"""
         try:
-            # เตรียมข้อมูล
-            found_count = 0
-            not_found_count = 0
-            total_rows = len(self.data)
-              # แมปคอลัมน์โดยใช้ข้อมูลจาก profile ปัจจุบัน
-            column_mapping = self.mysql_connection.get_column_mapping()
-            db_column = column_mapping[self.selected_column]
-            
-            # เพิ่มคอลัมน์ผลลัพธ์
-            self.data['pid_found'] = ''
-            self.data['cid_found'] = ''
-            self.data['fname_found'] = ''
-            self.data['lname_found'] = ''
-            self.data['hn_found'] = ''
-              # เตรียมข้อมูลตาราง
-            table_name = self.mysql_connection.get_person_table_name()
-            columns = self.mysql_connection.get_person_query_columns()
-            
-            self.progress.emit(f"เริ่มค้นหาข้อมูลใน MySQL ({self.mysql_connection.profile})...", 0, total_rows)
-            
-            # ค้นหาทีละแถว
-            for idx, row in self.data.iterrows():
-                if self.isInterruptionRequested():
-                    break
-                
-                search_value = row[self.selected_column]
-                if pd.isna(search_value):
-                    continue
+            started = time.monotonic()
+            # ถือ connection ไว้ตลอดการเชื่อมโยง (health monitor จะไม่ ping ระหว่างนี้)
+            with self.mysql_connection.in_use():
+                matched_rows = self.link()
+            
+            # ต่อผลลัพธ์เข้ากับข้อมูลครั้งเดียว (คอลัมน์ผลลัพธ์อยู่หน้าสุด)
+            result_data = attach_results(self.data, matched_rows, self.row_flags)
+            if self.rows_to_search is not None:
+                result_data = self._restore_previous_results(result_data)
+            found_count, not_found_count = self._count_results(result_data)
+            
+            link_logger.info("linkage %s profile=%s strategy=%s columns=%s rows=%d keys=%d unique=%d "
+                             "found=%d not_found=%d remaining=%d query_errors=%d elapsed=%.2fs",
+                             'cancelled' if self.cancelled else 'finished',
+                             self.mysql_connection.profile, self.strategy, '->'.join(self._key_columns()),
+                             len(self.data), self.key_count, self.unique_key_count, found_count, not_found_count,
+                             self.remaining_rows, self.query_error_count, time.monotonic() - started)
+            self.reporter.flush()
+            self.finished.emit(result_data, found_count, not_found_count)
+            
+        except Exception as e:
+            link_logger.exception("linkage failed profile=%s strategy=%s column=%s",
+                                  self.mysql_connection.profile, self.active_strategy, self.key_column)
+            message = f"เกิดข้อผิดพลาดในการค้นหา: {str(e)}"
+            if self.checkpoint_count:
+                message += (f"\n\nบันทึก checkpoint ไว้แล้ว {self.checkpoint_count:,} คีย์ "
+                            f"กดค้นหาอีกครั้งเพื่อทำต่อจากจุดที่ค้างไว้")
+            self.error.emit(message)
+    
+    def link(self):
+        """
+        เชื่อมโยงทุกขั้น (คีย์ตามลำดับ แล้วชื่อ-นามสกุลถ้าเลือกไว้) กับ profile ของ mysql_connection
+        
+        คอลัมน์ตรวจสอบรายแถวถูกเก็บไว้ใน row_flags และแถวที่มีคีย์ใน keyed_rows
+        
+        Returns:
+            pd.DataFrame: ผลลัพธ์รายแถวเฉพาะแถวที่พบ (คอลัมน์ FOUND_COLUMNS)
+        """
+          # เตรียมข้อมูลตาราง
+        table_name = self.mysql_connection.get_person_table_name()
+        columns = self.mysql_connection.get_person_query_columns()
+        key_columns = self._key_columns()
+        
+        self.reporter.report(f"เริ่มค้นหาข้อมูลใน MySQL ({self.mysql_connection.profile})...", 0, len(self.data),
+                             force=True)
+        
+        # แบบหลายคีย์: แต่ละขั้นค้นหาเฉพาะแถวที่ขั้นก่อนหน้ายังไม่พบ
+        pending_rows = self.data.index if self.rows_to_search is None else pd.Index(self.rows_to_search)
+        self.keyed_rows = self.data.index[:0]
+        matched_parts = []
+        matched_by_parts = []
+        match_count_parts = []
+        for key_column in key_columns:
+            if self.isInterruptionRequested():
+                break
+            search_keys, matched = self._link_stage(key_column, pending_rows, table_name, columns)
+            matched_parts.append(matched)
+            matched_by_parts.append(pd.Series(key_column, index=matched.index, dtype=object))
+            match_count_parts.append(search_keys[matched.index].map(self.match_counts))
+            pending_rows = pending_rows.difference(matched.index)
+            if self.cascade:
+                link_logger.info("cascade stage %s: searched=%d matched=%d remaining=%d",
+                                 key_column, len(search_keys), len(matched), len(pending_rows))
+        
+        if self.match_names and not self.isInterruptionRequested():
+            matches = self._link_names(pending_rows, table_name, columns)
+            matched = matches[FOUND_COLUMNS]
+            matched_parts.append(matched)
+            match_count_parts.append(matches[MATCH_COUNT_COLUMN])
+            matched_by_parts.append(pd.Series(MATCHED_BY_NAME, index=matched.index, dtype=object))
+            pending_rows = pending_rows.difference(matched.index)
+        
+        matched_rows = (pd.concat(matched_parts) if matched_parts
+                        else pd.DataFrame(columns=FOUND_COLUMNS, dtype=object))
+        if self.cascade or self.match_names:
+            matched_by = (pd.concat(matched_by_parts) if matched_by_parts
+                          else pd.Series(dtype=object))
+            self._add_row_flag(matched_by.rename(MATCHED_BY_COLUMN).reindex(self.data.index, fill_value=''))
+        self._flag_ambiguous_rows(match_count_parts)
+        
+        self.cancelled = self.isInterruptionRequested()
+        if self.cancelled:
+            # ผลลัพธ์บางส่วน: ทำเครื่องหมายแถวที่ค้นหาแล้ว เพื่อให้ทำต่อเฉพาะแถวที่เหลือได้
+            if self.cascade or self.match_names or not matched_parts:
+                # แถวที่ยังไม่พบต้องค้นหาด้วยคีย์ถัดไป (หรือชื่อ) อีก จึงนับเป็นยังไม่ได้ค้นหา
+                search_columns = key_columns + [column for column in ('fname', 'lname')
+                                                if self.match_names and column in self.data.columns]
+                has_key = self.data.loc[pending_rows, search_columns].notna().any(axis=1)
+                unresolved_rows = pending_rows[has_key.to_numpy()]
+            else:
+                unresolved_rows = search_keys[~search_keys.isin(self.processed_keys)].index
+            self.keyed_rows = self.keyed_rows.union(unresolved_rows)
+            self._mark_processed_rows(unresolved_rows)
+        return matched_rows
+    
+    def _flag_ambiguous_rows(self, match_count_parts):
+        """เพิ่มคอลัมน์ match_count และ ambiguous (เฉพาะเมื่อวิธีค้นหานับจำนวนแถวที่พบได้)"""
+        match_counts = pd.concat(match_count_parts) if match_count_parts else pd.Series(dtype=float)
+        if not match_counts.notna().any():
+            return
+        flags = ambiguity_flags(match_counts, self.data.index)
+        for column in flags.columns:
+            self._add_row_flag(flags[column])
+        
+        ambiguous_count = int((flags[AMBIGUOUS_COLUMN] == AMBIGUOUS_YES).sum())
+        link_logger.info("ambiguous keys rows=%d counted=%d", ambiguous_count, int(match_counts.notna().sum()))
+        if ambiguous_count:
+            summary = f"คีย์ซ้ำใน person {ambiguous_count:,} แถว (ใช้แถวแรก ดูคอลัมน์ {AMBIGUOUS_COLUMN})"
+            self.dedup_summary = f"{self.dedup_summary}; {summary}" if self.dedup_summary else summary
+    
+    def _key_columns(self):
+        """คอลัมน์คีย์ที่ใช้ค้นหาตามลำดับ (แบบหลายคีย์ใช้เฉพาะคอลัมน์ที่มีในข้อมูล)"""
+        if self.cascade:
+            return [column for column in CASCADE_COLUMNS if column in self.data.columns]
+        return [self.selected_column]
+    
+    def _link_stage(self, key_column, rows, table_name, columns):
+        """
+        เชื่อมโยงแถวที่ระบุด้วยคอลัมน์คีย์หนึ่งคอลัมน์ (แบบคอลัมน์เดียวมีขั้นเดียว)
+        
+        Args:
+            key_column: คอลัมน์คีย์ ('pid', 'cid' หรือ 'hn')
+            rows: index ของแถวที่ต้องการค้นหา
+        
+        Returns:
+            tuple: (คีย์ของแต่ละแถวที่ค้นหา, ผลลัพธ์รายแถวเฉพาะแถวที่พบ)
+        """
+        # แคช, checkpoint และคีย์ที่ค้นหาแล้วแยกตามคอลัมน์ค้นหา
+        self.key_column = key_column
+        self.active_strategy = self.strategy
+        self.cache = self.cache_scope = None
+        self.journal = self.run_id = None
+        self.failed_keys = set()
+        self.processed_keys = set()
+        self.match_counts = {}
+        
+          # แมปคอลัมน์โดยใช้ข้อมูลจาก profile ปัจจุบัน
+        db_column = self.mysql_connection.get_column_mapping()[key_column]
+        
+        if (self.active_strategy != STRATEGY_SNAPSHOT and
+                not self.mysql_connection.is_key_indexed(key_column)):
+            # คอลัมน์ไม่มี index ทุก query จะเป็น full table scan จึงอ่านตารางครั้งเดียวแล้วจับคู่ในเครื่องแทน
+            link_logger.warning("column %s.%s is not indexed, switching strategy %s -> %s",
+                                table_name, db_column, self.active_strategy, STRATEGY_LOCAL_JOIN)
+            self.reporter.report(f"คอลัมน์ {db_column} ไม่มี index: อ่านตาราง person ครั้งเดียวแล้วจับคู่ในเครื่อง", 0, 0,
+                                 force=True)
+            self.active_strategy = STRATEGY_LOCAL_JOIN
+        
+        if self.active_strategy not in (STRATEGY_SNAPSHOT, STRATEGY_LOCAL_JOIN):
+            # snapshot และการจับคู่ในเครื่องใช้ข้อมูลทั้งตารางอยู่แล้ว ไม่ต้องใช้แคชและ checkpoint
+            self._open_cache(db_column)
+            self._open_journal(db_column)
+        
+        search_keys, unique_keys = self._prepare_search_keys(rows)
+        
+        # แต่ละวิธีคืนค่าตารางผลลัพธ์ขนาดเท่าจำนวนคีย์ที่พบ (index คือคีย์)
+        if self.active_strategy == STRATEGY_PER_ROW:
+            result_table = self._search_per_row(unique_keys, table_name, columns, db_column)
+        elif self.active_strategy == STRATEGY_SNAPSHOT:
+            result_table = self._search_snapshot(unique_keys)
+        elif self.active_strategy == STRATEGY_LOCAL_JOIN:
+            result_table = self._search_local_join(unique_keys, table_name, columns)
+        else:
+            result_table = self._search_batched(unique_keys, table_name, columns, db_column)
+        
+        self._finish_journal()
+        return search_keys, match_rows(search_keys, result_table)
+    
+    def _link_names(self, rows, table_name, columns):
+        """
+        จับคู่แถวที่ยังไม่พบด้วยชื่อ-นามสกุลแบบ fuzzy กับตาราง person ทั้งตาราง (เปรียบเทียบเฉพาะภายใน block)
+        
+        Returns:
+            pd.DataFrame: ผลลัพธ์รายแถวเฉพาะแถวที่จับคู่ได้ (คอลัมน์ FOUND_COLUMNS และ MATCH_COUNT_COLUMN
+            จำนวนคนที่ชื่อคล้ายผ่านเกณฑ์)
+        """
+        self.key_column = 'fname+lname'
+        if 'fname' not in self.data.columns or 'lname' not in self.data.columns:
+            link_logger.info("name matching skipped: data has no fname/lname columns")
+            return pd.DataFrame(columns=FOUND_COLUMNS + [MATCH_COUNT_COLUMN], dtype=object)
+        
+        names = self.data.loc[rows, ['fname', 'lname']].dropna()
+        self.keyed_rows = self.keyed_rows.union(names.index)
+        person_rows = self._load_person_rows(table_name, columns)
+        if person_rows is None or names.empty:
+            return pd.DataFrame(columns=FOUND_COLUMNS + [MATCH_COUNT_COLUMN], dtype=object)
+        
+        self.reporter.report(f"กำลังจับคู่ชื่อ-สกุล {len(names):,} แถวกับ {len(person_rows):,} คน...", 0, 0)
+        started = time.monotonic()
+        candidates = name_candidates(names['fname'], names['lname'], person_rows,
+                                     min_score=LINKAGE_CONFIG.get('fuzzy_min_score', 0.85),
+                                     chunk_size=LINKAGE_CONFIG.get('fuzzy_pair_chunk_size', 200000))
+        matches = best_name_matches(candidates, person_rows)
+        self._add_row_flag(matches[NAME_SCORE_COLUMN].reindex(self.data.index, fill_value=''))
+        
+        summary = f"ชื่อ-สกุล: จับคู่ได้ {len(matches):,}/{len(names):,} แถว"
+        ambiguous_count = int((matches[MATCH_COUNT_COLUMN] > 1).sum())
+        if ambiguous_count:
+            summary += f" (ชื่อคล้ายหลายคน {ambiguous_count:,} แถว ดูคอลัมน์ {AMBIGUOUS_COLUMN})"
+        self.dedup_summary = f"{self.dedup_summary}; {summary}" if self.dedup_summary else summary
+        self.reporter.report(summary, 0, 0)
+        link_logger.info("name matching rows=%d candidates=%d matched=%d elapsed=%.2fs",
+                         len(names), len(candidates), len(matches), time.monotonic() - started)
+        return matches[FOUND_COLUMNS + [MATCH_COUNT_COLUMN]]
+    
+    def _add_row_flag(self, flag):
+        """
+        เพิ่มคอลัมน์ตรวจสอบรายแถวต่อท้าย row_flags (แทนที่คอลัมน์ชื่อเดิมถ้ามีแล้ว)
+        
+        row_flags มี index เดียวกับ data เสมอ flag ที่มีเฉพาะบางแถว (เช่น cid_check เฉพาะแถวที่มี cid)
+        จึงไม่ทำให้คอลัมน์อื่นของแถวที่เหลือหายไป
+        """
+        if self.row_flags is None:
+            self.row_flags = pd.DataFrame(index=self.data.index)
+        self.row_flags[flag.name] = flag.reindex(self.data.index)
+    
+    def _mark_processed_rows(self, unresolved_rows):
+        """เพิ่มคอลัมน์ processed: Y = ค้นหาแล้ว (หรือไม่มีคีย์ให้ค้นหา), N = ยังไม่ได้ค้นหา"""
+        processed = pd.Series(PROCESSED_YES, index=self.data.index, dtype=object, name=PROCESSED_COLUMN)
+        processed[unresolved_rows] = PROCESSED_NO
+        self._add_row_flag(processed)
+    
+    def _result_columns(self):
+        """คอลัมน์ผลลัพธ์ที่คงค่าเดิมไว้เมื่อทำต่อ และคอลัมน์ที่บอกว่าแถวพบหรือไม่"""
+        return (FOUND_COLUMNS + [MATCHED_BY_COLUMN, NAME_SCORE_COLUMN, MATCH_COUNT_COLUMN, AMBIGUOUS_COLUMN],
+                [FOUND_COLUMNS[0]])
+    
+    def _restore_previous_results(self, result_data):
+        """คืนผลลัพธ์เดิมของแถวที่ไม่ได้อยู่ในรอบนี้ (ค้นหาไว้แล้วในรอบก่อน)"""
+        kept = ~result_data.index.isin(self.rows_to_search)
+        result_columns, _ = self._result_columns()
+        previous_columns = [column for column in result_columns
+                            if column in self.data.columns and column in result_data.columns]
+        if kept.any() and previous_columns:
+            result_data.loc[kept, previous_columns] = self.data.loc[kept, previous_columns].to_numpy()
+        return result_data
+    
+    def _count_results(self, result_data):
+        """
+        นับผลลัพธ์ของทุกแถวที่มีคีย์ (รวมแถวที่คงผลลัพธ์เดิมไว้)
+        
+        Returns:
+            tuple: (จำนวนที่พบ, จำนวนที่ไม่พบ) ถ้าถูกยกเลิกจะไม่นับแถวที่ยังไม่ได้ค้นหาเป็น "ไม่พบ"
+        """
+        _, found_columns = self._result_columns()
+        keyed = result_data.loc[self.keyed_rows]
+        # ระบบที่ผิดพลาดจะไม่มีคอลัมน์ผลลัพธ์
+        found_mask = (keyed.reindex(columns=found_columns, fill_value='') != '').any(axis=1)
+        found_count = int(found_mask.sum())
+        if not self.cancelled:
+            return found_count, len(keyed) - found_count
+        
+        processed_mask = keyed[PROCESSED_COLUMN] == PROCESSED_YES
+        self.remaining_rows = int((~processed_mask).sum())
+        return found_count, int((processed_mask & ~found_mask).sum())
+    
+    def _open_journal(self, db_column):
+        """เปิด checkpoint journal ของงานนี้ (ไฟล์ + profile/ฐานข้อมูล + คอลัมน์)"""
+        try:
+            if self.source_path and os.path.isfile(self.source_path):
+                file_hash = file_sha1(self.source_path)
+            else:
+                # ไม่มีไฟล์ต้นทาง ใช้ hash ของคอลัมน์คีย์แทน
+                hashed = pd.util.hash_pandas_object(self.data[self.key_column], index=False)
+                file_hash = f"data-{int(hashed.sum()) & 0xFFFFFFFFFFFFFFFF:016x}"
+            scope = PersonLookupCache.make_scope(self.mysql_connection.profile,
+                                                 self.mysql_connection.config, db_column)
+            self.journal = LinkageJournal(LINKAGE_CONFIG.get('journal_path', 'logs/linkage_journal.db'),
+                                          LINKAGE_CONFIG.get('journal_ttl_hours', 720))
+            self.run_id = LinkageJournal.make_run_id(file_hash, scope)
+        except Exception as journal_error:
+            # checkpoint ใช้ไม่ได้ไม่ควรทำให้การค้นหาล้มเหลว
+            link_logger.warning("cannot open linkage journal: %s", journal_error)
+            self.journal = None
+    
+    def _load_known_results(self, keys):
+        """
+        รวมผลลัพธ์ที่มีอยู่แล้วจากแคชและ checkpoint ของงานนี้
+        
+        Returns:
+            dict: คีย์ -> ผลลัพธ์ (None = เคยค้นหาแล้วไม่พบ) คีย์ที่ยังไม่เคยค้นหาจะไม่อยู่ใน dict
+        """
+        known = self._load_cached_results(keys)
+        if self.journal is None:
+            return known
+        
+        remaining = [key for key in keys if key not in known]
+        try:
+            journaled = self.journal.get_many(self.run_id, remaining) if remaining else {}
+        except Exception as journal_error:
+            link_logger.warning("cannot read linkage journal: %s", journal_error)
+            return known
+        if journaled:
+            self.checkpoint_count = len(journaled)
+            link_logger.info("resuming run from checkpoint keys=%d", len(journaled))
+            self.reporter.report(f"ทำต่อจาก checkpoint: ค้นหาไปแล้ว {len(journaled):,} คีย์", 0, 0)
+        known.update(journaled)
+        self.processed_keys.update(known)
+        return known
+    
+    def _checkpoint(self, keys, results):
+        """บันทึกผลของคีย์ที่ค้นหาเสร็จแล้วลง journal (คีย์ที่ error ไม่บันทึก เพื่อให้ค้นหาใหม่ตอนทำต่อ)"""
+        if not keys:
+            return
+        found = {key: results[key] for key in keys if key in results}
+        missing_keys = [key for key in keys if key not in results and key not in self.failed_keys]
+        self.processed_keys.update(found)
+        self.processed_keys.update(missing_keys)
+        if self.journal is None:
+            return
+        try:
+            self.journal.put_many(self.run_id, found, missing_keys)
+            self.checkpoint_count += len(found) + len(missing_keys)
+        except Exception as journal_error:
+            link_logger.warning("cannot write linkage journal: %s", journal_error)
+    
+    def _finish_journal(self):
+        """ลบ checkpoint เมื่อค้นหาครบทุกคีย์ (ถ้ามีคีย์ error หรือถูกยกเลิกจะเก็บไว้ทำต่อ)"""
+        if self.journal is None or self.failed_keys or self.isInterruptionRequested():
+            return
+        try:
+            self.journal.clear(self.run_id)
+        except Exception as journal_error:
+            link_logger.warning("cannot clear linkage journal: %s", journal_error)
+    
+    def _with_reconnect(self, connection, operation, *args):
+        """
+        เรียก operation(*args) ถ้าการเชื่อมต่อหลุดจะเชื่อมต่อใหม่แบบ exponential backoff แล้วลองใหม่
+        
+        Args:
+            connection: MySQLConnection ที่ operation ใช้
+            operation: ฟังก์ชันที่ต้องการเรียก
+        """
+        attempts = LINKAGE_CONFIG.get('reconnect_attempts', 5)
+        base_delay = LINKAGE_CONFIG.get('reconnect_base_delay', 1.0)
+        while True:
+            try:
+                return operation(*args)
+            except Exception as error:
+                if not is_connection_lost(error) or self.isInterruptionRequested():
+                    raise
+                link_logger.warning("connection lost: %s, reconnecting", error)
                 
-                try:
-                    # Query ข้อมูลจาก MySQL ตาม profile ที่กำลังใช้งาน
-                    query = f"SELECT {','.join(columns)} FROM {table_name} WHERE {db_column} = %s LIMIT 1"
-                    print(query)
-                    cursor = self.mysql_connection.connection.cursor()
-                    cursor.execute(query, (str(search_value),))
-                    result = cursor.fetchone()
-                    cursor.close()
-                    
-                    if result:
-                        # พบข้อมูล
-                        self.data.at[idx, 'pid_found'] = result[0] if result[0] else ''
-                        self.data.at[idx, 'cid_found'] = result[1] if result[1] else ''
-                        self.data.at[idx, 'fname_found'] = result[2] if result[2] else ''
-                        self.data.at[idx, 'lname_found'] = result[3] if result[3] else ''
-                        self.data.at[idx, 'hn_found'] = result[4] if result[4] else ''
-                        found_count += 1
-                    else:
-                        # ไม่พบข้อมูล
-                        self.data.at[idx, 'pid_found'] = ''
-                        self.data.at[idx, 'cid_found'] = ''
-                        self.data.at[idx, 'fname_found'] = ''
-                        self.data.at[idx, 'lname_found'] = ''
-                        self.data.at[idx, 'hn_found'] = ''
-                        not_found_count += 1
-                        
-                except Exception as query_error:
-                    print(f"Error querying for {search_value}: {str(query_error)}")
-                    # ใส่ค่าว่างเมื่อเกิด error
-                    self.data.at[idx, 'pid_found'] = ''
-                    self.data.at[idx, 'cid_found'] = ''
-                    self.data.at[idx, 'fname_found'] = ''
-                    self.data.at[idx, 'lname_found'] = ''
-                    self.data.at[idx, 'hn_found'] = ''
-                    not_found_count += 1
+                def on_retry(attempt, delay):
+                    self.reporter.report(f"การเชื่อมต่อ MySQL หลุด กำลังเชื่อมต่อใหม่ใน {delay:.0f} วินาที "
+                                         f"(ครั้งที่ {attempt}/{attempts})...", 0, 0)
                 
-                # อัปเดต progress
-                current_row = idx + 1
-                self.progress.emit(f"ค้นหาแล้ว {current_row}/{total_rows} รายการ", current_row, total_rows)
-            
-            # จัดเรียงคอลัมน์ใหม่
-            found_columns = ['pid_found', 'cid_found', 'fname_found', 'lname_found', 'hn_found']
-            existing_columns = [col for col in self.data.columns if col not in found_columns]
-            new_column_order = found_columns + existing_columns
-            self.data = self.data[new_column_order]
+                success, message = connection.reconnect(attempts, base_delay,
+                                                        should_stop=self.isInterruptionRequested,
+                                                        on_retry=on_retry)
+                if not success:
+                    raise RuntimeError(f"การเชื่อมต่อ MySQL หลุดและเชื่อมต่อใหม่ไม่สำเร็จ: {message}") from error
+                link_logger.info(message)
+    
+    def _log_query_error(self, description, error):
+        """บันทึก query error (log เฉพาะครั้งแรกๆ ที่เหลือนับรวมไว้ใน log สรุปตอนจบ)"""
+        with self._error_lock:
+            self.query_error_count += 1
+            error_number = self.query_error_count
+        if error_number <= LOG_SAMPLE_ERRORS:
+            link_logger.warning("query error #%d for %s: %s", error_number, description, error)
+        elif error_number == LOG_SAMPLE_ERRORS + 1:
+            link_logger.warning("further query errors are counted but not logged individually")
+    
+    def _open_cache(self, db_column):
+        """เปิดแคชผลการค้นหา (ถ้าไม่ได้เลือกข้ามแคช)"""
+        if not self.use_cache:
+            return
+        try:
+            self.cache = PersonLookupCache(LINKAGE_CONFIG.get('cache_path', 'logs/person_lookup_cache.db'),
+                                           LINKAGE_CONFIG.get('cache_ttl_hours', 168))
+            self.cache_scope = PersonLookupCache.make_scope(self.mysql_connection.profile,
+                                                            self.mysql_connection.config, db_column)
+        except Exception as cache_error:
+            # แคชใช้ไม่ได้ไม่ควรทำให้การค้นหาล้มเหลว
+            link_logger.warning("cannot open lookup cache: %s", cache_error)
+            self.cache = None
+    
+    def _load_cached_results(self, keys):
+        """ดึงผลลัพธ์จากแคช คืนค่า dict คีย์ -> ผลลัพธ์ (None = เคยค้นหาแล้วไม่พบ)"""
+        if self.cache is None or not keys:
+            return {}
+        try:
+            cached = self.cache.get_many(self.cache_scope, keys)
+        except Exception as cache_error:
+            link_logger.warning("cannot read lookup cache: %s", cache_error)
+            return {}
+        self.reporter.report(f"พบในแคช {len(cached)}/{len(keys)} คีย์", len(cached), len(keys), force=True)
+        return cached
+    
+    def _store_cached_results(self, queried_keys, results):
+        """บันทึกผลการค้นหาของคีย์ที่ query สำเร็จลงแคช"""
+        if self.cache is None or self.isInterruptionRequested():
+            # ถ้าถูกยกเลิก ไม่รู้ว่าคีย์ไหนถูกค้นหาจริง จึงไม่บันทึก
+            return
+        missing_keys = [key for key in queried_keys
+                        if key not in results and key not in self.failed_keys]
+        try:
+            self.cache.put_many(self.cache_scope, results, missing_keys)
+        except Exception as cache_error:
+            link_logger.warning("cannot write lookup cache: %s", cache_error)
+    
+    def _search_per_row(self, unique_keys, table_name, columns, db_column):
+        """ค้นหาทีละคีย์ (1 query ต่อ 1 คีย์ที่ไม่ซ้ำ)"""
+        cached = self._load_known_results(unique_keys)
+        pending_keys = self._drop_definite_misses([key for key in unique_keys if key not in cached], db_column)
+        total_keys = len(pending_keys)
+        queried_keys = []
+        results = {}
+        
+        query = f"SELECT {','.join(columns)} FROM {table_name} WHERE {db_column} = %s LIMIT 1"
+        link_logger.debug("per-row query: %s", query)
+        
+        def fetch_one(search_key):
+            # Query ข้อมูลจาก MySQL ผ่าน prepared statement (prepare ครั้งเดียว ใช้ซ้ำทุกคีย์)
+            cursor = self.mysql_connection.prepared_cursor(query)
+            try:
+                cursor.execute(query, (search_key,))
+                return cursor.fetchall()
+            except Exception:
+                # cursor ที่ error อาจค้างผลลัพธ์ ให้ prepare ใหม่ในครั้งถัดไป
+                self.mysql_connection.discard_prepared_cursor(query)
+                raise
+        
+        checkpoint_start = 0
+        for index, search_key in enumerate(pending_keys, start=1):
+            if self.isInterruptionRequested():
+                break
             
-            self.finished.emit(self.data, found_count, not_found_count)
+            try:
+                rows = self._with_reconnect(self.mysql_connection, fetch_one, search_key)
+                queried_keys.append(search_key)
+                if rows:
+                    results[search_key] = tuple('' if value is None else value for value in rows[0])
+            except Exception as query_error:
+                if is_connection_lost(query_error) or is_connection_lost(query_error.__cause__):
+                    # เชื่อมต่อใหม่ไม่สำเร็จ: บันทึก checkpoint แล้วหยุดงาน
+                    self._checkpoint(queried_keys[checkpoint_start:], results)
+                    raise
+                # คีย์ที่ error จะถูกนับเป็น "ไม่พบ"
+                self._log_query_error(f"key {search_key}", query_error)
+                self.failed_keys.add(search_key)
+            
+            # บันทึก checkpoint ทุก batch_size คีย์
+            if len(queried_keys) - checkpoint_start >= self.batch_size:
+                self._checkpoint(queried_keys[checkpoint_start:], results)
+                checkpoint_start = len(queried_keys)
+            
+            # อัปเดต progress
+            self.reporter.report(f"ค้นหาแล้ว {index}/{total_keys} คีย์", index, total_keys)
+        
+        self._checkpoint(queried_keys[checkpoint_start:], results)
+        self._store_cached_results(queried_keys, results)
+        
+        # รวมผลลัพธ์จากแคช (เฉพาะคีย์ที่พบ)
+        results.update({key: result for key, result in cached.items() if result is not None})
+        return build_result_table(results)
+    
+    def _search_batched(self, unique_keys, table_name, columns, db_column):
+        """ค้นหาแบบกลุ่ม: ใช้แคชและ checkpoint ก่อน แล้วค้นหาเฉพาะคีย์ที่เหลือด้วยวิธีที่เลือก"""
+        cached = self._load_known_results(unique_keys)
+        pending_keys = self._drop_definite_misses([key for key in unique_keys if key not in cached], db_column)
+        
+        lookups = {
+            STRATEGY_IN_LIST: self._lookup_in_list,
+            STRATEGY_TEMP_TABLE: self._lookup_temp_table,
+            STRATEGY_PARALLEL: self._lookup_parallel
+        }
+        lookup = lookups.get(self.active_strategy, self._lookup_in_list)
+        results = lookup(pending_keys, table_name, columns, db_column) if pending_keys else {}
+        self._store_cached_results(pending_keys, results)
+        self._report_batch_settings()
+        
+        # รวมผลลัพธ์จากแคช (เฉพาะคีย์ที่พบ)
+        results.update({key: result for key, result in cached.items() if result is not None})
+        return build_result_table(results)
+    
+    def _drop_definite_misses(self, keys, db_column):
+        """คัดคีย์ที่ Bloom filter ยืนยันว่าไม่มีในตาราง person ออก (นับเป็น "ไม่พบ" โดยไม่ต้อง query)"""
+        key_filter = self._load_key_filter(len(keys)) if keys else None
+        if key_filter is None:
+            return keys
+        
+        maybe_present = key_filter.might_contain(db_column, keys)
+        misses = [key for key, present in zip(keys, maybe_present) if not present]
+        if not misses:
+            return keys
+        self.processed_keys.update(misses)
+        link_logger.info("key filter %s: definite misses=%d of %d keys", db_column, len(misses), len(keys))
+        summary = f"ไม่มีในตาราง person {len(misses):,} คีย์ (ไม่ต้อง query)"
+        if self.cascade:
+            summary = f"{self.key_column}: {summary}"
+        self.dedup_summary = f"{self.dedup_summary}; {summary}" if self.dedup_summary else summary
+        self.reporter.report(summary, 0, 0)
+        return [key for key, present in zip(keys, maybe_present) if present]
+    
+    def _load_key_filter(self, key_count):
+        """
+        Bloom filter คีย์ของตาราง person ที่อัปเดตถึงปัจจุบันแล้ว (None = ไม่ใช้ filter)
+        
+        ครั้งแรกต้องอ่านคอลัมน์คีย์ทั้งตาราง จึงสร้างเฉพาะเมื่อมีคีย์มากพอ ถ้าอัปเดตไม่สำเร็จจะไม่ใช้ filter
+        เพราะ filter เก่าอาจไม่มีคีย์ของแถวใหม่ (คีย์ที่มีอยู่จริงจะถูกตัดทิ้ง)
+        """
+        if self._key_filter_checked:
+            return self._key_filter
+        if not LINKAGE_CONFIG.get('use_key_filter', True):
+            return None
+        if (key_count < LINKAGE_CONFIG.get('key_filter_min_keys', 2000) and
+                not self.mysql_connection.get_person_key_filter().exists()):
+            return None
+        
+        self._key_filter_checked = True
+        self.reporter.report("กำลังอัปเดต Bloom filter คีย์ตาราง person...", 0, 0)
+        try:
+            self._key_filter, message = self._with_reconnect(self.mysql_connection,
+                                                             self.mysql_connection.refresh_key_filter,
+                                                             self.reporter.report)
+            link_logger.info("key filter: %s", message)
+            self.reporter.report(message, 0, 0)
+        except Exception as filter_error:
+            link_logger.warning("cannot refresh person key filter, querying all keys: %s", filter_error)
+        return self._key_filter
+    
+    def _search_snapshot(self, unique_keys):
+        """เชื่อมโยงกับ snapshot ตาราง person ในเครื่องด้วย DataFrame.merge (ไม่ query ทีละคีย์)"""
+        snapshot = self._load_snapshot()
+        self.reporter.report(f"กำลังจับคู่ {len(unique_keys):,} คีย์กับ snapshot {len(snapshot):,} แถว...", 0, 0)
+        self.processed_keys.update(unique_keys)
+        return match_snapshot(unique_keys, snapshot, self.key_column, self.match_counts)
+    
+    def _search_local_join(self, unique_keys, table_name, columns):
+        """อ่านคอลัมน์ค้นหาทั้งตาราง person ครั้งเดียว (1 full scan) แล้วจับคู่ในเครื่องด้วย DataFrame.merge"""
+        person_rows = self._fetch_person_table(table_name, columns,
+                                               f"คอลัมน์ {self.key_column} ไม่มี index กำลังอ่านตาราง "
+                                               f"{table_name} มาจับคู่ในเครื่อง...")
+        if person_rows is None:
+            # อ่านตารางไม่ครบ จับคู่ไม่ได้ ทุกแถวยังถือว่าไม่ได้ค้นหา
+            return build_result_table({})
+        self.reporter.report(f"กำลังจับคู่ {len(unique_keys):,} คีย์กับ {len(person_rows):,} แถว...", 0, 0)
+        self.processed_keys.update(unique_keys)
+        return match_snapshot(unique_keys, person_rows, self.key_column, self.match_counts)
+    
+    def _load_person_rows(self, table_name, columns):
+        """ตาราง person ทั้งตารางสำหรับจับคู่ในเครื่อง (โหมด snapshot ใช้ snapshot นอกนั้นอ่านจาก MySQL ครั้งเดียว)"""
+        if self.strategy == STRATEGY_SNAPSHOT:
+            return self._load_snapshot()
+        return self._fetch_person_table(table_name, columns, f"กำลังอ่านตาราง {table_name} มาจับคู่ในเครื่อง...")
+    
+    def _load_snapshot(self):
+        """โหลด snapshot ตาราง person (sync แถวที่เปลี่ยนแปลงก่อนถ้าเชื่อมต่ออยู่) ใช้ซ้ำทุกขั้น"""
+        if self._person_snapshot is not None:
+            return self._person_snapshot
+        
+        snapshot_store = self.mysql_connection.get_person_snapshot()
+        snapshot = None
+        if self.mysql_connection.is_connected():
+            # sync เฉพาะแถวที่เปลี่ยนแปลงตั้งแต่ครั้งก่อน (ครั้งแรกจะดาวน์โหลดทั้งตาราง)
+            self.reporter.report("กำลังอัปเดต snapshot ตาราง person...", 0, 0)
+            try:
+                snapshot, refresh_message = self.mysql_connection.refresh_person_mirror(
+                    on_progress=self.reporter.report)
+                self.reporter.report(refresh_message, 0, 0)
+            except Exception as refresh_error:
+                if not snapshot_store.exists():
+                    raise
+                link_logger.warning("cannot refresh person snapshot, using existing file: %s", refresh_error)
+        
+        if snapshot is None:
+            if not snapshot_store.exists():
+                raise RuntimeError("ยังไม่มี snapshot ตาราง person กรุณาเชื่อมต่อ MySQL เพื่อดาวน์โหลดครั้งแรก")
+            self.reporter.report("กำลังโหลด snapshot ตาราง person...", 0, 0)
+            snapshot = snapshot_store.load()
+        self._person_snapshot = snapshot
+        return snapshot
+    
+    def _fetch_person_table(self, table_name, columns, message):
+        """อ่านคอลัมน์ค้นหาทั้งตาราง person จาก MySQL ครั้งเดียว (คืนค่า None ถ้าถูกยกเลิกระหว่างอ่าน)"""
+        if self._person_snapshot is not None:
+            return self._person_snapshot
+        
+        self.reporter.report(message, 0, 0)
+        person_rows = self.mysql_connection.fetch_person_frame(f"SELECT {','.join(columns)} FROM {table_name}",
+                                                               on_progress=self.reporter.report,
+                                                               should_stop=self.isInterruptionRequested)
+        if self.isInterruptionRequested():
+            return None
+        self._person_snapshot = person_rows
+        return person_rows
+    
+    def _create_batch_sizer(self, max_concurrency=1):
+        """ตัวปรับขนาด batch ของขั้นนี้ (เริ่มจากขนาดที่ขั้นก่อนหน้าปรับได้ ถ้ามี)"""
+        batch_size = self.batch_sizer.batch_size if self.batch_sizer else self.batch_size
+        self.batch_sizer = AdaptiveBatchSizer(batch_size,
+                                              target_seconds=LINKAGE_CONFIG.get('target_batch_seconds', 1.0),
+                                              min_batch_size=LINKAGE_CONFIG.get('min_batch_size', 200),
+                                              max_batch_size=LINKAGE_CONFIG.get('max_batch_size', 20000),
+                                              max_concurrency=max_concurrency,
+                                              adaptive=LINKAGE_CONFIG.get('adaptive_batch_size', True))
+        return self.batch_sizer
+    
+    def _report_batch_settings(self):
+        """บันทึกขนาด batch และจำนวนพร้อมกันที่ปรับได้ของขั้นนี้ลง log และสรุปผล"""
+        sizer = self.batch_sizer
+        if sizer is None or not sizer.batch_count:
+            return
+        link_logger.info("batch settings key=%s strategy=%s batch_size=%d concurrency=%d "
+                         "seconds_per_batch=%.3f batches=%d keys=%d rows=%d",
+                         self.key_column, self.active_strategy, sizer.batch_size, sizer.concurrency,
+                         sizer.seconds_per_batch, sizer.batch_count, sizer.key_count, sizer.row_count)
+        summary = sizer.describe()
+        if self.cascade:
+            summary = f"{self.key_column}: {summary}"
+        self.dedup_summary = f"{self.dedup_summary}; {summary}" if self.dedup_summary else summary
+    
+    def _lookup_in_list(self, keys, table_name, columns, db_column):
+        """ค้นหาแบบกลุ่ม (1 query ต่อ batch ด้วย WHERE ... IN (...)) ขนาด batch ปรับตามเวลาที่ใช้จริง"""
+        total_keys = len(keys)
+        results = {}
+        done_keys = 0
+        sizer = self._create_batch_sizer()
+        
+        while done_keys < total_keys:
+            if self.isInterruptionRequested():
+                break
             
+            chunk = keys[done_keys:done_keys + sizer.batch_size]
+            started = time.perf_counter()
+            try:
+                chunk_results = self._with_reconnect(self.mysql_connection, lookup_in_list, self.mysql_connection,
+                                                     table_name, columns, db_column, chunk, self.match_counts)
+                sizer.record(len(chunk), len(chunk_results), time.perf_counter() - started)
+                results.update(chunk_results)
+            except Exception as query_error:
+                if is_connection_lost(query_error) or is_connection_lost(query_error.__cause__):
+                    # เชื่อมต่อใหม่ไม่สำเร็จ: batch ก่อนหน้าบันทึก checkpoint แล้ว หยุดงาน
+                    raise
+                # คีย์ใน batch ที่ error จะถูกนับเป็น "ไม่พบ" (batch ถัดไปเล็กลงเผื่อ error เพราะ query ใหญ่เกินไป)
+                self._log_query_error(f"batch of {len(chunk)} keys", query_error)
+                self.failed_keys.update(chunk)
+                sizer.record_failure()
+            self._checkpoint(chunk, results)
+            
+            done_keys += len(chunk)
+            self.reporter.report(f"ค้นหาแล้ว {done_keys}/{total_keys} คีย์ (แบบกลุ่ม)", done_keys, total_keys)
+        
+        return results
+    
+    def _lookup_temp_table(self, keys, table_name, columns, db_column):
+        """ค้นหาด้วยการโหลดคีย์ลง TEMPORARY TABLE แล้ว JOIN กับตาราง person ครั้งเดียว"""
+        # error ระหว่าง JOIN ส่งต่อให้ run() แจ้งผู้ใช้ เพราะไม่มีผลลัพธ์บางส่วนให้ใช้
+        # ถ้าการเชื่อมต่อหลุด ตารางชั่วคราวหายไปด้วย จึงเริ่มโหลดคีย์ใหม่ทั้งหมดหลังเชื่อมต่อใหม่
+        def join_all():
+            self.match_counts.clear()  # เริ่มนับใหม่เมื่อ JOIN ใหม่หลังเชื่อมต่อใหม่
+            return lookup_temp_table(self.mysql_connection.connection, table_name, columns,
+                                     db_column, keys, batch_size=self.batch_size,
+                                     on_progress=self.reporter.report,
+                                     should_stop=self.isInterruptionRequested,
+                                     counts=self.match_counts)
+        
+        results = self._with_reconnect(self.mysql_connection, join_all)
+        # ถ้าถูกยกเลิกระหว่างทาง รู้คำตอบแน่นอนเฉพาะคีย์ที่พบแล้ว
+        self._checkpoint(list(results) if self.isInterruptionRequested() else keys, results)
+        return results
+    
+    def _lookup_parallel(self, keys, table_name, columns, db_column):
+        """ค้นหาแบบกลุ่มขนาน: แบ่งคีย์เป็น shard แล้วค้นหาพร้อมกันบนหลาย connection"""
+        if MySQLConnectionPool is None:
+            raise RuntimeError("ไม่พบ MySQL connection pool module")
+        
+        total_keys = len(keys)
+        done_keys = 0
+        next_start = 0
+        sizer = self._create_batch_sizer(max_concurrency=self.pool_size)
+        
+        def next_shard():
+            # ขนาด shard ถัดไปตามผลของ shard ที่เสร็จแล้ว (ไม่สร้าง shard ใหม่เมื่อถูกยกเลิก)
+            nonlocal next_start
+            if next_start >= total_keys or self.isInterruptionRequested():
+                return None
+            shard = keys[next_start:next_start + sizer.batch_size]
+            next_start += len(shard)
+            return shard
+        
+        def lookup_shard(member, shard):
+            if self.isInterruptionRequested():
+                return None  # shard ที่ยังไม่ได้เริ่มเมื่อถูกยกเลิก (ไม่ใช่ "ไม่พบ")
+            started = time.perf_counter()
+            try:
+                # shard มีคีย์ไม่ซ้ำกัน จึงนับลง match_counts ร่วมกันได้
+                shard_results = self._with_reconnect(member, lookup_in_list, member, table_name, columns,
+                                                     db_column, shard, self.match_counts)
+            except Exception as query_error:
+                if is_connection_lost(query_error) or is_connection_lost(query_error.__cause__):
+                    # เชื่อมต่อใหม่ไม่สำเร็จ: shard ที่เสร็จแล้วบันทึก checkpoint แล้ว หยุดงาน (ไม่นับคีย์เป็น "ไม่พบ")
+                    raise
+                # คีย์ใน shard ที่ error จะถูกนับเป็น "ไม่พบ"
+                self._log_query_error(f"shard of {len(shard)} keys", query_error)
+                self.failed_keys.update(shard)
+                sizer.record_failure()
+                return {}
+            sizer.record(len(shard), len(shard_results), time.perf_counter() - started)
+            return shard_results
+        
+        def on_shard_done(shard, shard_results):
+            nonlocal done_keys
+            done_keys += len(shard)
+            if shard_results is not None:
+                self._checkpoint(shard, shard_results)
+            self.reporter.report(f"ค้นหาแล้ว {done_keys}/{total_keys} คีย์ (ขนาน {sizer.concurrency} connection)",
+                                 done_keys, total_keys)
+        
+        # ใช้ connection ของตัวเอง ไม่ใช้ connection ร่วมกับ GUI thread
+        # เปิดเท่าจำนวนพร้อมกันสูงสุด ส่วนจำนวนที่ใช้จริงปรับตามเวลาที่ใช้ของแต่ละ shard
+        pool_size = min(self.pool_size, max(total_keys // sizer.min_batch_size, 1))
+        pool = MySQLConnectionPool(pool_size, self.mysql_connection.config)
+        success, message = pool.connect()
+        if not success:
+            raise RuntimeError(f"ไม่สามารถเปิด connection pool ได้: {message}")
+        try:
+            shard_results = pool.run_adaptive(lookup_shard, next_shard, lambda: sizer.concurrency, on_shard_done)
+        finally:
+            pool.close()
+        
+        return merge_shard_results(shard_results)
+    
+    def _prepare_search_keys(self, rows):
+        """
+        เตรียมคีย์สำหรับค้นหา: normalize คีย์แล้วตัดคีย์ซ้ำ เพื่อค้นหาคีย์ละครั้งเดียว
+        
+        Args:
+            rows: index ของแถวที่ต้องการค้นหา (ทำต่อหลังยกเลิก หรือแถวที่ขั้นก่อนหน้ายังไม่พบ)
+        
+        Returns:
+            tuple: (คีย์ของแต่ละแถวที่ไม่ว่าง, รายการคีย์ที่ไม่ซ้ำ)
+        """
+        column = self.data[self.key_column]
+        if self.key_column == 'cid':
+            # ตรวจสอบเลขบัตรประชาชนก่อน แถวที่ไม่ถูกต้องไม่ต้องส่งไปค้นหา
+            cids = normalize_cid(column)
+            cid_check = validate_cid(cids)
+            self._add_row_flag(cid_check.rename(CID_CHECK_COLUMN))
+            search_keys = cids[cid_check == '']
+            invalid_count = len(cids) - len(search_keys)
+        else:
+            search_keys = normalize_keys(column)
+            invalid_count = 0
+        
+        # นับผลลัพธ์จากทุกแถวที่มีคีย์ (รวมแถวที่คงผลลัพธ์เดิมหรือพบแล้วในขั้นก่อนหน้า)
+        self.keyed_rows = self.keyed_rows.union(search_keys.index)
+        search_keys = search_keys[search_keys.index.isin(rows)]
+        
+        unique_keys = list(search_keys.unique())
+        self.key_count += len(search_keys)
+        self.unique_key_count += len(unique_keys)
+        summary = describe_dedup(len(search_keys), len(unique_keys))
+        if invalid_count:
+            skipped = "ค้นหาด้วยคีย์ถัดไป" if self.cascade else "ไม่ได้ค้นหา"
+            summary += f", CID ไม่ถูกต้อง {invalid_count:,} แถว ({skipped})"
+        if self.cascade:
+            summary = f"{self.key_column}: {summary}"
+        self.dedup_summary = f"{self.dedup_summary}; {summary}" if self.dedup_summary else summary
+        self.reporter.report(summary, 0, 0)
+        return search_keys, unique_keys
+
+
+class MultiSourceSearchThread(MySQLSearchThread):
+    """
+    Thread สำหรับเชื่อมโยงกับหลายระบบ (เช่น HOSXP และ JHCIS) พร้อมกัน
+    
+    แต่ละระบบใช้ connection และ column mapping ของตัวเอง ทำงานขนานกันจึงใช้เวลาเท่าระบบที่ช้าที่สุด
+    ผลลัพธ์แยกคอลัมน์ตามระบบ (เช่น hosxp_pid_found, jhcis_pid_found)
+    """
+    
+    def __init__(self, data, selected_column, mysql_connection, source_configs, **options):
+        super().__init__(data, selected_column, mysql_connection, **options)
+        self.source_configs = source_configs  # การตั้งค่าการเชื่อมต่อของแต่ละระบบ
+        self.options = options
+        self.source_profiles = [config.get('profile', 'HOSXP') for config in source_configs]
+        self.source_errors = {}  # profile -> ข้อความ error ของระบบที่เชื่อมโยงไม่สำเร็จ
+    
+    def link(self):
+        """เชื่อมโยงทุกระบบพร้อมกัน แล้วรวมผลลัพธ์เป็นคอลัมน์แยกตามระบบ"""
+        workers = []
+        for config in self.source_configs:
+            worker = MySQLSearchThread(self.data, self.selected_column, MySQLConnection(config),
+                                       owner=self, **self.options)
+            # progress ของทุกระบบแสดงใน status bar เดียวกัน (ขึ้นต้นด้วยชื่อระบบ)
+            worker.reporter = ProgressReporter(
+                lambda message, value, maximum, profile=worker.mysql_connection.profile:
+                    self.progress.emit(f"[{profile}] {message}", value, maximum),
+                UI_CONFIG.get('progress_update_hz', 10), unit='คีย์')
+            workers.append(worker)
+        
+        with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+            outputs = list(executor.map(self._link_source, workers))
+        if all(matched is None for matched in outputs):
+            raise RuntimeError("; ".join(f"{profile}: {message}" for profile, message in self.source_errors.items()))
+        
+        found_parts = []
+        summaries = []
+        processed = []
+        self.keyed_rows = self.data.index[:0]
+        for worker, matched in zip(workers, outputs):
+            profile = worker.mysql_connection.profile
+            self.checkpoint_count += worker.checkpoint_count
+            self.query_error_count += worker.query_error_count
+            if matched is None:
+                summaries.append(f"{profile}: ผิดพลาด ({self.source_errors[profile]})")
+                continue
+            
+            self.keyed_rows = self.keyed_rows.union(worker.keyed_rows)
+            self.key_count = max(self.key_count, worker.key_count)
+            self.unique_key_count = max(self.unique_key_count, worker.unique_key_count)
+            found_parts.append(matched.rename(columns=lambda column: source_column(profile, column)))
+            summaries.append(f"{profile}: พบ {len(matched):,} แถว")
+            
+            # cid_check เหมือนกันทุกระบบ, processed รวมเป็นคอลัมน์เดียว, คอลัมน์อื่นแยกตามระบบ
+            flags = worker.row_flags if worker.row_flags is not None else pd.DataFrame(index=self.data.index)
+            if CID_CHECK_COLUMN in flags.columns and (self.row_flags is None or
+                                                     CID_CHECK_COLUMN not in self.row_flags.columns):
+                self._add_row_flag(flags[CID_CHECK_COLUMN])
+            for column in flags.columns:
+                if column in SOURCE_RESULT_COLUMNS:
+                    self._add_row_flag(flags[column].rename(source_column(profile, column)))
+            if PROCESSED_COLUMN in flags.columns:
+                processed.append(flags[PROCESSED_COLUMN] == PROCESSED_YES)
+        
+        self.cancelled = self.isInterruptionRequested()
+        if self.cancelled:
+            # แถวต้องค้นหาครบทุกระบบแล้วจึงนับว่าค้นหาแล้ว
+            done = pd.concat(processed, axis=1).all(axis=1) if processed else pd.Series(True, index=self.data.index)
+            self._mark_processed_rows(self.data.index[~done.to_numpy()])
+        
+        dedup_summary = next((worker.dedup_summary for worker in workers if worker.dedup_summary), '')
+        self.dedup_summary = "; ".join(summaries + ([dedup_summary] if dedup_summary else []))
+        return pd.concat(found_parts, axis=1) if found_parts else pd.DataFrame(index=self.data.index[:0])
+    
+    def _link_source(self, worker):
+        """เชื่อมโยงกับระบบหนึ่งบน connection ของตัวเอง (คืนค่า None ถ้าระบบนี้ผิดพลาด)"""
+        connection = worker.mysql_connection
+        started = time.monotonic()
+        try:
+            success, message = connection.connect()
+            if not success and self.strategy != STRATEGY_SNAPSHOT:
+                # โหมด snapshot ใช้ไฟล์ที่มีอยู่ได้แม้เชื่อมต่อไม่ได้
+                raise RuntimeError(message)
+            matched = worker.link()
+            link_logger.info("source %s finished matched=%d elapsed=%.2fs",
+                             connection.profile, len(matched), time.monotonic() - started)
+            worker.reporter.flush()
+            return matched
         except Exception as e:
-            self.error.emit(f"เกิดข้อผิดพลาดในการค้นหา: {str(e)}")
+            link_logger.exception("source %s failed", connection.profile)
+            self.source_errors[connection.profile] = str(e)
+            return None
+        finally:
+            connection.disconnect()
+    
+    def _key_columns(self):
+        """คอลัมน์คีย์ (ใช้เฉพาะใน log สรุป)"""
+        return [f"{profile}:{column}" for profile in self.source_profiles for column in super()._key_columns()]
+    
+    def _result_columns(self):
+        """คอลัมน์ผลลัพธ์แยกตามระบบ และคอลัมน์ pid_found ของทุกระบบ (พบในระบบใดระบบหนึ่งนับว่าพบ)"""
+        result_columns = [source_column(profile, column)
+                          for profile in self.source_profiles for column in SOURCE_RESULT_COLUMNS]
+        found_columns = [source_column(profile, FOUND_COLUMNS[0]) for profile in self.source_profiles]
+        return result_columns, found_columns
 
 
 class PandasModel(QAbstractTableModel):
@@ -574,6 +1473,10 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         # Threads
         self.excel_loader_thread = None
         self.mysql_search_thread = None # จะใช้ในภายหลัง
+        self.mysql_connect_thread = None
+        self.mysql_connect_notify = False  # แสดง dialog ผลการเชื่อมต่อหรือไม่ (ผู้ใช้สั่งเชื่อมต่อเอง)
+        self.cancelled_connect_threads = []  # thread ที่ถูกยกเลิกแต่ connect ยังไม่คืนค่า (เก็บไว้จนกว่าจะจบ)
+        self.partial_search_column = None  # คอลัมน์ของการเชื่อมโยงที่ถูกยกเลิกกลางคัน (ทำต่อได้)
 
         # Timer สำหรับการกระพริบปุ่ม
         self.blink_timer = QTimer()
@@ -584,6 +1487,15 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         # MySQL connection
         self.mysql_connection = MySQLConnection() if MySQLConnection else None
         
+        # ตรวจสอบการเชื่อมต่อเป็นระยะใน thread แยก (GUI อ่านเฉพาะสถานะที่ cache ไว้ ไม่ ping เอง)
+        self.connection_monitor = None
+        self.connection_status = None
+        if self.mysql_connection and ConnectionHealthMonitor:
+            self.connection_monitor = ConnectionHealthMonitor(self.mysql_connection,
+                                                              LINKAGE_CONFIG.get('health_check_seconds', 60))
+            self.connection_monitor.status_changed.connect(self._on_connection_status_changed)
+            self.connection_monitor.start()
+        
         # เชื่อมต่อ signals กับ slots
         self.setup_connections()
         
@@ -603,6 +1515,7 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         self.exportButton.clicked.connect(self.export_to_excel)
         self.clearButton.clicked.connect(self.clear_data)
         self.searchPopulationButton.clicked.connect(self.start_mysql_search)
+        self.cancelSearchButton.clicked.connect(self.cancel_mysql_search)
         
         # เพิ่มการจัดการ Double Click บนแถวข้อมูลในตาราง
         self.tableView.doubleClicked.connect(self.on_table_double_clicked)
@@ -613,6 +1526,7 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         
         # Column combo box
         self.columnComboBox.currentTextChanged.connect(self.on_column_selected)
+        self.strategyComboBox.currentIndexChanged.connect(self.on_strategy_selected)
           # Menu actions
         self.actionOpen.triggered.connect(self.browse_file)
         self.actionExport.triggered.connect(self.export_to_excel)
@@ -622,6 +1536,8 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         self.actionMySQLSettings.triggered.connect(self.open_mysql_settings)
         self.actionConnectMySQL.triggered.connect(self.connect_mysql)
         self.actionDisconnectMySQL.triggered.connect(self.disconnect_mysql)
+        self.actionCancelConnectMySQL.triggered.connect(self.cancel_mysql_connect)
+        self.cancelConnectButton.clicked.connect(self.cancel_mysql_connect)
         
     def setup_ui(self):
         """ตั้งค่า UI เริ่มต้น"""
@@ -688,9 +1604,19 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
             }
         """)
         
+        # ตัวเลือกวิธีการเชื่อมโยง
+        for strategy, label in LINKAGE_STRATEGIES.items():
+            self.strategyComboBox.addItem(label, strategy)
+        default_index = self.strategyComboBox.findData(LINKAGE_CONFIG.get('default_strategy', STRATEGY_PER_ROW))
+        self.strategyComboBox.setCurrentIndex(max(default_index, 0))
+        
         # ซ่อน column selection UI เมื่อเริ่มต้น
         self.columnLabel.setVisible(False)
         self.columnComboBox.setVisible(False)
+        self.strategyComboBox.setVisible(False)
+        self.bypassCacheCheckBox.setVisible(False)
+        self.fuzzyNameCheckBox.setVisible(False)
+        self.multiSourceCheckBox.setVisible(False)
         self.searchPopulationButton.setVisible(False)
           # ตั้งค่า status
         self.update_status(MESSAGES.get('ready', 'พร้อมใช้งาน'))
@@ -812,8 +1738,8 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         # แสดงเฉพาะข้อมูลใน status bar เท่านั้น
         
         self.browseButton.setEnabled(True)
-        if self.mysql_connection and self.mysql_connection.is_connected() and self.current_data is not None:
-             self.searchPopulationButton.setEnabled(True) # เปิดปุ่มค้นหาถ้าเชื่อมต่อ MySQL และมีข้อมูล
+        if self._is_search_available() and self.current_data is not None:
+             self.searchPopulationButton.setEnabled(True) # เปิดปุ่มค้นหาถ้าเชื่อมต่อ MySQL (หรือมี snapshot) และมีข้อมูล
 
         self.excel_loader_thread = None
 
@@ -940,9 +1866,13 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
             )
             
             if file_path:
+                started = time.monotonic()
                 # ใช้ pandas.to_excel() เพื่อ export เป็น Excel
                 with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
                     export_data.to_excel(writer, sheet_name='Data', index=False)
+                export_logger.info("excel exported file=%s rows=%d columns=%d elapsed=%.2fs",
+                                   os.path.basename(file_path), len(export_data), len(export_data.columns),
+                                   time.monotonic() - started)
                 
                 self._info_silent(
                     "สำเร็จ", 
@@ -955,6 +1885,7 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
                 self._update_additional_info(f"📁 {os.path.basename(file_path)}", "success")
                 
         except Exception as e:
+            export_logger.exception("excel export failed")
             error_msg = f"เกิดข้อผิดพลาดในการ export:\n{str(e)}"
             self._critical_silent("ข้อผิดพลาด", error_msg)
             self._update_status_and_progress("เกิดข้อผิดพลาดในการ export")
@@ -1131,7 +2062,7 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
             self._warning_silent("ไม่พร้อมใช้งาน", "ระบบอัปเดตไม่พร้อมใช้งาน")
     
     def auto_connect_mysql(self):
-        """เชื่อมต่อ MySQL อัตโนมัติถ้าตั้งค่าไว้"""
+        """เชื่อมต่อ MySQL อัตโนมัติถ้าตั้งค่าไว้ (ใน thread แยก หน้าต่างแสดงและใช้งานได้ทันที)"""
         if not self.mysql_connection:
             return
             
@@ -1139,11 +2070,7 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
             from mysql_config import MySQLConfigManager
             config = MySQLConfigManager.load_config()
             if config.get('auto_connect', 'false') == 'true':
-                success, message = self.mysql_connection.connect()
-                if success:
-                    self.update_status(f"เชื่อมต่อ MySQL สำเร็จ - {message}")
-                else:
-                    self.update_status(f"ไม่สามารถเชื่อมต่อ MySQL ได้ - {message}")
+                self._start_mysql_connect(notify=False)
         except Exception as e:
             self.update_status(f"ข้อผิดพลาดในการเชื่อมต่อ MySQL: {str(e)}")
     
@@ -1157,8 +2084,12 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         if dialog.exec_() == QtWidgets.QDialog.Accepted:
             # รีโหลด connection หลังจากการตั้งค่าใหม่
             if self.mysql_connection:
+                if self._is_mysql_connecting():
+                    self.cancel_mysql_connect()
                 self.mysql_connection.disconnect()
                 self.mysql_connection = MySQLConnection()
+                if self.connection_monitor:
+                    self.connection_monitor.set_connection(self.mysql_connection)
             self.update_status("อัปเดตการตั้งค่า MySQL แล้ว")
     
     def connect_mysql(self):
@@ -1167,36 +2098,143 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
             self._warning_silent("คำเตือน", "ไม่พบ MySQL connection module")
             return
             
-        success, message = self.mysql_connection.connect()
+        self._start_mysql_connect(notify=True)
+    
+    def _is_mysql_connecting(self):
+        """ตรวจสอบว่ากำลังเชื่อมต่อ MySQL อยู่หรือไม่"""
+        return self.mysql_connect_thread is not None and self.mysql_connect_thread.isRunning()
+    
+    def _start_mysql_connect(self, notify):
+        """เริ่มเชื่อมต่อ MySQL ใน thread แยก (notify: แสดง dialog ผลการเชื่อมต่อ)"""
+        if self._is_mysql_connecting():
+            self.mysql_connect_notify = self.mysql_connect_notify or notify
+            self.update_status("กำลังเชื่อมต่อ MySQL อยู่...")
+            return
+        
+        self.mysql_connect_notify = notify
+        self.mysql_connect_thread = MySQLConnectThread(self.mysql_connection)
+        self.mysql_connect_thread.finished.connect(self._on_mysql_connect_finished)
+        self._set_connecting_state(True)
+        self.update_status(f"กำลังเชื่อมต่อ MySQL ({self.mysql_connection.config.get('host', '')})...")
+        self._update_additional_info("⏳ กำลังเชื่อมต่อ MySQL", "info")
+        self.mysql_connect_thread.start()
+    
+    def _set_connecting_state(self, connecting):
+        """แสดง/ซ่อนปุ่มยกเลิกระหว่างกำลังเชื่อมต่อ"""
+        self.cancelConnectButton.setVisible(connecting)
+        self.actionCancelConnectMySQL.setEnabled(connecting)
+        self.actionConnectMySQL.setEnabled(not connecting)
+    
+    def _on_mysql_connect_finished(self, success, message):
+        """Slot เมื่อ thread เชื่อมต่อ MySQL ทำงานเสร็จ"""
+        thread = self.sender()
+        if thread is not self.mysql_connect_thread:
+            # thread ที่ถูกยกเลิกไปแล้ว: connect สำเร็จก่อนรับรู้การยกเลิก จึงตัดการเชื่อมต่อทิ้งที่นี่
+            if success:
+                thread.mysql_connection.disconnect()
+            return
+        
+        self.mysql_connect_thread = None
+        self._set_connecting_state(False)
         if success:
-            self._info_silent("สำเร็จ", f"เชื่อมต่อ MySQL สำเร็จ\n{message}")
-            self.update_status("เชื่อมต่อ MySQL แล้ว")
+            self.update_status(f"เชื่อมต่อ MySQL สำเร็จ - {message}")
+            self._update_additional_info("✅ เชื่อมต่อ MySQL แล้ว", "success")
+            if self.mysql_connect_notify:
+                self._info_silent("สำเร็จ", f"เชื่อมต่อ MySQL สำเร็จ\n{message}")
         else:
-            self._critical_silent("ข้อผิดพลาด", f"ไม่สามารถเชื่อมต่อ MySQL ได้\n{message}")
-            self.update_status("เชื่อมต่อ MySQL ไม่สำเร็จ")
+            self.update_status(f"ไม่สามารถเชื่อมต่อ MySQL ได้ - {message}")
+            self._update_additional_info("❌ เชื่อมต่อ MySQL ไม่สำเร็จ", "error")
+            if self.mysql_connect_notify:
+                self._critical_silent("ข้อผิดพลาด", f"ไม่สามารถเชื่อมต่อ MySQL ได้\n{message}")
+        self._refresh_search_button()
+    
+    def cancel_mysql_connect(self):
+        """ยกเลิกการเชื่อมต่อ MySQL ที่กำลังรออยู่"""
+        if not self._is_mysql_connecting():
+            return
+        
+        # connect ที่รออยู่หยุดกลางคันไม่ได้ ปล่อยให้ thread เดิมจบเอง (แล้วตัดการเชื่อมต่อทิ้ง)
+        # และเปลี่ยนไปใช้ connection ใหม่ GUI จึงไม่ต้องรอ lock ของ connection เดิม
+        thread = self.mysql_connect_thread
+        thread.requestInterruption()
+        self.cancelled_connect_threads = [t for t in self.cancelled_connect_threads if t.isRunning()]
+        self.cancelled_connect_threads.append(thread)
+        self.mysql_connect_thread = None
+        self.mysql_connection = MySQLConnection()
+        if self.connection_monitor:
+            self.connection_monitor.set_connection(self.mysql_connection)
+        
+        self._set_connecting_state(False)
+        self.update_status("ยกเลิกการเชื่อมต่อ MySQL แล้ว")
+        self._update_additional_info("ยกเลิกการเชื่อมต่อ MySQL", "warning")
+        self._refresh_search_button()
     
     def disconnect_mysql(self):
         """ตัดการเชื่อมต่อ MySQL"""
         if not self.mysql_connection:
             return
-            
-        if self.mysql_connection.is_connected():
+        
+        if self._is_mysql_connecting():
+            self.cancel_mysql_connect()
+        elif self.mysql_connection.status != CONNECTION_DISCONNECTED:
             self.mysql_connection.disconnect()
             self._info_silent("สำเร็จ", "ตัดการเชื่อมต่อ MySQL แล้ว")
             self.update_status("ตัดการเชื่อมต่อ MySQL แล้ว")
         else:
             self._info_silent("แจ้งเตือน", "ไม่ได้เชื่อมต่อ MySQL อยู่")
 
+    def _on_connection_status_changed(self, status, message):
+        """Slot เมื่อ health monitor พบว่าสถานะการเชื่อมต่อเปลี่ยน (หลุด หรือเชื่อมต่อใหม่สำเร็จ)"""
+        previous_status = self.connection_status
+        self.connection_status = status
+        if status in (CONNECTION_RECONNECTING, CONNECTION_LOST):
+            self.update_status(f"การเชื่อมต่อ MySQL หลุด - {message} (จะลองเชื่อมต่อใหม่อัตโนมัติ)")
+            self._update_additional_info("⚠️ MySQL หลุด", "warning")
+        elif status == CONNECTION_CONNECTED and previous_status in (CONNECTION_RECONNECTING, CONNECTION_LOST):
+            self.update_status("เชื่อมต่อ MySQL ใหม่สำเร็จ")
+        self._refresh_search_button()
+    
+    def _refresh_search_button(self):
+        """เปิด/ปิดปุ่มค้นหาตามสถานะการเชื่อมต่อ (ไม่เปลี่ยนระหว่างกำลังเชื่อมโยง)"""
+        if self.mysql_search_thread and self.mysql_search_thread.isRunning():
+            return
+        enable_search_button = (self._is_search_available() and 
+                                self.current_data is not None and 
+                                self.columnComboBox.currentText() not in ("", "-- ไม่เลือกคอลัมน์ --"))
+        self.searchPopulationButton.setEnabled(enable_search_button)
+    
+    def closeEvent(self, event):
+        """หยุด health monitor และรอ thread เบื้องหลัง (เชื่อมต่อ MySQL, ตรวจสอบอัปเดต) ที่ค้างอยู่ก่อนปิดโปรแกรม"""
+        if self.connection_monitor:
+            self.connection_monitor.stop()
+        background_threads = self.cancelled_connect_threads + [self.mysql_connect_thread, self.update_check_thread]
+        pending = [thread for thread in background_threads if thread is not None and thread.isRunning()]
+        if pending:
+            # connect/ตรวจสอบอัปเดตรอได้ไม่เกิน timeout ของแต่ละงาน ซ่อนหน้าต่างก่อนรอ ผู้ใช้จึงเห็นว่าปิดแล้วทันที
+            self.hide()
+            for thread in pending:
+                thread.requestInterruption()
+                thread.wait()
+        super().closeEvent(event)
+    
     def show_column_selection(self):
         """แสดง UI สำหรับเลือกคอลัมน์"""
         self.columnLabel.setVisible(True)
         self.columnComboBox.setVisible(True)
+        self.strategyComboBox.setVisible(True)
+        self.bypassCacheCheckBox.setVisible(True)
+        self.fuzzyNameCheckBox.setVisible(True)
+        self.multiSourceCheckBox.setVisible(True)
         self.searchPopulationButton.setVisible(True)
     
     def hide_column_selection(self):
         """ซ่อน UI สำหรับเลือกคอลัมน์"""
         self.columnLabel.setVisible(False)
         self.columnComboBox.setVisible(False)
+        self.strategyComboBox.setVisible(False)
+        self.bypassCacheCheckBox.setVisible(False)
+        self.fuzzyNameCheckBox.setVisible(False)
+        self.multiSourceCheckBox.setVisible(False)
         self.searchPopulationButton.setVisible(False)
         self.columnComboBox.clear()
     
@@ -1212,6 +2250,8 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
             supported_columns = ['pid', 'cid', 'hn']
             for column in supported_columns:
                 self.columnComboBox.addItem(column)
+            # เชื่อมโยงหลายคีย์ในรอบเดียว (cid ก่อน แถวที่ไม่พบค้นหาต่อด้วย hn แล้วจึง pid)
+            self.columnComboBox.addItem(CASCADE_OPTION)
                 
             # ตั้งค่าให้เลือกตัวเลือกแรก (ไม่เลือก)            self.columnComboBox.setCurrentIndex(0)
     
@@ -1222,33 +2262,79 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
             self.searchPopulationButton.setEnabled(False) # ปิดปุ่มค้นหาถ้าไม่เลือกคอลัมน์
             return
         
-        # เปิดใช้งานปุ่มค้นหาถ้าเลือกคอลัมน์ที่ถูกต้อง และเชื่อมต่อ MySQL แล้ว และมีข้อมูล
-        if self.mysql_connection and self.mysql_connection.is_connected() and self.current_data is not None:
+        # เปิดใช้งานปุ่มค้นหาถ้าเลือกคอลัมน์ที่ถูกต้อง และเชื่อมต่อ MySQL แล้ว (หรือมี snapshot) และมีข้อมูล
+        if self._is_search_available() and self.current_data is not None:
             self.searchPopulationButton.setEnabled(True)
         else:
             self.searchPopulationButton.setEnabled(False)
 
-        if self.current_data is not None and column_name in self.current_data.columns:
+        if self.current_data is not None and column_name == CASCADE_OPTION:
+            key_columns = [column for column in CASCADE_COLUMNS if column in self.current_data.columns]
+            if not key_columns:
+                self._update_status_and_progress(f"เลือกคอลัมน์: {column_name} (ไม่พบคอลัมน์ "
+                                                 f"{', '.join(CASCADE_COLUMNS)} ในข้อมูลปัจจุบัน)")
+                self.searchPopulationButton.setEnabled(False)
+                return
+            status_message = f"เชื่อมโยงหลายคีย์: {' → '.join(key_columns)} (ขั้นถัดไปค้นหาเฉพาะแถวที่ยังไม่พบ)"
+            if 'cid' in key_columns:
+                invalid_count = int((validate_cid(normalize_cid(self.current_data['cid'])) != '').sum())
+                if invalid_count:
+                    status_message += f" - CID ไม่ถูกต้อง {invalid_count:,} แถว จะค้นหาด้วยคีย์ถัดไป"
+            self._update_status_and_progress(status_message)
+        elif self.current_data is not None and column_name in self.current_data.columns:
             # แสดงข้อมูลของคอลัมน์ที่เลือก
             column_data = self.current_data[column_name]
             unique_values = column_data.nunique()
             null_count = column_data.isnull().sum()
             
-            self._update_status_and_progress(f"เลือกคอลัมน์: {column_name} (ค่าไม่ซ้ำ: {unique_values}, ค่าว่าง: {null_count})") # เปลี่ยนไปใช้ _update_status_and_progress
+            status_message = f"เลือกคอลัมน์: {column_name} (ค่าไม่ซ้ำ: {unique_values}, ค่าว่าง: {null_count})"
+            if column_name == 'cid':
+                # ตรวจสอบเลขบัตรประชาชนทั้งคอลัมน์ล่วงหน้า (แถวที่ไม่ถูกต้องจะไม่ถูกส่งไปค้นหา)
+                invalid_count = int((validate_cid(normalize_cid(column_data)) != '').sum())
+                if invalid_count:
+                    status_message += f" - CID ไม่ถูกต้อง {invalid_count:,} แถว จะไม่ถูกค้นหา"
+                    self._update_additional_info(f"⚠️ CID ไม่ถูกต้อง {invalid_count:,} แถว", "warning")
+            self._update_status_and_progress(status_message) # เปลี่ยนไปใช้ _update_status_and_progress
         elif self.current_data is not None:
             self._update_status_and_progress(f"เลือกคอลัมน์: {column_name} (ไม่พบในข้อมูลปัจจุบัน)") # เปลี่ยนไปใช้ _update_status_and_progress
             self.searchPopulationButton.setEnabled(False)
         else: # กรณี current_data is None
             self.searchPopulationButton.setEnabled(False)
     
+    def _is_search_available(self):
+        """ตรวจสอบว่าเชื่อมโยงข้อมูลได้หรือไม่ (เชื่อมต่อ MySQL แล้ว หรือเลือกโหมด snapshot ที่มีไฟล์อยู่แล้ว)"""
+        if not self.mysql_connection:
+            return False
+        if self.mysql_connection.status == CONNECTION_CONNECTED:
+            return True
+        if self.strategyComboBox.currentData() == STRATEGY_SNAPSHOT:
+            return self.mysql_connection.get_person_snapshot().exists()
+        return False
+    
+    def on_strategy_selected(self, _index):
+        """จัดการเมื่อเปลี่ยนวิธีการเชื่อมโยง"""
+        if self.mysql_search_thread and self.mysql_search_thread.isRunning():
+            return
+        enable_search_button = (self._is_search_available() and 
+                                self.current_data is not None and 
+                                self.columnComboBox.currentText() not in ("", "-- ไม่เลือกคอลัมน์ --"))
+        self.searchPopulationButton.setEnabled(enable_search_button)
+    
+    def _linkage_source_configs(self) -> list:
+        """การตั้งค่าการเชื่อมต่อของแต่ละระบบ (ตามลำดับ SOURCE_PROFILES) สำหรับการค้นหาทุกระบบ"""
+        configs = MySQLConfigManager.load_profile_configs() if MySQLConfigManager else {}
+        # profile ที่เชื่อมต่ออยู่ใช้การตั้งค่าปัจจุบันเสมอ
+        configs[self.mysql_connection.profile] = self.mysql_connection.config
+        return [configs[profile] for profile in SOURCE_PROFILES if profile in configs]
+
     def start_mysql_search(self):
         """เริ่มการเชื่อมโยงข้อมูลกับฐานข้อมูล MySQL โดยใช้ Thread"""
         if self.current_data is None:
             self._warning_silent("คำเตือน", "กรุณาโหลดข้อมูล Excel ก่อน")
             return
 
-        # ตรวจสอบการเชื่อมต่อฐานข้อมูลก่อนทำงานอื่นๆ
-        if not self.mysql_connection or not self.mysql_connection.is_connected():
+        # ตรวจสอบการเชื่อมต่อฐานข้อมูลก่อนทำงานอื่นๆ (โหมด snapshot ใช้งานได้โดยไม่ต้องเชื่อมต่อถ้ามี snapshot แล้ว)
+        if not self._is_search_available():
             self._warning_silent("คำเตือน", "กรุณาเชื่อมต่อฐานข้อมูลก่อน")
             self.searchPopulationButton.setEnabled(False)
             return
@@ -1261,6 +2347,17 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         if self.mysql_search_thread and self.mysql_search_thread.isRunning():
             self._info_silent("แจ้งเตือน", "กำลังค้นหาข้อมูลอยู่ กรุณารอสักครู่")
             return
+
+        source_configs = None
+        if self.multiSourceCheckBox.isChecked():
+            source_configs = self._linkage_source_configs()
+            if len(source_configs) < 2:
+                self._warning_silent(
+                    "คำเตือน",
+                    f"การค้นหาทุกระบบต้องมีการตั้งค่าการเชื่อมต่อของ {' และ '.join(SOURCE_PROFILES)}\n"
+                    f"กรุณาตั้งค่าและบันทึกการเชื่อมต่อของแต่ละระบบในการตั้งค่า MySQL ก่อน"
+                )
+                return
         
         # ปิดการใช้งาน UI elements
         self.searchPopulationButton.setEnabled(False)
@@ -1268,6 +2365,10 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         self.exportButton.setEnabled(False)
         self.clearButton.setEnabled(False)
         self.columnComboBox.setEnabled(False)
+        self.strategyComboBox.setEnabled(False)
+        self.bypassCacheCheckBox.setEnabled(False)
+        self.fuzzyNameCheckBox.setEnabled(False)
+        self.multiSourceCheckBox.setEnabled(False)
         self.actionOpen.setEnabled(False)
         self.actionExport.setEnabled(False)
         self.actionRefresh.setEnabled(False)
@@ -1275,13 +2376,91 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         self.actionConnectMySQL.setEnabled(False)
         self.actionDisconnectMySQL.setEnabled(False)
 
-        self.mysql_search_thread = MySQLSearchThread(self.current_data, selected_column, self.mysql_connection)
+        strategy = self.strategyComboBox.currentData() or STRATEGY_PER_ROW
+        if selected_column == CASCADE_OPTION:
+            key_columns = [column for column in CASCADE_COLUMNS if column in self.current_data.columns]
+        else:
+            key_columns = [selected_column]
+        if strategy != STRATEGY_SNAPSHOT:
+            # ค้นหาทุกระบบ: ตรวจทุก profile ที่จะค้นหา (profile ที่ยังไม่เคยเชื่อมต่อจะตรวจเมื่อเชื่อมต่อในขั้นค้นหา)
+            connections = ([MySQLConnection(config) for config in source_configs] if source_configs
+                           else [self.mysql_connection])
+            self._warn_unindexed_columns(connections, key_columns)
+        use_cache = not self.bypassCacheCheckBox.isChecked()
+        rows_to_search = self._ask_rows_to_search(selected_column)
+        search_options = dict(strategy=strategy, use_cache=use_cache,
+                              source_path=self.current_file_path,
+                              rows_to_search=rows_to_search,
+                              match_names=self.fuzzyNameCheckBox.isChecked())
+        if source_configs:
+            self.mysql_search_thread = MultiSourceSearchThread(self.current_data, selected_column,
+                                                               self.mysql_connection, source_configs,
+                                                               **search_options)
+        else:
+            self.mysql_search_thread = MySQLSearchThread(self.current_data, selected_column,
+                                                         self.mysql_connection, **search_options)
         self.mysql_search_thread.finished.connect(self._on_mysql_search_finished)
         self.mysql_search_thread.error.connect(self._on_mysql_search_error)
         self.mysql_search_thread.progress.connect(self._update_status_and_progress) # ใช้ slot เดิม
         self.mysql_search_thread.start()
         
         self._update_status_and_progress("กำลังเริ่มต้นค้นหาข้อมูลใน MySQL...")
+        self.cancelSearchButton.setEnabled(True)
+        self.cancelSearchButton.setVisible(True)
+    
+    def _warn_unindexed_columns(self, connections, key_columns):
+        """แจ้งเตือนคอลัมน์ค้นหาที่ไม่มี index (ระบบจะอ่านตาราง person ครั้งเดียวแล้วจับคู่ในเครื่องแทน)"""
+        unindexed = []
+        for connection in connections:
+            column_mapping = connection.get_column_mapping()
+            db_columns = dict.fromkeys(column_mapping.get(column, column) for column in key_columns
+                                       if not connection.is_key_indexed(column))
+            if db_columns:
+                names = ', '.join(db_columns)
+                unindexed.append(f"{connection.profile}: {names}" if len(connections) > 1 else names)
+        if not unindexed:
+            return
+        
+        db_column = '; '.join(unindexed)
+        self._warning_silent(
+            "คำเตือน",
+            f"คอลัมน์ {db_column} ในตาราง person ไม่มี index\n"
+            f"การค้นหาทีละคีย์จะช้ามาก (full table scan ทุกครั้ง)\n\n"
+            f"ระบบจะอ่านตาราง person ครั้งเดียวแล้วจับคู่ในเครื่องแทน\n"
+            f"(แนะนำให้ผู้ดูแลฐานข้อมูลสร้าง index ที่คอลัมน์ {db_column})"
+        )
+        self._update_additional_info(f"⚠️ {db_column} ไม่มี index", "warning")
+    
+    def _ask_rows_to_search(self, selected_column):
+        """
+        ถ้าข้อมูลปัจจุบันเป็นผลลัพธ์บางส่วนจากการยกเลิก ถามว่าจะทำต่อเฉพาะแถวที่เหลือหรือไม่
+        
+        Returns:
+            index ของแถวที่ต้องค้นหา หรือ None เพื่อค้นหาทุกแถว
+        """
+        if (self.partial_search_column != selected_column or
+                PROCESSED_COLUMN not in self.current_data.columns):
+            return None
+        remaining = self.current_data.index[self.current_data[PROCESSED_COLUMN] == PROCESSED_NO]
+        if len(remaining) == 0:
+            return None
+        reply = self._question_silent(
+            "ทำต่อ",
+            f"การเชื่อมโยงครั้งก่อนถูกยกเลิก ยังไม่ได้ค้นหา {len(remaining):,} แถว\n\n"
+            f"ต้องการค้นหาต่อเฉพาะแถวที่เหลือหรือไม่?\n"
+            f"(เลือก No เพื่อค้นหาใหม่ทั้งหมด)",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.Yes
+        )
+        return remaining if reply == QMessageBox.Yes else None
+    
+    def cancel_mysql_search(self):
+        """ขอให้หยุดการเชื่อมโยง (หยุดหลัง batch ปัจจุบัน แล้วส่งผลลัพธ์บางส่วนกลับมา)"""
+        if not (self.mysql_search_thread and self.mysql_search_thread.isRunning()):
+            return
+        self.mysql_search_thread.requestInterruption()
+        self.cancelSearchButton.setEnabled(False)
+        self._update_status_and_progress("กำลังยกเลิก... (รอให้ batch ปัจจุบันเสร็จ)")
     
     def _on_mysql_search_finished(self, updated_data, found_count, not_found_count):
         """Slot เมื่อ MySQLSearchThread ค้นหาข้อมูลเสร็จ"""
@@ -1297,21 +2476,40 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         # ตั้งค่า tooltip เริ่มต้นสำหรับ header
         self.setup_header_tooltips()
         
-        self._update_status_and_progress(f"เชื่อมโยงข้อมูลสำเร็จ - พบ {found_count} รายการ, ไม่พบ {not_found_count} รายการ")
+        thread = self.mysql_search_thread
+        if thread and thread.cancelled:
+            # ผลลัพธ์บางส่วน: แถวที่ยังไม่ได้ค้นหามี processed = N กดเชื่อมโยงอีกครั้งเพื่อทำต่อ
+            self.partial_search_column = thread.selected_column
+            status_message = (f"ยกเลิกการเชื่อมโยง - พบ {found_count} รายการ, ไม่พบ {not_found_count} รายการ, "
+                              f"ยังไม่ได้ค้นหา {thread.remaining_rows} แถว (กดเชื่อมโยงข้อมูลอีกครั้งเพื่อทำต่อ)")
+        else:
+            self.partial_search_column = None
+            status_message = f"เชื่อมโยงข้อมูลสำเร็จ - พบ {found_count} รายการ, ไม่พบ {not_found_count} รายการ"
+        if thread and thread.dedup_summary:
+            status_message += f" - {thread.dedup_summary}"
+        self._update_status_and_progress(status_message)
         
         # แสดงสถิติการค้นหาใน additional info
         total_records = found_count + not_found_count
         success_rate = (found_count / total_records * 100) if total_records > 0 else 0
-        self._update_additional_info(f"🔍 {success_rate:.1f}% match ({found_count}/{total_records})", "success" if success_rate >= 80 else "warning")
+        if thread and thread.cancelled:
+            self._update_additional_info(f"⏸️ ค้นหาแล้วบางส่วน, เหลือ {thread.remaining_rows} แถว", "warning")
+        else:
+            self._update_additional_info(f"🔍 {success_rate:.1f}% match ({found_count}/{total_records})", "success" if success_rate >= 80 else "warning")
         
         # ไม่แสดง MessageBox เพื่อให้ workflow ต่อเนื่อง
         # แสดงผลลัพธ์เฉพาะใน status bar เท่านั้น
         
         # เปิดการใช้งาน UI elements
+        self.cancelSearchButton.setVisible(False)
         self.browseButton.setEnabled(True)
         self.exportButton.setEnabled(True)
         self.clearButton.setEnabled(True)
         self.columnComboBox.setEnabled(True)
+        self.strategyComboBox.setEnabled(True)
+        self.bypassCacheCheckBox.setEnabled(True)
+        self.fuzzyNameCheckBox.setEnabled(True)
+        self.multiSourceCheckBox.setEnabled(True)
         self.actionOpen.setEnabled(True)
         self.actionExport.setEnabled(True)
         self.actionRefresh.setEnabled(True)
@@ -1320,8 +2518,7 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         self.actionDisconnectMySQL.setEnabled(True)
 
         # เปิด/ปิดปุ่ม searchPopulationButton ตามเงื่อนไข
-        enable_search_button = (self.mysql_connection and 
-                                self.mysql_connection.is_connected() and 
+        enable_search_button = (self._is_search_available() and 
                                 self.current_data is not None and 
                                 self.columnComboBox.currentText() != "-- ไม่เลือกคอลัมน์ --")
         self.searchPopulationButton.setEnabled(enable_search_button)
@@ -1334,10 +2531,15 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         self._update_status_and_progress(f"เกิดข้อผิดพลาดในการเชื่อมโยงข้อมูล: {error_message}")
         
         # เปิดการใช้งาน UI elements (เหมือนใน _on_mysql_search_finished)
+        self.cancelSearchButton.setVisible(False)
         self.browseButton.setEnabled(True)
         self.exportButton.setEnabled(True)
         self.clearButton.setEnabled(True)
         self.columnComboBox.setEnabled(True)
+        self.strategyComboBox.setEnabled(True)
+        self.bypassCacheCheckBox.setEnabled(True)
+        self.fuzzyNameCheckBox.setEnabled(True)
+        self.multiSourceCheckBox.setEnabled(True)
         self.actionOpen.setEnabled(True)
         self.actionExport.setEnabled(True)
         self.actionRefresh.setEnabled(True)
@@ -1346,8 +2548,7 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         self.actionDisconnectMySQL.setEnabled(True)
 
         # เปิด/ปิดปุ่ม searchPopulationButton ตามเงื่อนไข
-        enable_search_button = (self.mysql_connection and 
-                                self.mysql_connection.is_connected() and 
+        enable_search_button = (self._is_search_available() and 
                                 self.current_data is not None and 
                                 self.columnComboBox.currentText() != "-- ไม่เลือกคอลัมน์ --")
         self.searchPopulationButton.setEnabled(enable_search_button)
@@ -1617,6 +2818,16 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
             
             if hasattr(self, 'columnComboBox'):
                 self.columnComboBox.setToolTip("📝 เลือกคอลัมน์สำหรับค้นหาใน MySQL")
+            
+            if hasattr(self, 'bypassCacheCheckBox'):
+                self.bypassCacheCheckBox.setToolTip("♻️ ค้นหาจาก MySQL ทุกรายการโดยไม่ใช้ผลลัพธ์ที่เก็บไว้ในแคช\n(ผลลัพธ์ใหม่จะไม่ถูกบันทึกลงแคช)")
+            if hasattr(self, 'fuzzyNameCheckBox'):
+                self.fuzzyNameCheckBox.setToolTip("🔤 แถวที่ค้นหาด้วยคีย์ไม่พบ จับคู่ต่อด้วยชื่อ-นามสกุล (fname, lname) แบบใกล้เคียง\n(ผลลัพธ์มีคะแนนความคล้ายในคอลัมน์ name_score ควรตรวจสอบก่อนใช้งาน)")
+            if hasattr(self, 'multiSourceCheckBox'):
+                self.multiSourceCheckBox.setToolTip("🏥 เชื่อมโยงกับ HOSXP และ JHCIS พร้อมกัน ผลลัพธ์แยกคอลัมน์ตามระบบ (hosxp_*, jhcis_*)\n(ต้องตั้งค่าและบันทึกการเชื่อมต่อของแต่ละระบบในการตั้งค่า MySQL ก่อน)")
+            
+            if hasattr(self, 'strategyComboBox'):
+                self.strategyComboBox.setToolTip("⚡ เลือกวิธีการเชื่อมโยง\n(แบบกลุ่มจะค้นหาหลายพันรายการต่อ 1 query เหมาะกับไฟล์ขนาดใหญ่)")
                 
         except Exception as e:
             print(f"Warning: ไม่สามารถตั้งค่า tooltips ได้: {e}")
@@ -1822,8 +3033,10 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         try:
             if AUTO_UPDATER_AVAILABLE:
                 # ตรวจสอบแบบ background ไม่แสดง popup
+                if self.update_check_thread and self.update_check_thread.isRunning():
+                    return
                 updater = AutoUpdater(parent=self)
-                updater.check_for_updates_background(callback=self.on_update_available)
+                self.update_check_thread = updater.check_for_updates_background(callback=self.on_update_available)
             else:
                 print("⚠️ ระบบตรวจสอบอัปเดตไม่พร้อมใช้งาน")
         except Exception as e:
@@ -1848,8 +3061,10 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
         try:
             if AUTO_UPDATER_AVAILABLE:
                 # เรียกใช้ auto updater แบบเบื้องหลัง
+                if self.update_check_thread and self.update_check_thread.isRunning():
+                    return
                 updater = AutoUpdater(parent=self)
-                updater.check_for_updates_background(callback=self.on_update_available)
+                self.update_check_thread = updater.check_for_updates_background(callback=self.on_update_available)
             else:
                 print("⚠️ ระบบตรวจสอบอัปเดตไม่พร้อมใช้งาน")
         except Exception as e:
@@ -1964,6 +3179,7 @@ class ExchangeUnsenApp(ExchangeUnsenUI):
 
 def main():
     """ฟังก์ชันหลักสำหรับรันแอปพลิเคชัน"""
+    setup_logging()
     app = QApplication(sys.argv)
     
     # ตั้งค่า app icon สำหรับ taskbar
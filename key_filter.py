@@ -0,0 +1,201 @@
+"""
+Person Key Filter
+Bloom filter ของคีย์ค้นหา (pid, cid, hn) ทั้งตาราง person เก็บเป็นไฟล์ในเครื่อง
+
+ใช้คัดคีย์ที่ไม่มีในฐานข้อมูลแน่นอนออกก่อนค้นหา จึงไม่ต้อง query คีย์เหล่านั้นเลย
+(Bloom filter ไม่มี false negative: คีย์ที่ตอบว่าไม่มีคือไม่มีจริง ส่วนคีย์ที่ตอบว่าอาจมีจะถูกค้นหาใน MySQL ตามปกติ)
+"""
+
+import json
+import math
+import os
+import re
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from linkage import db_key_forms, search_key_forms
+
+
+class KeyBloomFilter:
+    """
+    Bloom filter ของคีย์ชนิด str (hash แบบ vectorized ด้วย pandas ทั้งคอลัมน์ในครั้งเดียว)
+
+    เก็บค่าจากฐานข้อมูลในรูปแบบของ db_key_forms และตรวจคีย์ที่ค้นหาด้วยทุกรูปแบบของ search_key_forms
+    (คีย์ที่ MySQL ถือว่าเท่ากัน เช่น '00123' กับ hn ชนิด int 123 หรือ 'AB12 ' กับ 'ab12' ต้อง hash ได้ค่าเดียวกัน
+    ไม่เช่นนั้นจะเกิด false negative)
+    """
+
+    # hash_key ของ pd.util.hash_pandas_object (16 ตัวอักษร) สำหรับ hash 2 ชุด (double hashing)
+    HASH_KEYS = ('person-key-bf-01', 'person-key-bf-02')
+
+    def __init__(self, size_bits: int, hash_count: int, bits: np.ndarray = None, count: int = 0):
+        self.size_bits = max(int(size_bits), 8)
+        self.hash_count = max(int(hash_count), 1)
+        self.bits = bits if bits is not None else np.zeros(self.size_bits, dtype=bool)
+        self.count = count  # จำนวนคีย์ที่เพิ่มแล้ว (รวมคีย์ซ้ำ)
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float = 0.01) -> 'KeyBloomFilter':
+        """สร้าง filter ว่างขนาดพอดีกับจำนวนคีย์และอัตรา false positive ที่ต้องการ"""
+        capacity = max(int(capacity), 1)
+        size_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        hash_count = round(size_bits / capacity * math.log(2))
+        return cls(size_bits, hash_count)
+
+    @property
+    def capacity(self) -> int:
+        """จำนวนคีย์ที่รองรับได้โดยอัตรา false positive ยังใกล้ค่าที่ออกแบบไว้"""
+        return int(self.size_bits * math.log(2) / self.hash_count)
+
+    @classmethod
+    def hash_keys(cls, keys: pd.Series) -> np.ndarray:
+        """hash คีย์ (รูปแบบจาก db_key_forms/search_key_forms) เป็น array ขนาด n x 2 ชนิด uint64"""
+        return np.column_stack([pd.util.hash_pandas_object(keys, index=False, hash_key=hash_key).to_numpy()
+                                for hash_key in cls.HASH_KEYS])
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        """ตำแหน่งบิตของแต่ละคีย์ (h1 + i * h2) mod m ขนาด n x hash_count"""
+        steps = np.arange(self.hash_count, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            combined = hashes[:, :1] + steps * (hashes[:, 1:] | np.uint64(1))
+        return combined % np.uint64(self.size_bits)
+
+    def add_hashes(self, hashes: np.ndarray):
+        """เพิ่มคีย์จาก hash_keys"""
+        if len(hashes):
+            self.bits[self._positions(hashes)] = True
+            self.count += len(hashes)
+
+    def add(self, values: pd.Series):
+        """เพิ่มค่าคีย์จากฐานข้อมูล (ก่อนแปลงรูปแบบ)"""
+        self.add_hashes(self.hash_keys(db_key_forms(values)))
+
+    def might_contain(self, keys: Sequence[str]) -> np.ndarray:
+        """
+        ตรวจสอบคีย์ทั้งชุด
+
+        Returns:
+            np.ndarray: bool ตามลำดับคีย์ (False = ไม่มีในตารางแน่นอน, True = อาจมี ต้องค้นหาจริง)
+        """
+        keys = pd.Series(list(keys), dtype=object).astype(str)
+        if keys.empty:
+            return np.zeros(0, dtype=bool)
+        # คีย์อาจมีได้ถ้ารูปแบบใดรูปแบบหนึ่งของคีย์อาจมี
+        forms = search_key_forms(keys)
+        present = pd.Series(self.bits[self._positions(self.hash_keys(forms))].all(axis=1), index=forms.index)
+        return present.groupby(level=0).any().reindex(keys.index, fill_value=False).to_numpy()
+
+
+class PersonKeyFilter:
+    """ไฟล์ Bloom filter ของคอลัมน์ค้นหาในตาราง person สำหรับ profile และฐานข้อมูลหนึ่งๆ"""
+
+    FORMAT_VERSION = 2
+
+    def __init__(self, directory: str, profile: str, config: Dict[str, str]):
+        name = f"{profile}_{config.get('host', '')}_{config.get('port', '')}_{config.get('database', '')}"
+        name = re.sub(r'[^0-9A-Za-z_.-]+', '_', name)
+        # เปลี่ยน FORMAT_VERSION เมื่อเปลี่ยนรูปแบบคีย์ที่ hash (ไฟล์รุ่นเก่าจะไม่ถูกใช้และสร้างใหม่ทั้งตาราง)
+        self.path = os.path.join(directory, f"person_keys_v{self.FORMAT_VERSION}_{name}.npz")
+        self.state_path = os.path.join(directory, f"person_keys_v{self.FORMAT_VERSION}_{name}.json")
+        self.filters: Dict[str, KeyBloomFilter] = {}  # คอลัมน์ในฐานข้อมูล -> filter
+
+    def exists(self) -> bool:
+        """ตรวจสอบว่ามีไฟล์ filter แล้วหรือไม่"""
+        return os.path.isfile(self.path)
+
+    def load(self) -> Dict[str, KeyBloomFilter]:
+        """โหลด filter ทุกคอลัมน์จากไฟล์ (เก็บเป็นบิตที่ pack แล้ว)"""
+        filters = {}
+        with np.load(self.path) as stored:
+            for db_column in json.loads(str(stored['columns'])):
+                size_bits, hash_count, count = stored[f"meta_{db_column}"].tolist()
+                bits = np.unpackbits(stored[f"bits_{db_column}"], count=size_bits).astype(bool)
+                filters[db_column] = KeyBloomFilter(size_bits, hash_count, bits, count)
+        self.filters = filters
+        return filters
+
+    def save(self):
+        """บันทึก filter ลงไฟล์ (เขียนไฟล์ชั่วคราวก่อนแล้วค่อยแทนที่ เพื่อไม่ให้ไฟล์เสียถ้าถูกขัดจังหวะ)"""
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        arrays = {'columns': np.array(json.dumps(list(self.filters)))}
+        for db_column, key_filter in self.filters.items():
+            arrays[f"bits_{db_column}"] = np.packbits(key_filter.bits)
+            arrays[f"meta_{db_column}"] = np.array([key_filter.size_bits, key_filter.hash_count, key_filter.count],
+                                                   dtype=np.int64)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            np.savez(file, **arrays)
+        os.replace(temp_path, self.path)
+
+    def build(self, chunks: Iterable[pd.DataFrame], db_columns: List[str], error_rate: float = 0.01,
+              headroom: float = 1.2) -> int:
+        """
+        สร้าง filter ใหม่จากผลลัพธ์ที่ทยอยอ่านจากตาราง person (อ่านทั้งตารางครั้งเดียว)
+
+        เก็บเฉพาะ hash ของคีย์ระหว่างอ่าน (16 ไบต์ต่อคีย์) แล้วจึงสร้าง filter ให้ขนาดพอดีกับจำนวนคีย์จริง
+        เผื่อที่ไว้สำหรับแถวใหม่ที่เพิ่มทีละส่วนก่อนสร้างใหม่ครั้งถัดไป
+
+        Returns:
+            int: จำนวนแถวที่อ่าน
+        """
+        hashes = {db_column: [] for db_column in db_columns}
+        total_rows = 0
+        for chunk in chunks:
+            total_rows += len(chunk)
+            for db_column in db_columns:
+                hashes[db_column].append(KeyBloomFilter.hash_keys(db_key_forms(chunk[db_column])))
+
+        self.filters = {}
+        for db_column, parts in hashes.items():
+            column_hashes = np.concatenate(parts) if parts else np.zeros((0, 2), dtype=np.uint64)
+            key_filter = KeyBloomFilter.for_capacity(len(column_hashes) * headroom, error_rate)
+            key_filter.add_hashes(column_hashes)
+            self.filters[db_column] = key_filter
+        self.save()
+        return total_rows
+
+    def add_rows(self, chunks: Iterable[pd.DataFrame]) -> int:
+        """
+        เพิ่มคีย์ของแถวใหม่/แถวที่แก้ไขเข้า filter เดิม (คีย์เดิมที่ถูกลบหรือแก้ยังอยู่ใน filter จนกว่าจะสร้างใหม่
+        ซึ่งทำให้ค้นหาเกินเท่านั้น ไม่ทำให้พลาดคีย์ที่มีอยู่จริง)
+
+        Returns:
+            int: จำนวนแถวที่เพิ่ม
+        """
+        total_rows = 0
+        for chunk in chunks:
+            total_rows += len(chunk)
+            for db_column, key_filter in self.filters.items():
+                key_filter.add(chunk[db_column])
+        if total_rows:
+            self.save()
+        return total_rows
+
+    def is_overfilled(self) -> bool:
+        """มีคีย์เกินขนาดที่ออกแบบไว้ (อัตรา false positive สูงขึ้น ควรสร้างใหม่)"""
+        return any(key_filter.count > key_filter.capacity for key_filter in self.filters.values())
+
+    def might_contain(self, db_column: str, keys: Sequence[str]) -> np.ndarray:
+        """ตรวจสอบคีย์ของคอลัมน์ค้นหา (ไม่มี filter ของคอลัมน์นี้ = อาจมีทุกคีย์)"""
+        key_filter = self.filters.get(db_column)
+        if key_filter is None:
+            return np.ones(len(keys), dtype=bool)
+        return key_filter.might_contain(keys)
+
+    def load_state(self) -> Dict:
+        """โหลดสถานะการสร้าง/อัปเดต filter (high-water mark)"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_state(self, state: Dict):
+        """บันทึกสถานะการสร้าง/อัปเดต filter (high-water mark)"""
+        with open(self.state_path, 'w', encoding='utf-8') as file:
+            json.dump(state, file, ensure_ascii=False, indent=2)
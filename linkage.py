@@ -0,0 +1,643 @@
+"""
+Linkage helpers สำหรับเชื่อมโยงข้อมูล Excel กับตาราง person ใน MySQL
+"""
+
+import re
+import threading
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# คอลัมน์ผลลัพธ์ที่เพิ่มเข้าไปในข้อมูลหลังการเชื่อมโยง (เรียงตามลำดับของ get_person_query_columns)
+FOUND_COLUMNS = ['pid_found', 'cid_found', 'fname_found', 'lname_found', 'hn_found']
+
+# วิธีการเชื่อมโยงที่รองรับ
+STRATEGY_PER_ROW = 'per_row'
+STRATEGY_IN_LIST = 'in_list'
+STRATEGY_TEMP_TABLE = 'temp_table'
+STRATEGY_PARALLEL = 'parallel_in_list'
+STRATEGY_SNAPSHOT = 'snapshot'
+
+# ใช้อัตโนมัติเมื่อคอลัมน์ค้นหาไม่มี index: ดึงคอลัมน์ค้นหาทั้งตารางครั้งเดียวแล้วจับคู่ในเครื่อง (ไม่แสดงให้เลือก)
+STRATEGY_LOCAL_JOIN = 'local_join'
+
+LINKAGE_STRATEGIES = {
+    STRATEGY_PER_ROW: 'ค้นหาทีละแถว',
+    STRATEGY_IN_LIST: 'ค้นหาแบบกลุ่ม (IN)',
+    STRATEGY_TEMP_TABLE: 'JOIN ผ่านตารางชั่วคราว',
+    STRATEGY_PARALLEL: 'ค้นหาแบบกลุ่มขนาน (หลาย connection)',
+    STRATEGY_SNAPSHOT: 'Snapshot ในเครื่อง (ออฟไลน์ได้)'
+}
+
+# คอลัมน์ผลการตรวจสอบเลขบัตรประชาชน ('' = ถูกต้อง หรือเหตุผลที่ไม่ถูกต้อง)
+CID_CHECK_COLUMN = 'cid_check'
+
+# คอลัมน์บอกว่าแถวถูกค้นหาแล้วหรือยัง (เพิ่มเฉพาะผลลัพธ์บางส่วนเมื่อยกเลิกกลางคัน)
+PROCESSED_COLUMN = 'processed'
+PROCESSED_YES = 'Y'
+PROCESSED_NO = 'N'
+
+# การเชื่อมโยงแบบหลายคีย์: ค้นหาด้วย cid ก่อน แถวที่ไม่พบค้นหาต่อด้วย hn แล้วจึง pid
+CASCADE_COLUMNS = ['cid', 'hn', 'pid']
+CASCADE_OPTION = 'cid → hn → pid'  # ตัวเลือกใน dropdown คอลัมน์
+MATCHED_BY_COLUMN = 'matched_by'  # คอลัมน์คีย์ที่จับคู่ได้ของแต่ละแถว (แบบหลายคีย์หรือจับคู่ชื่อ)
+
+# คะแนนความคล้ายของชื่อ-นามสกุล (0-1) ของแถวที่จับคู่ด้วยชื่อ (ดู name_matching)
+NAME_SCORE_COLUMN = 'name_score'
+MATCHED_BY_NAME = 'name'  # ค่าใน matched_by ของแถวที่จับคู่ด้วยชื่อ
+
+# จำนวนแถวในตาราง person ที่มีคีย์เดียวกัน (นับจากผลลัพธ์ของการค้นหาแบบกลุ่ม) และ flag คีย์กำกวม
+# ('Y' = พบหลายแถว ใช้แถวแรก, 'N' = พบแถวเดียว, '' = ไม่พบหรือไม่ทราบ เช่น ผลลัพธ์จากแคช)
+MATCH_COUNT_COLUMN = 'match_count'
+AMBIGUOUS_COLUMN = 'ambiguous'
+AMBIGUOUS_YES = 'Y'
+AMBIGUOUS_NO = 'N'
+
+# คอลัมน์รายแถวที่การเชื่อมโยงเพิ่มเข้าไป (ถูกแทนที่ทุกครั้งที่เชื่อมโยงใหม่)
+RESULT_FLAG_COLUMNS = [CID_CHECK_COLUMN, MATCHED_BY_COLUMN, NAME_SCORE_COLUMN,
+                       MATCH_COUNT_COLUMN, AMBIGUOUS_COLUMN, PROCESSED_COLUMN]
+
+# profile ที่เชื่อมโยงพร้อมกันได้ และคอลัมน์ผลลัพธ์ที่แยกตามแหล่งข้อมูล (เช่น hosxp_pid_found)
+SOURCE_PROFILES = ['HOSXP', 'JHCIS']
+SOURCE_RESULT_COLUMNS = FOUND_COLUMNS + [MATCHED_BY_COLUMN, NAME_SCORE_COLUMN, MATCH_COUNT_COLUMN, AMBIGUOUS_COLUMN]
+CID_INVALID_FORMAT = 'รูปแบบไม่ถูกต้อง (ต้องเป็นตัวเลข 13 หลัก)'
+CID_INVALID_CHECKSUM = 'เลขตรวจสอบหลักที่ 13 ไม่ถูกต้อง'
+
+# แปลงเลขไทยเป็นเลขอารบิก
+THAI_DIGITS = str.maketrans('๐๑๒๓๔๕๖๗๘๙', '0123456789')
+
+# คีย์ที่เป็นตัวเลข (MySQL แปลงเป็นตัวเลขเมื่อเทียบกับคอลัมน์ชนิดตัวเลข เช่น '00123' ตรงกับ 123)
+NUMERIC_KEY_PATTERN = re.compile(r'-?[0-9]+(\.[0-9]+)?')
+
+# ชื่อ TEMPORARY TABLE สำหรับเก็บคีย์จาก Excel (มองเห็นเฉพาะใน session ของ connection นั้น)
+TEMP_KEY_TABLE = 'tmp_linkage_keys'
+
+
+def iter_chunks(items: Sequence, size: int) -> Iterator[Sequence]:
+    """
+    แบ่งรายการออกเป็นกลุ่มย่อย
+
+    Args:
+        items: รายการที่ต้องการแบ่ง
+        size: จำนวนสมาชิกสูงสุดต่อกลุ่ม
+
+    Yields:
+        Sequence: รายการย่อยทีละกลุ่ม
+    """
+    size = max(int(size), 1)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def normalize_keys(values: pd.Series) -> pd.Series:
+    """
+    แปลงค่าคีย์จาก Excel ให้อยู่ในรูปแบบเดียวกันก่อนค้นหา (ทำทั้งคอลัมน์ในครั้งเดียว)
+
+    - ตัดแถวที่ว่าง (NaN หรือช่องว่างล้วน)
+    - ตัวเลขที่ pandas อ่านเป็น float (เช่น 1234.0 เพราะคอลัมน์มีช่องว่าง) แปลงเป็น "1234"
+    - ตัดช่องว่างหน้าและหลัง
+
+    Args:
+        values: คอลัมน์คีย์จาก Excel
+
+    Returns:
+        pd.Series: คีย์ชนิด str ของแถวที่ไม่ว่าง (index เดียวกับข้อมูลเดิม)
+    """
+    keys = values.dropna()
+    if pd.api.types.is_float_dtype(keys) and (keys % 1 == 0).all():
+        keys = keys.astype('int64')
+    keys = keys.astype(str).str.strip()
+    # ค่าตัวเลขที่ปนอยู่ในคอลัมน์ข้อความ (object) จะได้รูปแบบ "1234.0"
+    keys = keys.str.replace(r'^(\d+)\.0+$', r'\1', regex=True)
+    return keys[keys != '']
+
+
+def normalize_cid(values: pd.Series) -> pd.Series:
+    """
+    ทำความสะอาดเลขบัตรประชาชนทั้งคอลัมน์ในครั้งเดียว
+
+    นอกจาก normalize_keys แล้วยังแปลงเลขไทย ตัดขีด/ช่องว่าง และแปลงข้อความแบบ
+    scientific notation (เช่น "1.10170020345E+12" จาก Excel) เป็นตัวเลขเต็ม
+
+    Args:
+        values: คอลัมน์เลขบัตรประชาชนจาก Excel
+
+    Returns:
+        pd.Series: เลขบัตรประชาชนชนิด str ของแถวที่ไม่ว่าง (index เดียวกับข้อมูลเดิม)
+    """
+    cids = normalize_keys(values).str.translate(THAI_DIGITS)
+    cids = cids.str.replace(r'[\s\-]', '', regex=True)
+
+    scientific = cids.str.fullmatch(r'[0-9]+(\.[0-9]+)?[eE]\+?[0-9]+')
+    if scientific.any():
+        numbers = pd.to_numeric(cids[scientific], errors='coerce').dropna()
+        cids.loc[numbers.index] = numbers.round().astype('int64').astype(str)
+    return cids[cids != '']
+
+
+def validate_cid(cids: pd.Series) -> pd.Series:
+    """
+    ตรวจสอบรูปแบบและเลขตรวจสอบ (mod 11) ของเลขบัตรประชาชนแบบ vectorized
+
+    หลักที่ 13 = (11 - (ผลรวมของหลักที่ 1-12 คูณน้ำหนัก 13..2) mod 11) mod 10
+
+    Args:
+        cids: เลขบัตรประชาชนจาก normalize_cid
+
+    Returns:
+        pd.Series: เหตุผลที่ไม่ถูกต้อง ('' = ถูกต้อง) index เดียวกับ cids
+    """
+    reasons = pd.Series('', index=cids.index, dtype=object)
+    well_formed = cids.str.fullmatch(r'[0-9]{13}').fillna(False).astype(bool)
+    reasons[~well_formed] = CID_INVALID_FORMAT
+
+    candidates = cids[well_formed]
+    if len(candidates):
+        digits = (np.frombuffer(''.join(candidates).encode('ascii'), dtype=np.uint8)
+                  .reshape(-1, 13).astype(np.int64) - ord('0'))
+        weights = np.arange(13, 1, -1)
+        check_digits = (11 - (digits[:, :12] * weights).sum(axis=1) % 11) % 10
+        reasons[candidates.index[check_digits != digits[:, 12]]] = CID_INVALID_CHECKSUM
+    return reasons
+
+
+def source_column(profile: str, column: str) -> str:
+    """ชื่อคอลัมน์ผลลัพธ์ของแหล่งข้อมูล (profile) หนึ่งเมื่อเชื่อมโยงหลายระบบพร้อมกัน"""
+    return f"{profile.lower()}_{column}"
+
+
+def describe_dedup(total_keys: int, unique_keys: int) -> str:
+    """สรุปผลการตัดคีย์ซ้ำสำหรับแสดงใน status bar"""
+    if total_keys <= 0:
+        return "ไม่มีคีย์สำหรับค้นหา"
+    saved_percent = (total_keys - unique_keys) / total_keys * 100
+    return f"คีย์ไม่ซ้ำ {unique_keys:,}/{total_keys:,} แถว (ลดการค้นหา {saved_percent:.1f}%)"
+
+
+def build_result_table(results: Dict[str, Tuple]) -> pd.DataFrame:
+    """แปลงผลลัพธ์ (คีย์ -> ค่าตามลำดับ FOUND_COLUMNS) เป็นตาราง index คือคีย์"""
+    return pd.DataFrame.from_dict(results, orient='index', columns=FOUND_COLUMNS, dtype=object)
+
+
+def match_rows(search_keys: pd.Series, result_table: pd.DataFrame) -> pd.DataFrame:
+    """
+    จับคู่คีย์ของแต่ละแถวกับตารางผลลัพธ์ด้วยการ join ครั้งเดียว
+
+    Args:
+        search_keys: คีย์ของแต่ละแถวที่ค้นหา (index เดียวกับ data จาก normalize_keys)
+        result_table: ตารางผลลัพธ์ index คือคีย์ คอลัมน์ตาม FOUND_COLUMNS
+
+    Returns:
+        pd.DataFrame: คอลัมน์ FOUND_COLUMNS เฉพาะแถวที่พบ (index เดียวกับ data)
+    """
+    matched = search_keys.rename('_search_key').to_frame().join(result_table.astype(object),
+                                                               on='_search_key', how='inner')
+    return matched[FOUND_COLUMNS]
+
+
+def attach_results(data: pd.DataFrame, matched_rows: pd.DataFrame,
+                   row_flags: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    ต่อผลลัพธ์เข้ากับข้อมูล Excel โดยวางคอลัมน์ FOUND_COLUMNS ไว้หน้าสุด
+
+    Args:
+        data: ข้อมูล Excel (ไม่ถูกแก้ไข)
+        matched_rows: ผลลัพธ์รายแถวเฉพาะแถวที่พบ (จาก match_rows หรือคอลัมน์แยกตามแหล่งข้อมูล)
+        row_flags: คอลัมน์เพิ่มเติมรายแถว (index เดียวกับ data) วางต่อจาก FOUND_COLUMNS
+
+    Returns:
+        pd.DataFrame: ข้อมูลที่มีคอลัมน์ผลลัพธ์ (แถวที่ไม่พบเป็นค่าว่าง)
+    """
+    found = matched_rows.astype(object)
+    if row_flags is not None:
+        found = found.join(row_flags.astype(object), how='outer')
+    found = found.reindex(data.index).fillna('')
+
+    # ผลการค้นหาครั้งก่อน (ถ้ามี) ถูกแทนที่ด้วยผลลัพธ์ใหม่
+    replaced = set(found.columns) | set(RESULT_FLAG_COLUMNS)
+    replaced.update(source_column(profile, column)
+                    for profile in SOURCE_PROFILES for column in SOURCE_RESULT_COLUMNS)
+    existing = data.drop(columns=[column for column in data.columns if column in replaced])
+    return pd.concat([found, existing], axis=1, copy=False)
+
+
+def ambiguity_flags(match_counts: pd.Series, index: pd.Index) -> pd.DataFrame:
+    """
+    สร้างคอลัมน์ match_count และ ambiguous รายแถว
+
+    Args:
+        match_counts: จำนวนแถวที่พบของคีย์ของแต่ละแถวที่พบ (NaN = ไม่ทราบ)
+        index: index ของข้อมูลทั้งหมด
+
+    Returns:
+        pd.DataFrame: คอลัมน์ MATCH_COUNT_COLUMN และ AMBIGUOUS_COLUMN (แถวที่ไม่ทราบเป็นค่าว่าง)
+    """
+    counts = match_counts.dropna().astype(int)
+    flags = pd.DataFrame({
+        MATCH_COUNT_COLUMN: counts.astype(object),
+        AMBIGUOUS_COLUMN: np.where(counts > 1, AMBIGUOUS_YES, AMBIGUOUS_NO)
+    }, index=counts.index)
+    return flags.reindex(index, fill_value='')
+
+
+class _SearchKeyIndex:
+    """
+    แปลงค่าคีย์ที่ฐานข้อมูลคืนมากลับเป็นคีย์ที่ค้นหา (คีย์จาก normalize_keys)
+
+    MySQL จับคู่ตาม collation (ไม่แยกตัวพิมพ์ ไม่สนช่องว่างท้าย) และแปลงชนิดเมื่อคอลัมน์เป็นตัวเลข
+    (เช่น hn ชนิด int 123 ตรงกับคีย์ '00123') ค่าที่คืนมาจึงอาจไม่ตรงกับคีย์ที่ค้นหาทุกตัวอักษร
+    ค่าที่ต่างจากทุกคีย์เฉพาะตัวพิมพ์ถูกนับให้ทุกคีย์ที่ตรงกันเมื่อไม่สนตัวพิมพ์ (เช่น ค้นหาทั้ง 'ABC' และ 'abc')
+    """
+
+    def __init__(self, keys: Sequence[str]):
+        self.exact = set(keys)
+        self.folded: Dict[str, List[str]] = {}
+        self.numeric: Dict[Decimal, List[str]] = {}
+        for key in self.exact:
+            self.folded.setdefault(key.strip().lower(), []).append(key)
+            if NUMERIC_KEY_PATTERN.fullmatch(key):
+                self.numeric.setdefault(Decimal(key), []).append(key)
+
+    def search_keys(self, value) -> List[str]:
+        """คีย์ที่ค้นหาซึ่งตรงกับค่าคีย์ value จากฐานข้อมูล"""
+        if isinstance(value, (bytes, bytearray)):
+            value = value.decode('utf-8', errors='replace')
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            return self.numeric.get(Decimal(value), [])
+        # ใช้รูปแบบที่ใกล้ที่สุดก่อน (ตรงทุกตัวอักษร > ต่างแค่ช่องว่าง > ต่างตัวพิมพ์) ไม่ให้จับคู่เกินกับ collation ที่แยกตัวพิมพ์
+        text = str(value)
+        for candidate in (text, text.strip()):
+            if candidate in self.exact:
+                return [candidate]
+        return self.folded.get(text.strip().lower(), [])
+
+
+def numeric_key_form(value) -> str:
+    """รูปแบบมาตรฐานของค่าตัวเลข (123, '00123', Decimal('123.0') ได้ '123' เหมือนกัน)"""
+    number = Decimal(str(value)).normalize()
+    return '0' if number == 0 else format(number, 'f')
+
+
+def _is_numeric_value(value) -> bool:
+    return isinstance(value, (int, float, Decimal, np.number)) and not isinstance(value, (bool, np.bool_))
+
+
+def _split_db_values(values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """แยกค่าคีย์จากฐานข้อมูล (ที่ไม่ว่าง) เป็น (ข้อความ, ค่าชนิดตัวเลข)"""
+    values = values.dropna()
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.infer_dtype(values, skipna=True) == 'string':
+        numeric = np.zeros(len(values), dtype=bool)
+    elif pd.api.types.is_numeric_dtype(values):
+        numeric = np.ones(len(values), dtype=bool)
+    else:
+        numeric = values.map(_is_numeric_value).to_numpy(dtype=bool)
+
+    text = values[~numeric].map(
+        lambda value: value.decode('utf-8', errors='replace') if isinstance(value, (bytes, bytearray)) else value)
+    return text.astype(str), values[numeric]
+
+
+def db_key_forms(values: pd.Series) -> pd.Series:
+    """
+    รูปแบบสำหรับเทียบค่าคีย์จากฐานข้อมูลกับคีย์ที่ค้นหา (ใช้คู่กับ search_key_forms ตามกติกาเดียวกับ _SearchKeyIndex)
+
+    ค่าชนิดตัวเลขได้รูปแบบ 'n:<ตัวเลขมาตรฐาน>' ค่าอื่นได้ 's:<ข้อความที่ตัดช่องว่างและเป็นตัวพิมพ์เล็ก>'
+
+    Returns:
+        pd.Series: รูปแบบของค่าที่ไม่ว่าง (index เดียวกับข้อมูลเดิม)
+    """
+    text, numbers = _split_db_values(values)
+    forms = pd.concat(['s:' + text.str.strip().str.lower(), 'n:' + numbers.map(numeric_key_form).astype(str)])
+    return forms.reindex(values.dropna().index)
+
+
+def search_key_forms(keys: pd.Series) -> pd.Series:
+    """
+    รูปแบบทั้งหมดที่คีย์ที่ค้นหาอาจตรงกับค่าในฐานข้อมูล (คีย์หนึ่งอาจมีได้ 2 รูปแบบ index จึงซ้ำได้)
+
+    ทุกคีย์มีรูปแบบข้อความ 's:' และคีย์ที่เป็นตัวเลขมีรูปแบบ 'n:' เพิ่ม (MySQL แปลงชนิดเมื่อคอลัมน์เป็นตัวเลข)
+    """
+    keys = keys.astype(str)
+    numeric = keys[keys.str.fullmatch(NUMERIC_KEY_PATTERN.pattern)]
+    return pd.concat(['s:' + keys.str.strip().str.lower(), 'n:' + numeric.map(numeric_key_form).astype(str)])
+
+
+def match_db_keys(values: pd.Series, keys: Sequence[str]) -> pd.Series:
+    """
+    จับคู่ค่าคีย์จากฐานข้อมูลทั้งคอลัมน์กับคีย์ที่ค้นหาแบบ vectorized (กติกาเดียวกับ _SearchKeyIndex)
+
+    ค่าข้อความที่ตรงกับคีย์ใดทุกตัวอักษร (หลังตัดช่องว่าง) จับคู่กับคีย์นั้นคีย์เดียว ค่าอื่นจับคู่กับทุกคีย์ที่เท่ากัน
+    เมื่อไม่สนตัวพิมพ์ และค่าชนิดตัวเลขจับคู่กับทุกคีย์ที่เป็นตัวเลขเดียวกัน (เช่น 123 ตรงกับ '123' และ '00123')
+
+    Args:
+        values: ค่าคีย์จากฐานข้อมูล (index ต้องไม่ซ้ำ)
+        keys: คีย์ที่ไม่ซ้ำที่ค้นหา (จาก normalize_keys)
+
+    Returns:
+        pd.Series: คีย์ที่ค้นหาที่ตรงกับแต่ละค่า เรียงตามลำดับของ values
+        (index คือ index ของ values ซ้ำได้เมื่อค่าหนึ่งตรงกับหลายคีย์)
+    """
+    keys = pd.Series(list(keys), dtype=object).astype(str)
+    positions = values.reset_index(drop=True)
+    forms = db_key_forms(positions)
+    key_forms = search_key_forms(keys)
+    pairs = pd.DataFrame({'_row': forms.index, 'form': forms.to_numpy()}).merge(
+        pd.DataFrame({'form': key_forms.to_numpy(), 'key': keys.to_numpy()[key_forms.index]}), on='form')
+
+    # ใช้รูปแบบที่ใกล้ที่สุดก่อน (ตรงทุกตัวอักษรหลังตัดช่องว่าง > ต่างตัวพิมพ์)
+    text, _ = _split_db_values(positions)
+    direct = text.str.strip()
+    direct = direct[direct.isin(keys)]
+    if len(direct):
+        direct_keys = pairs['_row'].map(direct)
+        pairs = pairs[direct_keys.isna() | (pairs['key'] == direct_keys)]
+
+    pairs = pairs.sort_values('_row', kind='stable')
+    return pd.Series(pairs['key'].to_numpy(), index=values.index[pairs['_row'].to_numpy()], dtype=object)
+
+
+def _collect_first_matches(results: Dict[str, Tuple], rows, key_index: _SearchKeyIndex,
+                           counts: Optional[Dict[str, int]] = None) -> None:
+    """
+    เก็บผลลัพธ์แถวแรกของแต่ละคีย์ที่ค้นหา (เหมือน LIMIT 1 ของการค้นหาทีละแถว) โดยคอลัมน์แรกคือค่าคีย์ในฐานข้อมูล
+
+    ถ้าระบุ counts จะนับจำนวนแถวที่พบของแต่ละคีย์ไว้ด้วย (ตรวจคีย์กำกวมจากผลลัพธ์ชุดเดียวกัน ไม่ต้อง query เพิ่ม)
+    """
+    for row in rows:
+        found = tuple('' if value is None else value for value in row[1:])
+        for key in key_index.search_keys(row[0]):
+            if key not in results:
+                results[key] = found
+            if counts is not None:
+                counts[key] = counts.get(key, 0) + 1
+
+
+def build_in_list_query(table_name: str, columns: List[str], db_column: str, key_count: int) -> str:
+    """
+    สร้าง query แบบ IN-list สำหรับค้นหาหลายคีย์ในครั้งเดียว
+
+    คอลัมน์แรกของผลลัพธ์คือค่าคีย์ ใช้สำหรับจับคู่กลับไปยังแถวใน Excel
+    """
+    placeholders = ','.join(['%s'] * key_count)
+    return (f"SELECT {db_column},{','.join(columns)} FROM {table_name} "
+            f"WHERE {db_column} IN ({placeholders})")
+
+
+def in_list_bucket(key_count: int) -> int:
+    """
+    จำนวน placeholder ของ query แบบ IN-list สำหรับ key_count คีย์ (ปัดขึ้นเป็นกำลังของ 2)
+
+    ขนาด batch ที่ปรับอัตโนมัติเปลี่ยนแทบทุก batch ถ้าใช้จำนวนคีย์จริงจะ prepare statement ใหม่ทุก batch
+    การปัดขึ้นทำให้มี statement ไม่เกินจำนวนกำลังของ 2 ในช่วง min_batch_size..max_batch_size
+    """
+    return 1 << max(int(key_count) - 1, 0).bit_length()
+
+
+def lookup_in_list(mysql_connection, table_name: str, columns: List[str],
+                   db_column: str, keys: Sequence[str],
+                   counts: Optional[Dict[str, int]] = None) -> Dict[str, Tuple]:
+    """
+    ค้นหาคีย์หลายค่าด้วย query เดียว ผ่าน prepared statement ของ connection
+
+    จำนวน placeholder ถูกปัดขึ้นตาม in_list_bucket แล้วเติมด้วยคีย์แรกซ้ำ (IN ที่มีค่าซ้ำคืนแถวเดิม ผลลัพธ์ไม่เปลี่ยน)
+    batch ที่อยู่ในช่วงเดียวกันจึงใช้ statement เดียวกัน แม้ขนาด batch จะถูกปรับระหว่างงาน
+
+    Args:
+        mysql_connection: MySQLConnection (ใช้ prepared_cursor)
+        table_name: ชื่อตาราง person
+        columns: คอลัมน์ที่ต้องการ (ตาม get_person_query_columns)
+        db_column: คอลัมน์ในฐานข้อมูลที่ใช้ค้นหา
+        keys: ค่าคีย์ที่ต้องการค้นหา
+        counts: dict สำหรับเก็บจำนวนแถวที่พบของแต่ละคีย์ (ไม่บังคับ)
+
+    Returns:
+        Dict[str, Tuple]: คีย์ -> ค่าผลลัพธ์ตามลำดับของ FOUND_COLUMNS
+    """
+    if not keys:
+        return {}
+
+    params = tuple(keys)
+    placeholder_count = in_list_bucket(len(params))
+    params += (params[0],) * (placeholder_count - len(params))
+    query = build_in_list_query(table_name, columns, db_column, placeholder_count)
+    cursor = mysql_connection.prepared_cursor(query)
+    try:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    except Exception:
+        # cursor ที่ error อาจค้างผลลัพธ์ ให้ prepare ใหม่ในครั้งถัดไป
+        mysql_connection.discard_prepared_cursor(query)
+        raise
+
+    results = {}
+    _collect_first_matches(results, rows, _SearchKeyIndex(keys), counts)
+    return results
+
+
+def discard_remaining_rows(cursor, chunk_size: int = 10000) -> None:
+    """
+    อ่านผลลัพธ์ที่เหลือของ cursor แบบ unbuffered ทิ้งทีละ chunk_size แถว (connection จึงใช้ query อื่นต่อได้)
+
+    ไม่ใช้ fetchall เพราะจะโหลดแถวที่เหลือทั้งหมดเข้าหน่วยความจำพร้อมกัน
+    """
+    while cursor.fetchmany(chunk_size):
+        pass
+
+
+def lookup_temp_table(connection, table_name: str, columns: List[str], db_column: str,
+                      keys: Sequence[str], batch_size: int = 2000,
+                      on_progress: Optional[Callable[[str, int, int], None]] = None,
+                      should_stop: Optional[Callable[[], bool]] = None,
+                      counts: Optional[Dict[str, int]] = None) -> Dict[str, Tuple]:
+    """
+    ค้นหาคีย์ทั้งหมดด้วยการ JOIN กับ TEMPORARY TABLE
+
+    คีย์จะถูกโหลดลงตารางชั่วคราวด้วย multi-row INSERT แล้ว JOIN กับตาราง person
+    ใน query เดียว ทำให้ไม่มีข้อจำกัดความยาว query และไม่มี latency ต่อแถว
+
+    Args:
+        connection: mysql.connector connection
+        table_name: ชื่อตาราง person
+        columns: คอลัมน์ที่ต้องการ (ตาม get_person_query_columns)
+        db_column: คอลัมน์ในฐานข้อมูลที่ใช้ค้นหา
+        keys: ค่าคีย์ที่ไม่ซ้ำกันที่ต้องการค้นหา
+        batch_size: จำนวนแถวต่อ INSERT และต่อการ fetch ผลลัพธ์
+        on_progress: callback(ข้อความ, ค่าปัจจุบัน, ค่าสูงสุด)
+        should_stop: คืนค่า True เมื่อต้องการหยุด (ตรวจสอบทุก batch) ผลลัพธ์ที่ได้จะมีเฉพาะคีย์ที่อ่านแล้ว
+        counts: dict สำหรับเก็บจำนวนแถวที่พบของแต่ละคีย์ (ไม่บังคับ)
+
+    Returns:
+        Dict[str, Tuple]: คีย์ -> ค่าผลลัพธ์ตามลำดับของ FOUND_COLUMNS
+    """
+    if not keys:
+        return {}
+
+    total_keys = len(keys)
+    key_index = _SearchKeyIndex(keys)
+    results = {}
+    cursor = connection.cursor(buffered=False)  # ผลการ JOIN อาจมีมาก ทยอยอ่านด้วย fetchmany
+    try:
+        # สร้างตารางชั่วคราวที่มีชนิดข้อมูลและ collation เดียวกับคอลัมน์ค้นหา เพื่อให้ JOIN ใช้ index ได้
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {TEMP_KEY_TABLE}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {TEMP_KEY_TABLE} "
+                       f"SELECT {db_column} AS search_key FROM {table_name} LIMIT 0")
+        cursor.execute(f"ALTER TABLE {TEMP_KEY_TABLE} ADD PRIMARY KEY (search_key)")
+
+        # โหลดคีย์ด้วย multi-row INSERT ทีละ batch
+        loaded_keys = 0
+        for chunk in iter_chunks(keys, batch_size):
+            if should_stop and should_stop():
+                return results
+            placeholders = ','.join(['(%s)'] * len(chunk))
+            cursor.execute(f"INSERT IGNORE INTO {TEMP_KEY_TABLE} (search_key) VALUES {placeholders}",
+                           tuple(chunk))
+            loaded_keys += len(chunk)
+            if on_progress:
+                on_progress(f"โหลดคีย์ลงตารางชั่วคราว {loaded_keys}/{total_keys} รายการ",
+                            loaded_keys, total_keys)
+
+        # JOIN ครั้งเดียวและทยอยอ่านผลลัพธ์ทีละ batch
+        select_columns = ','.join(f"p.{column}" for column in columns)
+        cursor.execute(f"SELECT p.{db_column},{select_columns} FROM {TEMP_KEY_TABLE} k "
+                       f"JOIN {table_name} p ON p.{db_column} = k.search_key")
+
+        while True:
+            if should_stop and should_stop():
+                # อ่านผลลัพธ์ที่เหลือทิ้งก่อน (cursor แบบ unbuffered) แล้วคืนเฉพาะที่อ่านแล้ว
+                discard_remaining_rows(cursor, batch_size)
+                break
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            _collect_first_matches(results, rows, key_index, counts)
+            if on_progress:
+                on_progress(f"อ่านผลลัพธ์จากการ JOIN แล้ว {len(results)} รายการ",
+                            min(len(results), total_keys), total_keys)
+
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {TEMP_KEY_TABLE}")
+        return results
+    finally:
+        cursor.close()
+
+
+def merge_shard_results(shard_results: Sequence[Dict[str, Tuple]]) -> Dict[str, Tuple]:
+    """
+    รวมผลลัพธ์จากหลาย shard ตามลำดับ shard
+
+    ถ้าคีย์เดียวกันอยู่หลาย shard จะใช้ผลลัพธ์จาก shard ที่มาก่อน ทำให้ผลลัพธ์คงที่ทุกครั้ง
+    """
+    merged = {}
+    for results in shard_results:
+        for key, result in (results or {}).items():
+            merged.setdefault(key, result)
+    return merged
+
+
+class AdaptiveBatchSizer:
+    """
+    ปรับขนาด batch และจำนวน batch ที่ค้นหาพร้อมกันตามเวลาที่ใช้จริงของแต่ละ batch
+
+    ขนาด batch ปรับเข้าหาเวลาเป้าหมายต่อ batch: เวลาต่อคีย์ (รวมค่า round trip เฉลี่ย) ใช้คาดขนาดที่พอดีเวลาเป้าหมาย
+    จึงได้ batch ใหญ่บน VPN ที่ round trip แพง และ batch เล็กลงเมื่อ server ตอบช้า
+    จำนวน batch พร้อมกันเพิ่มทีละ 1 ตราบที่จำนวนคีย์ต่อวินาทีรวมยังเพิ่มขึ้น และลดลงเมื่อไม่คุ้มหรือ server ตอบช้าเกินไป
+    เรียก record จากหลาย thread พร้อมกันได้
+    """
+
+    SMOOTHING = 0.5  # น้ำหนักของค่าล่าสุดในค่าเฉลี่ยเคลื่อนที่
+    MAX_STEP = 2.0  # ขยาย/ลดขนาด batch ได้ไม่เกินกี่เท่าต่อครั้ง
+    MIN_GAIN = 1.1  # ต้องได้คีย์ต่อวินาทีเพิ่มอย่างน้อยเท่านี้จึงคงจำนวน batch พร้อมกันที่เพิ่มขึ้น
+
+    def __init__(self, batch_size: int, target_seconds: float = 1.0, min_batch_size: int = 200,
+                 max_batch_size: int = 20000, max_concurrency: int = 1, adaptive: bool = True):
+        """
+        Args:
+            batch_size: ขนาด batch เริ่มต้น
+            target_seconds: เวลาเป้าหมายต่อ batch (วินาที)
+            min_batch_size: ขนาด batch ต่ำสุด
+            max_batch_size: ขนาด batch สูงสุด
+            max_concurrency: จำนวน batch พร้อมกันสูงสุด (1 = ค้นหาทีละ batch)
+            adaptive: False = ใช้ batch_size และ max_concurrency คงที่ (วัดผลอย่างเดียว)
+        """
+        self.adaptive = adaptive
+        self.min_batch_size = max(int(min_batch_size), 1) if adaptive else max(int(batch_size), 1)
+        self.max_batch_size = max(int(max_batch_size), self.min_batch_size) if adaptive else self.min_batch_size
+        self.target_seconds = target_seconds
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.batch_size = self._clamp(batch_size)
+        self.concurrency = 1 if adaptive else self.max_concurrency
+        self.batch_count = 0
+        self.key_count = 0
+        self.row_count = 0
+        self.seconds_per_batch = None  # เวลาต่อ batch เฉลี่ย
+        self._seconds_per_key = None
+        self._throughput = {}  # จำนวน batch พร้อมกัน -> คีย์ต่อวินาทีรวม
+        self._level_batches = 0  # จำนวน batch ที่วัดได้ที่จำนวน batch พร้อมกันปัจจุบัน
+        self._lock = threading.Lock()
+
+    def _clamp(self, batch_size: float) -> int:
+        return int(min(max(batch_size, self.min_batch_size), self.max_batch_size))
+
+    def _smooth(self, previous: Optional[float], value: float) -> float:
+        return value if previous is None else previous + self.SMOOTHING * (value - previous)
+
+    def record(self, key_count: int, row_count: int, seconds: float):
+        """
+        บันทึกผลของ batch ที่ค้นหาเสร็จ แล้วปรับขนาด batch และจำนวน batch พร้อมกันถัดไป
+
+        Args:
+            key_count: จำนวนคีย์ใน batch
+            row_count: จำนวนแถวที่ได้กลับมา
+            seconds: เวลาที่ใช้ (วินาที)
+        """
+        if key_count <= 0:
+            return
+        seconds = max(seconds, 1e-6)
+        with self._lock:
+            self.batch_count += 1
+            self.key_count += key_count
+            self.row_count += row_count
+            self.seconds_per_batch = self._smooth(self.seconds_per_batch, seconds)
+            self._seconds_per_key = self._smooth(self._seconds_per_key, seconds / key_count)
+
+            ideal = self.target_seconds / self._seconds_per_key
+            self.batch_size = self._clamp(min(max(ideal, self.batch_size / self.MAX_STEP),
+                                              self.batch_size * self.MAX_STEP))
+            self._adjust_concurrency(key_count / seconds)
+
+    def record_failure(self):
+        """batch ที่ query error (เช่น timeout): ลดขนาด batch ลงครึ่งหนึ่ง"""
+        with self._lock:
+            self.batch_size = self._clamp(self.batch_size / self.MAX_STEP)
+
+    def _adjust_concurrency(self, keys_per_second: float):
+        """ปรับจำนวน batch พร้อมกันหลังวัดผลครบ 1 รอบ (เท่ากับจำนวน batch พร้อมกันปัจจุบัน)"""
+        if not self.adaptive or self.max_concurrency == 1:
+            return
+        level = self.concurrency
+        # คีย์ต่อวินาทีรวมโดยประมาณ = คีย์ต่อวินาทีของ batch นี้ × จำนวน batch ที่ทำงานพร้อมกัน
+        self._throughput[level] = self._smooth(self._throughput.get(level), level * keys_per_second)
+        self._level_batches += 1
+        if self._level_batches < level:
+            return
+
+        overloaded = self.seconds_per_batch > 2 * self.target_seconds and self.batch_size == self.min_batch_size
+        lower = self._throughput.get(level - 1)
+        higher = self._throughput.get(level + 1)
+        if level > 1 and (overloaded or (lower is not None and lower * self.MIN_GAIN >= self._throughput[level])):
+            self.concurrency = level - 1
+        elif level < self.max_concurrency and (higher is None or higher > self._throughput[level] * self.MIN_GAIN):
+            self.concurrency = level + 1
+        if self.concurrency != level:
+            self._level_batches = 0
+
+    def describe(self) -> str:
+        """สรุปค่าที่ปรับได้ (แสดงใน status bar และ log)"""
+        summary = f"batch {self.batch_size:,} คีย์"
+        if not self.batch_count:
+            return summary
+        if self.max_concurrency > 1:
+            summary += f" × {self.concurrency} พร้อมกัน"
+        return f"{summary} (~{self.seconds_per_batch:.2f} วินาที/batch, {self.batch_count:,} batch)"
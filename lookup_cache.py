@@ -0,0 +1,132 @@
+"""
+Person Lookup Cache
+แคชผลการค้นหาตาราง person ลงไฟล์ SQLite เพื่อให้การเชื่อมโยงซ้ำไม่ต้อง query MySQL ใหม่
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+from linkage import FOUND_COLUMNS, iter_chunks
+
+
+# จำนวนคีย์ต่อ 1 query ของ SQLite (ต่ำกว่า SQLITE_MAX_VARIABLE_NUMBER รุ่นเก่า)
+SQLITE_BATCH_SIZE = 500
+
+
+class PersonLookupCache:
+    """แคชผลการค้นหา person (พบ/ไม่พบ) แยกตาม scope ของ profile, ฐานข้อมูล และคอลัมน์ค้นหา"""
+
+    def __init__(self, path: str, ttl_hours: float = 168):
+        self.path = path
+        self.ttl_seconds = float(ttl_hours) * 3600
+
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with self._connect() as connection:
+            found_columns = ', '.join(FOUND_COLUMNS)
+            connection.execute(f"""
+                CREATE TABLE IF NOT EXISTS person_lookup (
+                    scope TEXT NOT NULL,
+                    search_key TEXT NOT NULL,
+                    found INTEGER NOT NULL,
+                    {found_columns},
+                    cached_at REAL NOT NULL,
+                    PRIMARY KEY (scope, search_key)
+                )
+            """)
+
+    @staticmethod
+    def make_scope(profile: str, config: Dict[str, str], db_column: str) -> str:
+        """สร้าง scope ของแคชจาก profile, เซิร์ฟเวอร์/ฐานข้อมูล และคอลัมน์ค้นหา"""
+        return (f"{profile}|{config.get('host', '')}:{config.get('port', '')}/"
+                f"{config.get('database', '')}|{db_column}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """เปิด connection ใหม่ทุกครั้ง (เรียกใช้จาก thread ใดก็ได้) commit และปิดเมื่อจบ"""
+        connection = sqlite3.connect(self.path, timeout=10)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get_many(self, scope: str, keys: Sequence[str]) -> Dict[str, Optional[Tuple]]:
+        """
+        ดึงผลลัพธ์ที่ยังไม่หมดอายุจากแคช
+
+        Args:
+            scope: scope ของแคช (จาก make_scope)
+            keys: คีย์ที่ต้องการ
+
+        Returns:
+            Dict[str, Optional[Tuple]]: คีย์ -> ค่าตามลำดับ FOUND_COLUMNS หรือ None ถ้าเคยค้นหาแล้วไม่พบ
+            (คีย์ที่ไม่มีในแคชจะไม่อยู่ใน dict)
+        """
+        cached = {}
+        min_cached_at = time.time() - self.ttl_seconds
+        found_columns = ', '.join(FOUND_COLUMNS)
+
+        with self._connect() as connection:
+            for chunk in iter_chunks(list(keys), SQLITE_BATCH_SIZE):
+                placeholders = ','.join(['?'] * len(chunk))
+                rows = connection.execute(
+                    f"SELECT search_key, found, {found_columns} FROM person_lookup "
+                    f"WHERE scope = ? AND cached_at >= ? AND search_key IN ({placeholders})",
+                    (scope, min_cached_at, *chunk)
+                ).fetchall()
+                for row in rows:
+                    cached[row[0]] = tuple(row[2:]) if row[1] else None
+        return cached
+
+    def put_many(self, scope: str, results: Dict[str, Tuple], missing_keys: Iterable[str] = ()):
+        """
+        บันทึกผลการค้นหาลงแคช
+
+        Args:
+            scope: scope ของแคช (จาก make_scope)
+            results: คีย์ที่พบ -> ค่าตามลำดับ FOUND_COLUMNS
+            missing_keys: คีย์ที่ค้นหาแล้วไม่พบ
+        """
+        now = time.time()
+        empty = ('',) * len(FOUND_COLUMNS)
+        rows = [(scope, key, 1, *result, now) for key, result in results.items()]
+        rows.extend((scope, key, 0, *empty, now) for key in missing_keys)
+        if not rows:
+            return
+
+        placeholders = ','.join(['?'] * (len(FOUND_COLUMNS) + 4))
+        with self._connect() as connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO person_lookup VALUES ({placeholders})", rows
+            )
+            # ลบรายการที่หมดอายุแล้วเพื่อไม่ให้ไฟล์โตเรื่อยๆ
+            connection.execute("DELETE FROM person_lookup WHERE cached_at < ?",
+                               (now - self.ttl_seconds,))
+
+    def clear(self, scope: Optional[str] = None):
+        """ล้างแคชทั้งหมด หรือเฉพาะ scope ที่ระบุ"""
+        with self._connect() as connection:
+            if scope is None:
+                connection.execute("DELETE FROM person_lookup")
+            else:
+                connection.execute("DELETE FROM person_lookup WHERE scope = ?", (scope,))
+
+
+class LinkageJournal(PersonLookupCache):
+    """
+    Checkpoint ของการเชื่อมโยงที่ยังทำไม่เสร็จ (ใช้ schema เดียวกับแคช โดย scope คือรหัสงาน)
+
+    งานเดียวกัน (ไฟล์เดียวกัน, profile/ฐานข้อมูลเดียวกัน, คอลัมน์เดียวกัน) จะได้รหัสงานเดิม
+    ทำให้เริ่มทำต่อจากคีย์ที่บันทึกไว้ได้ แม้ปิดโปรแกรมไปแล้ว checkpoint ถูกลบเมื่องานเสร็จสมบูรณ์
+    """
+
+    @staticmethod
+    def make_run_id(file_hash: str, scope: str) -> str:
+        """สร้างรหัสงานจาก hash ของไฟล์และ scope ของแคช (profile, ฐานข้อมูล, คอลัมน์ค้นหา)"""
+        return f"{file_hash}|{scope}"
@@ -5,14 +5,27 @@ MySQL Configuration Manager
 
 import winreg
 import json
+import queue
+import threading
+import time
 import mysql.connector
-from typing import Dict, Optional, Tuple
+import pandas as pd
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, 
                              QLineEdit, QSpinBox, QPushButton, QLabel, 
                              QMessageBox, QCheckBox, QGroupBox, QTextEdit, QComboBox)
-from PyQt5.QtCore import Qt, QLocale
+from PyQt5.QtCore import Qt, QLocale, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon
 
+from config import LINKAGE_CONFIG
+from key_filter import PersonKeyFilter
+from person_snapshot import PersonSnapshot, fetch_person_rows, iter_query_chunks, merge_snapshot_changes
+from utils import STAGE_LINK, get_stage_logger
+
+link_logger = get_stage_logger(STAGE_LINK)
+
 
 class MySQLConfigManager:
     """จัดการการตั้งค่า MySQL ใน Registry"""
@@ -93,6 +106,43 @@ class MySQLConfigManager:
         
         return config
     
+    @staticmethod
+    def save_profile_config(config: Dict[str, str]) -> bool:
+        """บันทึกการตั้งค่าของ profile แยกไว้ใน Registry (ใช้เชื่อมโยงหลายระบบพร้อมกัน)"""
+        profile = config.get('profile', 'HOSXP')
+        try:
+            with winreg.CreateKeyEx(winreg.HKEY_CURRENT_USER,
+                                    rf"{MySQLConfigManager.REGISTRY_KEY}\Profiles\{profile}") as key:
+                for name, value in config.items():
+                    winreg.SetValueEx(key, name, 0, winreg.REG_SZ, str(value))
+                return True
+        except Exception as e:
+            link_logger.error("cannot save profile config to registry: %s", e)
+            return False
+    
+    @staticmethod
+    def load_profile_configs() -> Dict[str, Dict[str, str]]:
+        """โหลดการตั้งค่าที่บันทึกแยกตาม profile (เฉพาะ profile ที่เคยบันทึก)"""
+        configs = {}
+        for profile, default_config in MySQLConfigManager.PROFILE_CONFIGS.items():
+            try:
+                with winreg.OpenKey(winreg.HKEY_CURRENT_USER,
+                                    rf"{MySQLConfigManager.REGISTRY_KEY}\Profiles\{profile}") as key:
+                    config = dict(default_config)
+                    for name in config.keys():
+                        try:
+                            value, _ = winreg.QueryValueEx(key, name)
+                            config[name] = value
+                        except FileNotFoundError:
+                            pass
+                    configs[profile] = config
+            except FileNotFoundError:
+                # ยังไม่เคยบันทึกการตั้งค่าของ profile นี้
+                pass
+            except Exception as e:
+                link_logger.error("cannot load profile config from registry: %s", e)
+        return configs
+    
     @staticmethod
     def test_connection(config: Dict[str, str]) -> Tuple[bool, str]:
         """ทดสอบการเชื่อมต่อ MySQL"""
@@ -267,8 +317,9 @@ class MySQLConfigDialog(QDialog):
         
     def on_profile_changed(self, profile: str):
         """จัดการเมื่อมีการเปลี่ยน profile"""
-        # โหลดค่า default ของ profile ที่เลือก
-        default_config = MySQLConfigManager.PROFILE_CONFIGS[profile]
+        # โหลดค่าที่เคยบันทึกของ profile ที่เลือก หรือค่า default ถ้ายังไม่เคยบันทึก
+        saved_configs = MySQLConfigManager.load_profile_configs()
+        default_config = saved_configs.get(profile, MySQLConfigManager.PROFILE_CONFIGS[profile])
         
         # อัพเดต UI
         self.host_edit.setText(default_config['host'])
@@ -370,28 +421,114 @@ class MySQLConfigDialog(QDialog):
             'profile': self.profile_combo.currentText()
         }
         
-        # บันทึกลง Registry
+        # บันทึกลง Registry (เก็บแยกตาม profile ด้วย เพื่อใช้เชื่อมโยงหลายระบบพร้อมกัน)
         if MySQLConfigManager.save_config(config):
+            MySQLConfigManager.save_profile_config(config)
             QMessageBox.information(self, "สำเร็จ", "บันทึกการตั้งค่าเรียบร้อยแล้ว")
             self.accept()
         else:
             QMessageBox.warning(self, "ผิดพลาด", "ไม่สามารถบันทึกการตั้งค่าได้")
 
 
+# error ของ mysql.connector ที่หมายถึงการเชื่อมต่อหลุด: can't connect, server gone away, lost connection
+CONNECTION_LOST_ERRNOS = {2003, 2006, 2013, 2055}
+
+
+def is_connection_lost(error: Exception) -> bool:
+    """ตรวจสอบว่า error เกิดจากการเชื่อมต่อ MySQL หลุดหรือไม่ (เชื่อมต่อใหม่แล้วลองอีกครั้งได้)"""
+    errno = getattr(error, 'errno', None)
+    if errno in CONNECTION_LOST_ERRNOS:
+        return True
+    # error ระดับ connection ที่ไม่มีรหัส (เช่น socket ถูกปิด)
+    return errno in (None, -1) and isinstance(error, (mysql.connector.errors.OperationalError,
+                                                      mysql.connector.errors.InterfaceError))
+
+
+# สถานะการเชื่อมต่อที่ cache ไว้ (MySQLConnection.status) อ่านได้ทันทีโดยไม่ต้องติดต่อ server
+CONNECTION_DISCONNECTED = 'disconnected'  # ยังไม่ได้เชื่อมต่อ หรือผู้ใช้ตัดการเชื่อมต่อ
+CONNECTION_CONNECTED = 'connected'
+CONNECTION_RECONNECTING = 'reconnecting'  # การเชื่อมต่อหลุด กำลังเชื่อมต่อใหม่
+CONNECTION_LOST = 'lost'  # การเชื่อมต่อหลุดและเชื่อมต่อใหม่ไม่สำเร็จ (health monitor จะลองใหม่ทุกรอบ)
+
+
 class MySQLConnection:
     """จัดการการเชื่อมต่อ MySQL"""
     
-    def __init__(self):
+    # ผลการตรวจสอบ index ของตาราง person: scope ของ profile/ฐานข้อมูล -> {คอลัมน์ในฐานข้อมูล: มี index หรือไม่}
+    _index_cache: Dict[str, Dict[str, bool]] = {}
+    
+    def __init__(self, config: Optional[Dict[str, str]] = None):
         self.connection = None
-        self.config = MySQLConfigManager.load_config()
+        self.config = dict(config) if config else MySQLConfigManager.load_config()
         self.profile = self.config.get('profile', 'HOSXP')  # เก็บ profile ที่กำลังใช้งาน (HOSXP หรือ JHCIS)
+        self._prepared_cursors = {}  # statement -> cursor ที่ prepare ไว้แล้วบน connection ปัจจุบัน
+        self._status = CONNECTION_DISCONNECTED
+        self.status_message = ""  # ข้อความของการเปลี่ยนสถานะครั้งล่าสุด
+        # ถือไว้ตลอดช่วงที่ thread หนึ่งใช้ connection (health monitor จะข้ามการ ping เมื่อมีผู้ใช้อยู่)
+        self._lock = threading.RLock()
+        self._generation = 0  # เพิ่มทุกครั้งที่ตัดการเชื่อมต่อ (health check ที่เริ่มก่อนหน้าจะไม่เปลี่ยนสถานะทับ)
+    
+    @property
+    def status(self) -> str:
+        """สถานะการเชื่อมต่อล่าสุด (CONNECTION_*) ไม่ติดต่อ server จึงเรียกจาก GUI thread ได้ทุกเมื่อ"""
+        return self._status
+    
+    def _set_status(self, status: str, message: str = ""):
+        self._status = status
+        self.status_message = message
+    
+    @contextmanager
+    def in_use(self):
+        """ถือ connection ไว้ตลอดช่วงที่ใช้งานจาก thread อื่น (ป้องกัน health monitor ใช้ connection พร้อมกัน)"""
+        with self._lock:
+            yield self
+    
+    def check_health(self) -> str:
+        """
+        ping server เพื่อตรวจสอบและรักษาการเชื่อมต่อ (ไม่ให้หลุดเพราะ wait_timeout) ถ้าหลุดจะเชื่อมต่อใหม่ 1 ครั้ง
+        
+        เรียกจาก health monitor เท่านั้น (ไม่ใช่ GUI thread) ถ้า connection กำลังถูกใช้งานอยู่จะไม่ ping
+        (การใช้งานนั้นยืนยันสถานะอยู่แล้ว) และไม่ทำอะไรถ้าผู้ใช้ยังไม่ได้เชื่อมต่อหรือตัดการเชื่อมต่อเอง
+        
+        Returns:
+            str: สถานะหลังตรวจสอบ (CONNECTION_*)
+        """
+        if self._status == CONNECTION_DISCONNECTED or not self._lock.acquire(blocking=False):
+            return self._status
+        try:
+            generation = self._generation
+            if self._status == CONNECTION_DISCONNECTED:  # ตัดการเชื่อมต่อระหว่างรอ lock
+                return self._status
+            try:
+                self.connection.ping(reconnect=False)
+                if generation == self._generation and self._status != CONNECTION_CONNECTED:
+                    self._set_status(CONNECTION_CONNECTED, "เชื่อมต่อ MySQL แล้ว")
+            except Exception as e:
+                if generation != self._generation:
+                    return self._status
+                link_logger.warning("connection health check failed profile=%s: %s", self.profile, e)
+                self.reconnect(attempts=1, base_delay=0)
+                if generation != self._generation:
+                    # ผู้ใช้ตัดการเชื่อมต่อระหว่างเชื่อมต่อใหม่ จึงทิ้ง connection ที่ได้มา
+                    self.disconnect()
+            return self._status
+        finally:
+            self._lock.release()
         
     def connect(self) -> Tuple[bool, str]:
         """เชื่อมต่อฐานข้อมูล"""
+        with self._lock:
+            return self._connect()
+    
+    def _connect(self) -> Tuple[bool, str]:
+        """เชื่อมต่อฐานข้อมูล (เรียกขณะถือ lock ของ connection)"""
         try:
             if self.connection and self.connection.is_connected():
+                self._set_status(CONNECTION_CONNECTED, "เชื่อมต่ออยู่แล้ว")
                 return True, "เชื่อมต่ออยู่แล้ว"
             
+            # prepared statement ผูกกับ connection เดิม ต้อง prepare ใหม่บน connection ใหม่
+            self._prepared_cursors = {}
             self.connection = mysql.connector.connect(
                 host=self.config['host'],
                 port=int(self.config['port']),
@@ -404,6 +541,10 @@ class MySQLConnection:
             # อัพเดท profile ปัจจุบันจาก config
             self.profile = self.config.get('profile', 'HOSXP')
             
+            # ตรวจสอบ index ของคอลัมน์ค้นหา (ครั้งแรกของแต่ละ profile/ฐานข้อมูลเท่านั้น)
+            self.inspect_person_indexes()
+            
+            self._set_status(CONNECTION_CONNECTED, "เชื่อมต่อสำเร็จ")
             return True, "เชื่อมต่อสำเร็จ"
             
         except mysql.connector.Error as e:
@@ -412,14 +553,146 @@ class MySQLConnection:
             return False, f"Error: {str(e)}"
             
     def disconnect(self):
-        """ตัดการเชื่อมต่อ"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        """
+        ตัดการเชื่อมต่อ (คืนค่าทันทีโดยไม่ติดต่อ server จึงเรียกจาก GUI thread ได้)
+        
+        แยก connection ออกจาก object นี้ทันที แล้วปิดใน thread แยกเมื่อผู้ที่ถือ lock อยู่ (เช่น health check
+        ที่กำลัง ping) ทำงานเสร็จ จึงไม่รอ network และไม่ปิด socket ระหว่างที่ thread อื่นใช้งาน
+        """
+        # เปลี่ยนสถานะก่อน health monitor จะได้ไม่เชื่อมต่อใหม่
+        self._set_status(CONNECTION_DISCONNECTED, "ตัดการเชื่อมต่อแล้ว")
+        self._generation += 1
+        connection, self.connection = self.connection, None
+        cursors, self._prepared_cursors = list(self._prepared_cursors.values()), {}
+        if connection is not None or cursors:
+            threading.Thread(target=self._close_detached, args=(connection, cursors),
+                             name='mysql-disconnect', daemon=True).start()
+    
+    def _close_detached(self, connection, cursors):
+        """ปิด connection และ prepared statement ที่แยกออกมาแล้ว (รันใน thread ของ disconnect)"""
+        with self._lock:
+            for cursor in cursors:
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            if connection is not None:
+                try:
+                    connection.close()
+                except Exception as e:
+                    link_logger.warning("closing connection failed profile=%s: %s", self.profile, e)
+    
+    def prepared_cursor(self, statement: str):
+        """
+        คืนค่า cursor แบบ server-side prepared statement สำหรับ statement นี้
+        
+        cursor ถูกสร้างและ prepare ครั้งเดียวต่อ connection แล้วใช้ซ้ำ การ execute statement เดิมซ้ำ
+        จึงส่งเฉพาะค่าพารามิเตอร์ (ไม่ต้อง parse/plan ใหม่) ผู้เรียกต้องอ่านผลลัพธ์ให้หมดก่อน execute ครั้งถัดไป
+        ถ้าปิด use_prepared_statements ใน LINKAGE_CONFIG จะใช้ cursor ธรรมดา (ยังใช้ซ้ำต่อ statement)
+        
+        Args:
+            statement: SQL ที่มี placeholder %s
+        """
+        cursor = self._prepared_cursors.get(statement)
+        if cursor is None:
+            prepared = LINKAGE_CONFIG.get('use_prepared_statements', True)
+            cursor = self.connection.cursor(prepared=True) if prepared else self.connection.cursor()
+            self._prepared_cursors[statement] = cursor
+        return cursor
+    
+    def stream_query(self, query: str, params: tuple = (), columns: Optional[Sequence[str]] = None,
+                     chunk_size: Optional[int] = None,
+                     should_stop: Optional[Callable[[], bool]] = None) -> Iterator[pd.DataFrame]:
+        """
+        รัน query ด้วย cursor แบบ unbuffered แล้วทยอยคืนผลลัพธ์เป็น DataFrame ทีละ chunk_size แถว
+        
+        ใช้กับ query ที่คืนแถวจำนวนมาก (ทั้งตาราง person หรือผลการ JOIN ขนาดใหญ่) หน่วยความจำจึงไม่เกินขนาด chunk
+        ต้องอ่านให้หมด (หรือให้ should_stop คืน True) ก่อนใช้ connection นี้ทำ query อื่น
+        
+        Args:
+            query: SQL ที่มี placeholder %s
+            params: ค่าพารามิเตอร์
+            columns: ชื่อคอลัมน์ของ DataFrame (None = ใช้ชื่อคอลัมน์จาก query)
+            chunk_size: จำนวนแถวต่อ chunk (None = snapshot_chunk_size ใน LINKAGE_CONFIG)
+            should_stop: คืนค่า True เมื่อต้องการหยุดอ่าน
+        """
+        chunk_size = chunk_size or LINKAGE_CONFIG.get('snapshot_chunk_size', 10000)
+        return iter_query_chunks(self.connection, query, params, columns, chunk_size, should_stop)
+    
+    def fetch_person_frame(self, query: str, params: tuple = (), on_progress=None,
+                           should_stop: Optional[Callable[[], bool]] = None) -> pd.DataFrame:
+        """
+        รัน query ที่คืนคอลัมน์ตามลำดับ get_person_query_columns แล้วรวมผลลัพธ์ที่ทยอยอ่านเป็น DataFrame
+        (คอลัมน์ตาม SNAPSHOT_COLUMNS ถ้า should_stop คืน True จะคืนเฉพาะแถวที่อ่านแล้ว)
+        """
+        return fetch_person_rows(self.connection, query, params,
+                                 chunk_size=LINKAGE_CONFIG.get('snapshot_chunk_size', 10000),
+                                 on_progress=on_progress, should_stop=should_stop)
+    
+    def discard_prepared_cursor(self, statement: str):
+        """ปิดและลบ prepared statement ที่ error (จะถูก prepare ใหม่เมื่อเรียกใช้ครั้งถัดไป)"""
+        cursor = self._prepared_cursors.pop(statement, None)
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+    
+    def close_prepared_cursors(self):
+        """ปิด prepared statement ทั้งหมดของ connection นี้"""
+        for cursor in self._prepared_cursors.values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._prepared_cursors = {}
             
     def is_connected(self) -> bool:
-        """ตรวจสอบสถานะการเชื่อมต่อ"""
+        """ตรวจสอบสถานะการเชื่อมต่อ (ping server จึงไม่ควรเรียกจาก GUI thread ให้ใช้ status แทน)"""
         return self.connection and self.connection.is_connected()
     
+    def reconnect(self, attempts: int = 5, base_delay: float = 1.0,
+                  should_stop: Optional[Callable[[], bool]] = None,
+                  on_retry: Optional[Callable[[int, float], None]] = None) -> Tuple[bool, str]:
+        """
+        เชื่อมต่อใหม่หลังการเชื่อมต่อหลุด โดยรอแบบ exponential backoff (base_delay, 2x, 4x, ...)
+        
+        Args:
+            attempts: จำนวนครั้งสูงสุดที่พยายามเชื่อมต่อ
+            base_delay: เวลารอก่อนพยายามครั้งแรก (วินาที)
+            should_stop: คืนค่า True เมื่อต้องการยกเลิกระหว่างรอ
+            on_retry: callback(ครั้งที่, เวลารอ) ก่อนรอแต่ละครั้ง
+            
+        Returns:
+            Tuple[bool, str]: (สำเร็จหรือไม่, ข้อความ)
+        """
+        message = "ไม่ได้พยายามเชื่อมต่อใหม่"
+        self._set_status(CONNECTION_RECONNECTING, "การเชื่อมต่อ MySQL หลุด กำลังเชื่อมต่อใหม่")
+        for attempt in range(attempts):
+            delay = base_delay * (2 ** attempt)
+            if on_retry:
+                on_retry(attempt + 1, delay)
+            deadline = time.monotonic() + delay
+            while time.monotonic() < deadline:
+                if should_stop and should_stop():
+                    self._set_status(CONNECTION_LOST, "ยกเลิกการเชื่อมต่อใหม่")
+                    return False, "ยกเลิกการเชื่อมต่อใหม่"
+                time.sleep(min(0.2, max(deadline - time.monotonic(), 0)))
+            
+            # ทิ้ง connection เดิม (และ prepared statement ที่ผูกอยู่) แล้วเชื่อมต่อใหม่
+            self.close_prepared_cursors()
+            try:
+                if self.connection:
+                    self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+            success, message = self.connect()
+            if success:
+                return True, f"เชื่อมต่อใหม่สำเร็จ (ครั้งที่ {attempt + 1})"
+        self._set_status(CONNECTION_LOST, message)
+        return False, message
+    
     def get_person_table_name(self) -> str:
         """คืนค่าชื่อตาราง person ตาม profile ที่กำลังใช้งาน"""
         if self.profile == 'JHCIS':
@@ -453,3 +726,347 @@ class MySQLConnection:
             return ["pid", "idcard", "fname", "lname", "pid"]
         else:
             raise ValueError("Unsupported profile")
+    
+    def _index_scope(self) -> str:
+        """scope ของผลการตรวจสอบ index (profile และฐานข้อมูล)"""
+        return (f"{self.profile}|{self.config.get('host', '')}:{self.config.get('port', '')}/"
+                f"{self.config.get('database', '')}")
+    
+    def inspect_person_indexes(self) -> Dict[str, bool]:
+        """
+        ตรวจสอบว่าคอลัมน์ค้นหาทุกคอลัมน์ใน get_column_mapping() มี index หรือไม่ ด้วย SHOW INDEX
+        
+        คอลัมน์ที่ใช้ index ได้ต้องเป็นคอลัมน์แรกของ index ใด index หนึ่ง ผลลัพธ์ถูกแคชไว้ตาม profile และฐานข้อมูล
+        ถ้าตรวจสอบไม่ได้ (เช่น ไม่มีสิทธิ์) จะคืนค่า dict ว่าง และถือว่ามี index
+        
+        Returns:
+            Dict[str, bool]: คอลัมน์ในฐานข้อมูล -> มี index หรือไม่
+        """
+        scope = self._index_scope()
+        if scope in self._index_cache:
+            return self._index_cache[scope]
+        
+        try:
+            cursor = self.connection.cursor()
+            try:
+                cursor.execute(f"SHOW INDEX FROM {self.get_person_table_name()}")
+                column_names = [description[0] for description in cursor.description]
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+        except Exception as e:
+            link_logger.warning("cannot inspect indexes of person table profile=%s: %s", self.profile, e)
+            return {}
+        
+        seq_position = column_names.index('Seq_in_index')
+        column_position = column_names.index('Column_name')
+        leading_columns = {str(row[column_position]).lower() for row in rows if int(row[seq_position]) == 1}
+        
+        status = {db_column: db_column.lower() in leading_columns
+                  for db_column in set(self.get_column_mapping().values())}
+        self._index_cache[scope] = status
+        return status
+    
+    def is_key_indexed(self, key_column: str) -> bool:
+        """
+        ตรวจสอบว่าคอลัมน์ค้นหา (pid, cid, hn) มี index ในฐานข้อมูลหรือไม่
+        
+        คืนค่า True ถ้ายังไม่ได้ตรวจสอบหรือตรวจสอบไม่ได้ (ไม่เปลี่ยนวิธีค้นหาโดยไม่มีหลักฐาน)
+        """
+        db_column = self.get_column_mapping().get(key_column)
+        status = self._index_cache.get(self._index_scope(), {})
+        return status.get(db_column, True)
+    
+    def get_person_primary_key(self) -> str:
+        """คืนค่าคอลัมน์ primary key ของตาราง person (ใช้เป็น high-water mark ของแถวใหม่)"""
+        if self.profile == 'JHCIS':
+            return 'pid'
+        else:  # HOSXP
+            return 'person_id'
+    
+    def get_person_change_column(self) -> str:
+        """คืนค่าคอลัมน์เวลาแก้ไขล่าสุดของตาราง person (ใช้เป็น change marker ของแถวที่ถูกแก้ไข)"""
+        if self.profile == 'JHCIS':
+            return 'dateupdate'
+        else:  # HOSXP
+            return 'last_update'
+    
+    def has_column(self, table_name: str, column_name: str) -> bool:
+        """ตรวจสอบว่าตารางในฐานข้อมูลปัจจุบันมีคอลัมน์ที่ระบุหรือไม่"""
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT COUNT(*) FROM information_schema.COLUMNS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+                (table_name, column_name)
+            )
+            return cursor.fetchone()[0] > 0
+        finally:
+            cursor.close()
+    
+    def get_person_snapshot(self) -> PersonSnapshot:
+        """คืนค่าไฟล์ snapshot ตาราง person ของ profile และฐานข้อมูลปัจจุบัน"""
+        return PersonSnapshot(LINKAGE_CONFIG.get('snapshot_dir', 'logs/snapshots'), self.profile, self.config)
+    
+    def refresh_person_mirror(self, on_progress=None) -> Tuple[pd.DataFrame, str]:
+        """
+        Sync snapshot ตาราง person ในเครื่องกับฐานข้อมูลแบบ incremental
+        
+        ดึงเฉพาะแถวที่ถูกแก้ไข (change column >= ค่าล่าสุดที่ sync) หรือแถวใหม่ (primary key > ค่าสูงสุดที่ sync)
+        แล้วรวมเข้ากับ snapshot เดิม ดาวน์โหลดทั้งตารางเฉพาะครั้งแรก หรือเมื่อครบรอบ snapshot_full_refresh_days
+        (เพื่อให้แถวที่ถูกลบหายไปจาก snapshot ด้วย)
+        
+        Args:
+            on_progress: callback(ข้อความ, ค่าปัจจุบัน, ค่าสูงสุด)
+            
+        Returns:
+            Tuple[pd.DataFrame, str]: (snapshot ล่าสุด, ข้อความสรุป)
+        """
+        snapshot = self.get_person_snapshot()
+        state = snapshot.load_state()
+        table_name = self.get_person_table_name()
+        columns = self.get_person_query_columns()
+        primary_key = self.get_person_primary_key()
+        change_column = self.get_person_change_column()
+        if not self.has_column(table_name, change_column):
+            change_column = None
+        chunk_size = LINKAGE_CONFIG.get('snapshot_chunk_size', 10000)
+        
+        # อ่าน high-water mark ก่อนดึงข้อมูล เพื่อไม่ให้พลาดแถวที่เปลี่ยนระหว่างดึง
+        max_key, last_change = self._person_high_water_mark(table_name, primary_key, change_column)
+        
+        now = time.time()
+        full_refresh_seconds = LINKAGE_CONFIG.get('snapshot_full_refresh_days', 7) * 86400
+        needs_full_refresh = (not snapshot.exists() or not state or
+                              state.get('change_column') != change_column or
+                              now - state.get('full_refreshed_at', 0) > full_refresh_seconds)
+        
+        if needs_full_refresh:
+            frame = snapshot.download(self.connection, table_name, columns,
+                                      chunk_size=chunk_size, on_progress=on_progress)
+            state = {'full_refreshed_at': now}
+            message = f"ดาวน์โหลด snapshot ทั้งตาราง {len(frame):,} แถว"
+        else:
+            query, params = self._person_changes_query(f"SELECT {','.join(columns)} FROM {table_name}",
+                                                       state, primary_key, change_column)
+            changes = self.fetch_person_frame(query, params, on_progress=on_progress)
+            frame = snapshot.load()
+            if not changes.empty:
+                frame = merge_snapshot_changes(frame, changes)
+                snapshot.save(frame)
+            message = f"อัปเดต snapshot {len(changes):,} แถว (รวม {len(frame):,} แถว)"
+        
+        state.update({
+            'change_column': change_column,
+            'max_key': max_key,
+            'last_change': str(last_change) if last_change is not None else None,
+            'refreshed_at': now
+        })
+        snapshot.save_state(state)
+        return frame, message
+    
+    def _person_high_water_mark(self, table_name: str, primary_key: str,
+                                change_column: Optional[str]) -> Tuple[object, object]:
+        """ค่า primary key สูงสุดและเวลาแก้ไขล่าสุดของตาราง person (None ถ้าไม่มี change column)"""
+        cursor = self.connection.cursor()
+        try:
+            change_expression = f"MAX({change_column})" if change_column else "NULL"
+            cursor.execute(f"SELECT MAX({primary_key}), {change_expression} FROM {table_name}")
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+    
+    @staticmethod
+    def _person_changes_query(select: str, state: Dict, primary_key: str,
+                              change_column: Optional[str]) -> Tuple[str, tuple]:
+        """query ของแถวที่ถูกแก้ไขหรือเพิ่มใหม่ตั้งแต่ high-water mark ใน state"""
+        if change_column and state.get('last_change'):
+            return (f"{select} WHERE {change_column} >= %s OR {primary_key} > %s",
+                    (state['last_change'], state.get('max_key') or 0))
+        return f"{select} WHERE {primary_key} > %s", (state.get('max_key') or 0,)
+    
+    def get_person_key_filter(self) -> PersonKeyFilter:
+        """คืนค่าไฟล์ Bloom filter คีย์ของตาราง person ของ profile และฐานข้อมูลปัจจุบัน"""
+        return PersonKeyFilter(LINKAGE_CONFIG.get('snapshot_dir', 'logs/snapshots'), self.profile, self.config)
+    
+    def refresh_key_filter(self, on_progress=None) -> Tuple[PersonKeyFilter, str]:
+        """
+        สร้างหรืออัปเดต Bloom filter ของคอลัมน์ค้นหาทุกคอลัมน์ (pid, cid, hn) ในตาราง person
+        
+        สร้างใหม่ด้วยการอ่านเฉพาะคอลัมน์คีย์ทั้งตารางครั้งเดียว (streaming) เมื่อยังไม่มี, ครบรอบ
+        key_filter_rebuild_hours หรือมีคีย์เกินขนาดที่ออกแบบไว้ ระหว่างนั้นเพิ่มเฉพาะคีย์ของแถวที่เพิ่ม/แก้ไข
+        ตาม high-water mark แบบเดียวกับ snapshot ทุกครั้งที่เรียก จึงไม่พลาดคีย์ใหม่
+        
+        Args:
+            on_progress: callback(ข้อความ, ค่าปัจจุบัน, ค่าสูงสุด)
+            
+        Returns:
+            Tuple[PersonKeyFilter, str]: (filter ล่าสุด, ข้อความสรุป)
+        """
+        key_filter = self.get_person_key_filter()
+        state = key_filter.load_state()
+        table_name = self.get_person_table_name()
+        db_columns = list(dict.fromkeys(self.get_column_mapping().values()))
+        primary_key = self.get_person_primary_key()
+        change_column = self.get_person_change_column()
+        if not self.has_column(table_name, change_column):
+            change_column = None
+        select = f"SELECT {','.join(db_columns)} FROM {table_name}"
+        
+        max_key, last_change = self._person_high_water_mark(table_name, primary_key, change_column)
+        
+        now = time.time()
+        rebuild_seconds = LINKAGE_CONFIG.get('key_filter_rebuild_hours', 24) * 3600
+        needs_rebuild = (not key_filter.exists() or not state or
+                         state.get('columns') != db_columns or
+                         state.get('change_column') != change_column or
+                         now - state.get('built_at', 0) > rebuild_seconds)
+        if not needs_rebuild:
+            key_filter.load()
+            needs_rebuild = key_filter.is_overfilled()
+        
+        def report_rows(chunks):
+            total_rows = 0
+            for chunk in chunks:
+                total_rows += len(chunk)
+                if on_progress:
+                    on_progress(f"อ่านคีย์ตาราง person แล้ว {total_rows:,} แถว", 0, 0)
+                yield chunk
+        
+        if needs_rebuild:
+            row_count = key_filter.build(report_rows(self.stream_query(select, (), db_columns)),
+                                         db_columns, LINKAGE_CONFIG.get('key_filter_error_rate', 0.01))
+            state = {'built_at': now, 'columns': db_columns}
+            message = f"สร้าง Bloom filter คีย์ตาราง person {row_count:,} แถว"
+        else:
+            query, params = self._person_changes_query(select, state, primary_key, change_column)
+            row_count = key_filter.add_rows(report_rows(self.stream_query(query, params, db_columns)))
+            message = f"อัปเดต Bloom filter คีย์ {row_count:,} แถว"
+        
+        state.update({
+            'change_column': change_column,
+            'max_key': max_key,
+            'last_change': str(last_change) if last_change is not None else None,
+            'refreshed_at': now
+        })
+        key_filter.save_state(state)
+        return key_filter, message
+
+
+class ConnectionHealthMonitor(QThread):
+    """
+    ตรวจสอบการเชื่อมต่อ MySQL เป็นระยะใน thread แยก (ping ไม่ให้ connection หลุดเพราะ wait_timeout
+    และเชื่อมต่อใหม่เมื่อหลุด) GUI อ่านสถานะจาก MySQLConnection.status โดยไม่ต้องติดต่อ server เอง
+    """
+    status_changed = pyqtSignal(str, str)  # สถานะ (CONNECTION_*), ข้อความ
+    
+    def __init__(self, connection: Optional[MySQLConnection] = None, interval_seconds: float = 60):
+        super().__init__()
+        self.connection = connection
+        self.interval_seconds = max(float(interval_seconds), 1.0)
+    
+    def set_connection(self, connection: Optional[MySQLConnection]):
+        """เปลี่ยน connection ที่ตรวจสอบ (เช่น หลังเปลี่ยนการตั้งค่า)"""
+        self.connection = connection
+    
+    def run(self):
+        last_status = None
+        while not self.isInterruptionRequested():
+            connection = self.connection
+            if connection is not None:
+                status = connection.check_health()
+                if status != last_status:
+                    last_status = status
+                    self.status_changed.emit(status, connection.status_message)
+            
+            deadline = time.monotonic() + self.interval_seconds
+            while time.monotonic() < deadline and not self.isInterruptionRequested():
+                self.msleep(200)
+    
+    def stop(self, timeout_ms: int = 3000):
+        """หยุดตรวจสอบ (รอ ping ที่ค้างอยู่ไม่เกิน timeout_ms)"""
+        self.requestInterruption()
+        self.wait(timeout_ms)
+
+
+class MySQLConnectionPool:
+    """กลุ่ม connection สำหรับค้นหาแบบขนาน (แต่ละ worker ใช้ connection ของตัวเอง ไม่ใช้ร่วมกับ GUI thread)"""
+    
+    def __init__(self, size: int = 4, config: Optional[Dict[str, str]] = None):
+        self.size = max(int(size), 1)
+        self.config = dict(config) if config else MySQLConfigManager.load_config()
+        self.members: List[MySQLConnection] = []
+        
+    def connect(self) -> Tuple[bool, str]:
+        """เปิด connection ทั้งหมดใน pool"""
+        for _ in range(self.size - len(self.members)):
+            member = MySQLConnection(self.config)
+            success, message = member.connect()
+            if not success:
+                self.close()
+                return False, message
+            self.members.append(member)
+        return True, f"เปิด {len(self.members)} connection สำเร็จ"
+    
+    def close(self):
+        """ปิด connection ทั้งหมดใน pool"""
+        for member in self.members:
+            try:
+                member.disconnect()
+            except Exception as e:
+                link_logger.warning("cannot close pooled connection: %s", e)
+        self.members = []
+        
+    def run_adaptive(self, func: Callable, next_shard: Callable[[], Optional[Sequence]],
+                     concurrency: Callable[[], int],
+                     on_shard_done: Optional[Callable[[Sequence, object], None]] = None) -> list:
+        """
+        รัน func(connection, shard) กับ shard ที่สร้างทีละ shard โดยมี shard ที่ทำงานพร้อมกันไม่เกิน concurrency()
+        
+        ขนาด shard และจำนวนที่ทำพร้อมกันปรับได้ตามผลของ shard ก่อนหน้า
+        
+        Args:
+            func: ฟังก์ชันที่รับ (MySQLConnection ของ pool, shard)
+            next_shard: คืน shard ถัดไป หรือ None เมื่อไม่มีแล้ว
+            concurrency: คืนจำนวน shard ที่ทำพร้อมกันได้ในขณะนั้น (ไม่เกินจำนวน connection ใน pool)
+            on_shard_done: callback(shard, ผลลัพธ์) เรียกใน thread ที่เรียก run_adaptive
+            
+        Returns:
+            list: ผลลัพธ์ของแต่ละ shard เรียงตามลำดับที่สร้าง shard
+        """
+        if not self.members:
+            raise RuntimeError("Connection pool ยังไม่ได้เชื่อมต่อ")
+        
+        available = queue.Queue()
+        for member in self.members:
+            available.put(member)
+        
+        def run_on_member(shard):
+            member = available.get()
+            try:
+                return func(member, shard)
+            finally:
+                available.put(member)
+        
+        results = []
+        running = {}
+        exhausted = False
+        with ThreadPoolExecutor(max_workers=len(self.members)) as executor:
+            while True:
+                limit = min(max(int(concurrency()), 1), len(self.members))
+                while not exhausted and len(running) < limit:
+                    shard = next_shard()
+                    if shard is None:
+                        exhausted = True
+                        break
+                    results.append(None)
+                    running[executor.submit(run_on_member, shard)] = (len(results) - 1, shard)
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, shard = running.pop(future)
+                    results[index] = future.result()
+                    if on_shard_done:
+                        on_shard_done(shard, results[index])
+        return results
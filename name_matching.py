@@ -0,0 +1,224 @@
+"""
+Name Matching
+จับคู่ชื่อ-นามสกุลแบบ fuzzy กับ snapshot ตาราง person สำหรับแถวที่ไม่มีคีย์หรือค้นหาด้วยคีย์ไม่พบ
+
+เปรียบเทียบเฉพาะคู่ที่อยู่ใน block เดียวกัน (พยัญชนะต้นของชื่อและนามสกุลตามกลุ่มเสียง)
+แล้วคำนวณความคล้ายแบบ vectorized ด้วย numpy จึงไม่ต้องเทียบทุกแถวกับทุกคน
+"""
+
+from typing import Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+from linkage import FOUND_COLUMNS, MATCH_COUNT_COLUMN, NAME_SCORE_COLUMN
+from person_snapshot import SNAPSHOT_COLUMNS
+
+# คำนำหน้าชื่อที่ตัดออกก่อนเปรียบเทียบ (นาย/นาง ตัดเฉพาะเมื่อมีช่องว่างตามหลัง เพื่อไม่ตัดชื่อที่ขึ้นต้นเหมือนกัน)
+TITLE_PATTERN = (r'^(?:นางสาว|เด็กชาย|เด็กหญิง|ด\.ช\.|ด\.ญ\.|น\.ส\.|mrs\.?|mr\.?|ms\.?|miss)\s*'
+                 r'|^(?:นาย|นาง)\s+')
+
+# วรรณยุกต์และเครื่องหมายที่มักสะกดต่างกัน (็ ่ ้ ๊ ๋ ์ ํ ๎) รวมถึงช่องว่าง จุด และขีด
+IGNORED_CHARACTERS = r'[็-๎\s.\-]'
+
+# สระหน้า (เ แ โ ใ ไ) เขียนก่อนพยัญชนะต้น จึงข้ามไปก่อนหาพยัญชนะต้น
+LEADING_VOWELS = 'เแโใไ'
+
+# กลุ่มเสียงของพยัญชนะต้น (พยัญชนะที่ออกเสียงใกล้กันอยู่ block เดียวกัน เผื่อสะกดผิด)
+SOUND_GROUPS = {
+    'k': 'กขฃคฅฆ', 'g': 'ง', 'j': 'จฉชฌ', 's': 'ซศษส', 'y': 'ญย', 'd': 'ดฎ',
+    't': 'ตฏทธฑฒถฐ', 'n': 'นณ', 'b': 'บ', 'p': 'ปผพภ', 'f': 'ฝฟ', 'm': 'ม',
+    'r': 'รลฬฤฦ', 'w': 'ว', 'h': 'หฮ', 'a': 'อ'
+}
+SOUND_GROUP_OF = {character: group for group, characters in SOUND_GROUPS.items() for character in characters}
+
+# จำนวนครั้งสูงสุดที่นับ bigram เดียวกันซ้ำในชื่อหนึ่ง (นับเป็น multiset เช่น 'กกกก' มี 'กก' 3 ครั้ง)
+MAX_BIGRAM_REPEATS = 64
+
+
+def normalize_names(values: pd.Series) -> pd.Series:
+    """
+    ทำความสะอาดชื่อหรือนามสกุลทั้งคอลัมน์: ตัดคำนำหน้า วรรณยุกต์ ช่องว่าง และแปลงเป็นตัวพิมพ์เล็ก
+
+    Returns:
+        pd.Series: ชื่อที่ทำความสะอาดแล้ว ('' ถ้าว่าง) index เดียวกับข้อมูลเดิม
+    """
+    names = values.fillna('').astype(str).str.strip().str.lower()
+    names = names.str.replace(TITLE_PATTERN, '', regex=True)
+    return names.str.replace(IGNORED_CHARACTERS, '', regex=True)
+
+
+def sound_initials(names: pd.Series) -> pd.Series:
+    """กลุ่มเสียงของพยัญชนะต้น (ตัวอักษรละตินใช้ตัวอักษรแรก) ของชื่อที่ทำความสะอาดแล้ว"""
+    initials = names.str.lstrip(LEADING_VOWELS).str[:1]
+    return initials.map(SOUND_GROUP_OF).fillna(initials)
+
+
+def blocking_keys(fnames: pd.Series, lnames: pd.Series) -> pd.Series:
+    """คีย์ block: กลุ่มเสียงของพยัญชนะต้นของชื่อต่อด้วยของนามสกุล"""
+    return sound_initials(fnames) + '|' + sound_initials(lnames)
+
+
+def bigram_tokens(names: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    แปลงชื่อเป็น bigram ทั้งหมด (รวมขอบหน้า/หลัง) สำหรับคำนวณ Dice coefficient
+
+    bigram เก็บเป็นรหัสตัวอักษรสองตัวเต็มๆ (ไม่ hash ลงช่องจำกัด) จึงไม่มี bigram ต่างกันที่ถูกนับว่าตรงกัน
+    bigram ที่ซ้ำในชื่อเดียวกันได้ token ต่างกันตามครั้งที่พบ จำนวน token ที่ตรงกันจึงเท่ากับ
+    ผลรวม min ของจำนวน bigram แต่ละตัว
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (ตำแหน่งของชื่อเจ้าของ, token) เรียงตามตำแหน่งของชื่อ
+    """
+    padded = '^' + names + '$'
+    lengths = padded.str.len().to_numpy()
+    # code point ของทุกตัวอักษรต่อกันเป็น array เดียว แล้วสร้าง bigram ทั้งหมดในครั้งเดียว
+    codes = np.frombuffer(''.join(padded).encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+    bigrams = codes[:-1] * 0x110000 + codes[1:]
+    owners = np.repeat(np.arange(len(lengths)), lengths)[:-1]
+    # ตัด bigram ที่คร่อมระหว่างชื่อ (ตัวอักษรสุดท้ายของชื่อหนึ่งกับตัวแรกของชื่อถัดไป)
+    within = np.ones(len(bigrams), dtype=bool)
+    within[np.cumsum(lengths)[:-1] - 1] = False
+    owners, bigrams = owners[within], bigrams[within]
+    repeats = pd.DataFrame({'owner': owners, 'bigram': bigrams}).groupby(['owner', 'bigram'], sort=False).cumcount()
+    return owners, bigrams * MAX_BIGRAM_REPEATS + np.minimum(repeats.to_numpy(), MAX_BIGRAM_REPEATS - 1)
+
+
+class BigramSets:
+    """token ของชื่อทั้งคอลัมน์ในรูปแบบ CSR (ช่วง offsets[i]:offsets[i + 1] ของ codes คือ token ของชื่อ i)"""
+
+    def __init__(self, owners: np.ndarray, codes: np.ndarray, count: int, vocabulary_size: int):
+        self.sizes = np.bincount(owners, minlength=count).astype(np.int32)
+        self.offsets = np.concatenate([[0], np.cumsum(self.sizes)])
+        self.codes = codes
+        self.vocabulary_size = vocabulary_size
+        # คู่ (ชื่อ, token) ทั้งหมดที่เรียงแล้ว สำหรับตรวจว่า token อยู่ในชื่อใดด้วย searchsorted
+        self.members = np.sort(owners.astype(np.int64) * vocabulary_size + codes)
+
+    @classmethod
+    def pair(cls, names: pd.Series, others: pd.Series) -> Tuple['BigramSets', 'BigramSets']:
+        """สร้าง BigramSets ของสองคอลัมน์ที่จะเปรียบเทียบกัน (ใช้รหัส token ชุดเดียวกัน)"""
+        owners, tokens = bigram_tokens(names)
+        other_owners, other_tokens = bigram_tokens(others)
+        codes, vocabulary = pd.factorize(np.concatenate([tokens, other_tokens]))
+        return (cls(owners, codes[:len(tokens)], len(names), len(vocabulary)),
+                cls(other_owners, codes[len(tokens):], len(others), len(vocabulary)))
+
+    def common_counts(self, others: 'BigramSets', left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """จำนวน token ที่ตรงกันของคู่ (left[i], right[i]) แบบ vectorized"""
+        sizes = self.sizes[left]
+        total = int(sizes.sum())
+        pairs = np.repeat(np.arange(len(left)), sizes)
+        positions = np.repeat(self.offsets[left] - np.cumsum(sizes) + sizes, sizes) + np.arange(total)
+        wanted = right[pairs].astype(np.int64) * self.vocabulary_size + self.codes[positions]
+        members = others.members
+        if not len(members):
+            return np.zeros(len(left), dtype=np.int64)
+        found = members[np.minimum(np.searchsorted(members, wanted), len(members) - 1)] == wanted
+        return np.bincount(pairs[found], minlength=len(left))
+
+
+def _dice(names: BigramSets, others: BigramSets, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """Dice coefficient ของคู่ (left[i], right[i]) แบบ vectorized"""
+    common = names.common_counts(others, left, right)
+    return 2.0 * common / (names.sizes[left] + others.sizes[right])
+
+
+def _prepare_names(fnames: pd.Series, lnames: pd.Series) -> pd.DataFrame:
+    """ทำความสะอาดชื่อ-นามสกุลและสร้างคีย์ block (เฉพาะแถวที่มีทั้งชื่อและนามสกุล)"""
+    names = pd.DataFrame({'fname': normalize_names(fnames), 'lname': normalize_names(lnames)})
+    names = names[(names['fname'] != '') & (names['lname'] != '')]
+    return names.assign(block=blocking_keys(names['fname'], names['lname']))
+
+
+def _iter_pairs(query: pd.DataFrame, persons: pd.DataFrame, chunk_size: int) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """สร้างคู่ (ตำแหน่งใน query, ตำแหน่งใน persons) ที่อยู่ใน block เดียวกัน ทีละไม่เกิน chunk_size คู่โดยประมาณ"""
+    # เรียง persons ตาม block แล้วหาช่วง [เริ่ม, จบ) ของ block ของแต่ละแถว query
+    codes, blocks = pd.factorize(persons['block'])
+    order = np.argsort(codes, kind='stable')
+    block_starts = np.searchsorted(codes[order], np.arange(len(blocks)))
+    block_sizes = np.bincount(codes, minlength=len(blocks))
+    query_codes = blocks.get_indexer(query['block'])
+    has_block = query_codes >= 0
+    starts = np.where(has_block, block_starts[query_codes], 0)
+    pair_counts = np.where(has_block, block_sizes[query_codes], 0)
+
+    start = 0
+    while start < len(query):
+        # จำนวนแถว query ที่รวมแล้วได้คู่ไม่เกิน chunk_size (อย่างน้อย 1 แถว)
+        cumulative = np.cumsum(pair_counts[start:])
+        stop = start + max(int(np.searchsorted(cumulative, chunk_size, side='right')), 1)
+        counts = pair_counts[start:stop]
+        total = int(counts.sum())
+        if total:
+            rows = np.repeat(np.arange(start, stop), counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            yield rows, order[np.repeat(starts[start:stop], counts) + offsets]
+        start = stop
+
+
+def name_candidates(fnames: pd.Series, lnames: pd.Series, snapshot: pd.DataFrame,
+                    min_score: float = 0.85, chunk_size: int = 200000) -> pd.DataFrame:
+    """
+    หาคนใน snapshot ที่ชื่อ-นามสกุลคล้ายกับแต่ละแถว เปรียบเทียบเฉพาะภายใน block เดียวกัน
+
+    Args:
+        fnames: ชื่อของแต่ละแถว (index คือแถวของข้อมูล)
+        lnames: นามสกุลของแต่ละแถว (index เดียวกับ fnames)
+        snapshot: snapshot ที่มีคอลัมน์ตาม SNAPSHOT_COLUMNS
+        min_score: คะแนนขั้นต่ำ (ค่าเฉลี่ย Dice coefficient ของชื่อและนามสกุล)
+        chunk_size: จำนวนคู่ที่คำนวณต่อครั้ง (จำกัดหน่วยความจำ)
+
+    Returns:
+        pd.DataFrame: คอลัมน์ row (index ของแถว), person (ตำแหน่งใน snapshot), score
+        เรียงตาม row คะแนนจากมากไปน้อย และตำแหน่งใน snapshot (คะแนนเท่ากันเลือกคนแรกเสมอ)
+    """
+    query = _prepare_names(fnames, lnames)
+    persons = _prepare_names(snapshot['fname'], snapshot['lname'])
+    # สร้าง bigram เฉพาะคนที่อยู่ใน block ที่มีแถวต้องค้นหา
+    persons = persons[persons['block'].isin(query['block'])]
+    if query.empty or persons.empty:
+        return pd.DataFrame({'row': query.index[:0], 'person': np.array([], dtype=np.int64),
+                             'score': np.array([], dtype=float)})
+
+    bigrams = {}
+    bigrams['query_fname'], bigrams['person_fname'] = BigramSets.pair(query['fname'], persons['fname'])
+    bigrams['query_lname'], bigrams['person_lname'] = BigramSets.pair(query['lname'], persons['lname'])
+    person_positions = snapshot.index.get_indexer(persons.index)
+
+    parts = []
+    for rows, people in _iter_pairs(query, persons, chunk_size):
+        # คะแนนนามสกุลไม่เกิน 1 คู่ที่คะแนนชื่อต่ำกว่า 2 * min_score - 1 จึงไม่มีทางผ่าน ไม่ต้องคำนวณนามสกุล
+        fname_scores = _dice(bigrams['query_fname'], bigrams['person_fname'], rows, people)
+        possible = fname_scores >= 2 * min_score - 1
+        rows, people = rows[possible], people[possible]
+        scores = (fname_scores[possible] + _dice(bigrams['query_lname'], bigrams['person_lname'], rows, people)) / 2
+        keep = scores >= min_score
+        parts.append(pd.DataFrame({'row': query.index[rows[keep]], 'person': person_positions[people[keep]],
+                                   'score': scores[keep].round(3)}))
+
+    if not parts:
+        return pd.DataFrame({'row': query.index[:0], 'person': np.array([], dtype=np.int64),
+                             'score': np.array([], dtype=float)})
+    candidates = pd.concat(parts, ignore_index=True)
+    return candidates.sort_values(['row', 'score', 'person'], ascending=[True, False, True], kind='stable',
+                                  ignore_index=True)
+
+
+def best_name_matches(candidates: pd.DataFrame, snapshot: pd.DataFrame) -> pd.DataFrame:
+    """
+    เลือกคนที่คะแนนสูงสุดของแต่ละแถว
+
+    แถวที่มีผู้ที่คะแนนผ่านเกณฑ์หลายคน (รวมถึงคะแนนสูงสุดเท่ากัน) ไม่ควรถือว่าจับคู่ได้แน่นอน
+    จึงเก็บจำนวนผู้ที่ผ่านเกณฑ์ไว้ใน MATCH_COUNT_COLUMN เพื่อ flag เป็นคีย์กำกวมเหมือนการค้นหาด้วยคีย์
+
+    Returns:
+        pd.DataFrame: คอลัมน์ FOUND_COLUMNS, NAME_SCORE_COLUMN และ MATCH_COUNT_COLUMN (index คือแถวของข้อมูล)
+    """
+    best = candidates.drop_duplicates('row', keep='first')
+    found = snapshot.iloc[best['person'].to_numpy()][SNAPSHOT_COLUMNS].astype(object)
+    found.columns = FOUND_COLUMNS
+    found.index = best['row'].to_numpy()
+    found[NAME_SCORE_COLUMN] = best['score'].to_numpy()
+    found[MATCH_COUNT_COLUMN] = candidates['row'].value_counts().reindex(found.index).to_numpy()
+    return found
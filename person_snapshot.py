@@ -0,0 +1,217 @@
+"""
+Person Snapshot
+สำเนาคอลัมน์ค้นหาของตาราง person เก็บเป็นไฟล์ในเครื่อง สำหรับเชื่อมโยงแบบ in-memory ด้วย pandas
+"""
+
+import json
+import os
+import re
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from linkage import FOUND_COLUMNS, discard_remaining_rows, match_db_keys
+
+# Parquet (ไฟล์แบบ columnar) ต้องใช้ pyarrow ถ้าไม่มีจะเก็บเป็น pickle แทน
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+# ชื่อคอลัมน์ใน snapshot (ตามลำดับของ get_person_query_columns)
+SNAPSHOT_COLUMNS = ['pid', 'cid', 'fname', 'lname', 'hn']
+
+
+class PersonSnapshot:
+    """ไฟล์ snapshot ของตาราง person สำหรับ profile และฐานข้อมูลหนึ่งๆ"""
+
+    # snapshot ที่โหลดแล้ว: path -> (mtime, DataFrame) เพื่อไม่ต้องอ่านไฟล์ซ้ำทุกครั้งที่เชื่อมโยง
+    _loaded: Dict[str, tuple] = {}
+
+    def __init__(self, directory: str, profile: str, config: Dict[str, str]):
+        name = f"{profile}_{config.get('host', '')}_{config.get('port', '')}_{config.get('database', '')}"
+        name = re.sub(r'[^0-9A-Za-z_.-]+', '_', name)
+        extension = '.parquet' if PARQUET_AVAILABLE else '.pkl'
+        self.path = os.path.join(directory, f"person_{name}{extension}")
+        self.state_path = os.path.join(directory, f"person_{name}.json")
+
+    def exists(self) -> bool:
+        """ตรวจสอบว่ามีไฟล์ snapshot แล้วหรือไม่"""
+        return os.path.isfile(self.path)
+
+    def load(self) -> pd.DataFrame:
+        """โหลด snapshot จากไฟล์ (ใช้ข้อมูลที่โหลดไว้แล้วถ้าไฟล์ไม่เปลี่ยน)"""
+        mtime = os.path.getmtime(self.path)
+        loaded = self._loaded.get(self.path)
+        if loaded and loaded[0] == mtime:
+            return loaded[1]
+
+        if self.path.endswith('.parquet'):
+            frame = pd.read_parquet(self.path)
+        else:
+            frame = pd.read_pickle(self.path)
+        self._loaded[self.path] = (mtime, frame)
+        return frame
+
+    def save(self, frame: pd.DataFrame):
+        """บันทึก snapshot ลงไฟล์ (เขียนไฟล์ชั่วคราวก่อนแล้วค่อยแทนที่ เพื่อไม่ให้ไฟล์เสียถ้าถูกขัดจังหวะ)"""
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        temp_path = self.path + '.tmp'
+        if self.path.endswith('.parquet'):
+            frame.to_parquet(temp_path, index=False)
+        else:
+            frame.to_pickle(temp_path)
+        os.replace(temp_path, self.path)
+        self._loaded[self.path] = (os.path.getmtime(self.path), frame)
+
+    def download(self, connection, table_name: str, columns: List[str], chunk_size: int = 10000,
+                 on_progress: Optional[Callable[[str, int, int], None]] = None) -> pd.DataFrame:
+        """
+        ดึงคอลัมน์ค้นหาทั้งตาราง person ด้วย cursor แบบ streaming แล้วบันทึกเป็น snapshot
+
+        Args:
+            connection: mysql.connector connection
+            table_name: ชื่อตาราง person
+            columns: คอลัมน์ที่ต้องการ (ตาม get_person_query_columns)
+            chunk_size: จำนวนแถวต่อการ fetch
+            on_progress: callback(ข้อความ, ค่าปัจจุบัน, ค่าสูงสุด)
+
+        Returns:
+            pd.DataFrame: snapshot ที่มีคอลัมน์ตาม SNAPSHOT_COLUMNS
+        """
+        frame = fetch_person_rows(connection, f"SELECT {','.join(columns)} FROM {table_name}",
+                                  chunk_size=chunk_size, on_progress=on_progress)
+        self.save(frame)
+        return frame
+
+    def load_state(self) -> Dict:
+        """โหลดสถานะการ sync (high-water mark) ของ snapshot"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_state(self, state: Dict):
+        """บันทึกสถานะการ sync (high-water mark) ของ snapshot"""
+        with open(self.state_path, 'w', encoding='utf-8') as file:
+            json.dump(state, file, ensure_ascii=False, indent=2)
+
+
+def iter_query_chunks(connection, query: str, params: tuple = (), columns: Optional[Sequence[str]] = None,
+                      chunk_size: int = 10000,
+                      should_stop: Optional[Callable[[], bool]] = None) -> Iterator[pd.DataFrame]:
+    """
+    รัน query ด้วย cursor แบบ unbuffered แล้วทยอยคืนผลลัพธ์เป็น DataFrame ทีละไม่เกิน chunk_size แถว
+
+    server ส่งแถวมาเท่าที่ fetchmany อ่าน หน่วยความจำจึงใช้ไม่เกินขนาด chunk (ไม่อ่านผลลัพธ์ทั้งหมดเข้ามาก่อน)
+    ถ้า should_stop คืนค่า True จะหยุดอ่าน (ผลลัพธ์ที่เหลือถูกอ่านทิ้ง connection จึงใช้ต่อได้)
+
+    Args:
+        connection: mysql.connector connection
+        columns: ชื่อคอลัมน์ของ DataFrame (None = ใช้ชื่อคอลัมน์จาก query)
+    """
+    cursor = connection.cursor(buffered=False)
+    try:
+        cursor.execute(query, params)
+        names = list(columns) if columns is not None else [description[0] for description in cursor.description]
+        while True:
+            if should_stop and should_stop():
+                discard_remaining_rows(cursor, chunk_size)  # อ่านผลลัพธ์ที่เหลือทิ้ง connection จึงใช้ต่อได้
+                break
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=names)
+    finally:
+        cursor.close()
+
+
+class FrameBuilder:
+    """
+    รวม DataFrame ที่ทยอยอ่านมาเป็น DataFrame เดียว โดยเก็บแยกเป็น array ของแต่ละคอลัมน์
+
+    ตอน build จะต่อ array ทีละคอลัมน์แล้วคืนหน่วยความจำของ chunk ทันที หน่วยความจำสูงสุดจึงเกินขนาดผลลัพธ์
+    ไม่เกิน 1 คอลัมน์ (pd.concat ของทั้ง DataFrame ต้องมีทั้ง chunk และผลลัพธ์อยู่พร้อมกัน)
+    """
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns = list(columns)
+        self._parts: Dict[str, List[np.ndarray]] = {column: [] for column in self.columns}
+        self.row_count = 0
+
+    def append(self, chunk: pd.DataFrame):
+        """เพิ่ม chunk (คอลัมน์ตาม columns)"""
+        for column in self.columns:
+            self._parts[column].append(chunk[column].to_numpy())
+        self.row_count += len(chunk)
+
+    def build(self) -> pd.DataFrame:
+        """ต่อทุก chunk เป็น DataFrame (เรียกได้ครั้งเดียว)"""
+        data = {}
+        for column in self.columns:
+            parts = self._parts.pop(column)
+            # ต่อผ่าน Series เพื่อให้ pandas เลือก dtype ร่วมเมื่อ chunk มี dtype ต่างกัน (เช่น int กับ None)
+            data[column] = (pd.concat([pd.Series(part, copy=False) for part in parts], ignore_index=True)
+                            if parts else pd.Series([], dtype=object))
+            del parts
+        return pd.DataFrame(data, columns=self.columns)
+
+
+def fetch_person_rows(connection, query: str, params: tuple = (), chunk_size: int = 10000,
+                      on_progress: Optional[Callable[[str, int, int], None]] = None,
+                      should_stop: Optional[Callable[[], bool]] = None) -> pd.DataFrame:
+    """
+    รัน query ที่คืนคอลัมน์ตามลำดับ SNAPSHOT_COLUMNS แล้วทยอยอ่านผลลัพธ์เป็น DataFrame
+
+    ถ้า should_stop คืนค่า True จะหยุดอ่านและคืนเฉพาะแถวที่อ่านแล้ว
+    """
+    builder = FrameBuilder(SNAPSHOT_COLUMNS)
+    for chunk in iter_query_chunks(connection, query, params, SNAPSHOT_COLUMNS,
+                                   chunk_size=chunk_size, should_stop=should_stop):
+        builder.append(chunk)
+        if on_progress:
+            on_progress(f"ดาวน์โหลดข้อมูลตาราง person แล้ว {builder.row_count:,} แถว", 0, 0)
+    return builder.build()
+
+
+def merge_snapshot_changes(snapshot: pd.DataFrame, changes: pd.DataFrame) -> pd.DataFrame:
+    """รวมแถวที่เปลี่ยนแปลง/เพิ่มใหม่เข้ากับ snapshot เดิม (แทนที่แถวเดิมที่มี pid เดียวกัน)"""
+    if changes.empty:
+        return snapshot
+    unchanged = snapshot[~snapshot['pid'].isin(changes['pid'])]
+    return pd.concat([unchanged, changes], ignore_index=True)
+
+
+def match_snapshot(keys: Sequence[str], snapshot: pd.DataFrame, key_column: str,
+                   counts: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+    """
+    จับคู่คีย์จาก Excel กับ snapshot ด้วย DataFrame.merge (hash join ในหน่วยความจำ)
+
+    Args:
+        keys: คีย์ที่ไม่ซ้ำที่ต้องการค้นหา (normalize แล้ว)
+        snapshot: snapshot ที่มีคอลัมน์ตาม SNAPSHOT_COLUMNS
+        key_column: คอลัมน์ใน snapshot ที่ใช้จับคู่ ('pid', 'cid' หรือ 'hn')
+        counts: dict สำหรับเก็บจำนวนแถวที่พบของแต่ละคีย์ (ไม่บังคับ)
+
+    Returns:
+        pd.DataFrame: คอลัมน์ FOUND_COLUMNS เฉพาะคีย์ที่พบ (index คือคีย์)
+    """
+    # จับคู่ตามกติกาของ MySQL (ไม่แยกตัวพิมพ์ ไม่สนช่องว่างท้าย แปลงชนิดเมื่อคอลัมน์เป็นตัวเลข)
+    # ผลลัพธ์จึงเหมือนการค้นหาใน MySQL โดยตรง
+    search_keys = match_db_keys(snapshot[key_column], keys)
+    lookup = snapshot.loc[search_keys.index, SNAPSHOT_COLUMNS]
+    lookup = lookup.rename(columns=dict(zip(SNAPSHOT_COLUMNS, FOUND_COLUMNS)))
+    lookup = lookup.astype(object).where(lookup.notna(), '')  # ค่าว่างเป็น '' เหมือนผลลัพธ์จาก MySQL
+    lookup['_search_key'] = search_keys.to_numpy()
+    if counts is not None:
+        counts.update(lookup['_search_key'].value_counts().to_dict())
+    # เก็บเฉพาะแถวแรกของแต่ละคีย์ (เหมือน LIMIT 1 ของการค้นหาใน MySQL)
+    lookup = lookup.drop_duplicates('_search_key', keep='first')
+    return lookup.set_index('_search_key')[FOUND_COLUMNS]
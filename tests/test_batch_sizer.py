@@ -0,0 +1,78 @@
+"""
+ขนาด batch ที่ปรับตามเวลาที่ใช้จริง และจำนวน placeholder ของ prepared statement แบบ IN-list
+"""
+
+from linkage import AdaptiveBatchSizer, build_in_list_query, in_list_bucket, lookup_in_list
+
+
+def test_in_list_bucket_rounds_up_to_power_of_two():
+    assert [in_list_bucket(count) for count in (0, 1, 2, 3, 4, 5, 200, 256, 257)] == [1, 1, 2, 4, 4, 8, 256, 256, 512]
+
+
+def test_batch_grows_towards_target_time():
+    sizer = AdaptiveBatchSizer(1000, target_seconds=1.0, min_batch_size=200, max_batch_size=20000)
+    sizer.record(1000, 1000, 0.1)
+    assert sizer.batch_size == 2000  # โตได้ไม่เกิน MAX_STEP เท่าต่อครั้ง
+    for _ in range(10):
+        sizer.record(sizer.batch_size, 0, sizer.batch_size * 0.0001)
+    assert sizer.batch_size == 10000
+
+
+def test_batch_shrinks_when_slow_and_respects_limits():
+    sizer = AdaptiveBatchSizer(1000, target_seconds=1.0, min_batch_size=200, max_batch_size=20000)
+    sizer.record(1000, 0, 4.0)
+    assert sizer.batch_size == 500
+    sizer.record_failure()
+    sizer.record_failure()
+    assert sizer.batch_size == 200
+
+
+def test_fixed_batch_size_when_not_adaptive():
+    sizer = AdaptiveBatchSizer(700, adaptive=False, max_concurrency=3)
+    sizer.record(700, 0, 10.0)
+    assert (sizer.batch_size, sizer.concurrency) == (700, 3)
+
+
+def test_concurrency_increases_while_throughput_improves():
+    sizer = AdaptiveBatchSizer(1000, target_seconds=1.0, max_concurrency=3)
+    sizer.record(1000, 0, 1.0)
+    assert sizer.concurrency == 2
+    # 2 batch พร้อมกันได้คีย์ต่อวินาทีรวมไม่เพิ่ม -> กลับเป็น 1
+    sizer.record(1000, 0, 2.0)
+    sizer.record(1000, 0, 2.0)
+    assert sizer.concurrency == 1
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, query, params):
+        self.executed.append((query, params))
+
+    def fetchall(self):
+        return []
+
+
+class RecordingConnection:
+    """MySQLConnection ที่จำ query ที่ prepare ไว้"""
+
+    def __init__(self):
+        self.cursors = {}
+
+    def prepared_cursor(self, query):
+        return self.cursors.setdefault(query, RecordingCursor())
+
+    def discard_prepared_cursor(self, query):
+        self.cursors.pop(query, None)
+
+
+def test_lookup_in_list_reuses_statement_within_bucket():
+    connection = RecordingConnection()
+    lookup_in_list(connection, 'person', ['hn'], 'hn', ['1', '2', '3'])
+    lookup_in_list(connection, 'person', ['hn'], 'hn', ['4', '5', '6', '7'])
+
+    assert list(connection.cursors) == [build_in_list_query('person', ['hn'], 'hn', 4)]
+    executed = next(iter(connection.cursors.values())).executed
+    # placeholder ที่เกินเติมด้วยคีย์แรก
+    assert [params for _, params in executed] == [('1', '2', '3', '1'), ('4', '5', '6', '7')]
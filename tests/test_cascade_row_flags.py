@@ -0,0 +1,82 @@
+"""
+คอลัมน์ตรวจสอบรายแถวของการเชื่อมโยงแบบหลายคีย์ (cid -> hn -> pid)
+เมื่อบางแถวไม่มี cid (cid_check มีเฉพาะแถวที่มี cid)
+"""
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('PyQt5')
+pytest.importorskip('mysql.connector')
+pytest.importorskip('winreg')  # mysql_config อ่าน registry ของ Windows
+
+from exchange_unsen import MySQLSearchThread  # noqa: E402
+from linkage import (CASCADE_OPTION, CID_CHECK_COLUMN, FOUND_COLUMNS, MATCHED_BY_COLUMN,  # noqa: E402
+                     PROCESSED_COLUMN, STRATEGY_SNAPSHOT, attach_results)
+
+VALID_CID = '1101700203450'
+
+
+class FakeConnection:
+    """connection ที่ให้เฉพาะข้อมูล profile (การค้นหาจริงถูกแทนด้วย _search_snapshot)"""
+    profile = 'HOSXP'
+
+    def get_person_table_name(self):
+        return 'person'
+
+    def get_person_query_columns(self):
+        return ['person_id', 'cid', 'fname', 'lname', 'patient_hn']
+
+    def get_column_mapping(self):
+        return {'pid': 'person_id', 'cid': 'cid', 'hn': 'patient_hn'}
+
+
+# คนใน person ตามคอลัมน์คีย์ -> คีย์ -> แถวผลลัพธ์ (FOUND_COLUMNS)
+PERSONS = {
+    'cid': {VALID_CID: ['1', VALID_CID, 'สมชาย', 'ใจดี', '001']},
+    'hn': {'002': ['2', '', 'สมหญิง', 'ใจงาม', '002']},
+    'pid': {'3': ['3', '', 'สมศักดิ์', 'ใจเย็น', '003']},
+}
+
+
+def make_thread(data):
+    thread = MySQLSearchThread(data, CASCADE_OPTION, FakeConnection(), strategy=STRATEGY_SNAPSHOT)
+
+    def search_snapshot(unique_keys):
+        persons = PERSONS[thread.key_column]
+        found = {key: persons[key] for key in unique_keys if key in persons}
+        return pd.DataFrame.from_dict(found, orient='index', columns=FOUND_COLUMNS)
+
+    thread._search_snapshot = search_snapshot
+    return thread
+
+
+@pytest.fixture
+def data():
+    # แถว 1-3 ไม่มี cid จึงไม่มีใน cid_check แถว 3 ไม่พบด้วยคีย์ใดเลย
+    return pd.DataFrame({
+        'cid': [VALID_CID, None, None, None],
+        'hn': ['001', '002', None, '999'],
+        'pid': ['1', None, '3', None],
+    })
+
+
+def test_matched_by_kept_for_rows_without_cid(data):
+    thread = make_thread(data)
+    matched_rows = thread.link()
+
+    assert list(thread.row_flags.index) == list(data.index)
+    result = attach_results(data, matched_rows, thread.row_flags)
+    assert result[MATCHED_BY_COLUMN].tolist() == ['cid', 'hn', 'pid', '']
+    assert result[CID_CHECK_COLUMN].tolist() == ['', '', '', '']
+    assert result['pid_found'].tolist() == ['1', '2', '3', '']
+
+
+def test_processed_marker_kept_for_rows_without_cid(data):
+    thread = make_thread(data)
+    thread._mark_processed_rows(pd.Index([1, 3]))
+    thread._add_row_flag(pd.Series(['', 'x'], index=[0, 2], name=CID_CHECK_COLUMN))
+
+    result = attach_results(data, pd.DataFrame(columns=FOUND_COLUMNS, dtype=object), thread.row_flags)
+    assert result[PROCESSED_COLUMN].tolist() == ['Y', 'N', 'Y', 'N']
+    assert result[CID_CHECK_COLUMN].tolist() == ['', '', 'x', '']
@@ -0,0 +1,29 @@
+"""
+การทำความสะอาดและตรวจสอบเลขบัตรประชาชน (รูปแบบ 13 หลักและเลขตรวจสอบ mod 11)
+"""
+
+import pandas as pd
+
+from linkage import CID_INVALID_CHECKSUM, CID_INVALID_FORMAT, normalize_cid, validate_cid
+
+VALID_CID = '1101700203450'
+
+
+def test_normalize_cid_cleans_common_excel_formats():
+    values = pd.Series(['1-1017-00203-45-0', '๑๑๐๑๗๐๐๒๐๓๔๕๐', '1.10170020345E+12', None, '  ', 1101700203450.0])
+    cids = normalize_cid(values)
+
+    assert cids.tolist() == [VALID_CID] * 4
+    assert cids.index.tolist() == [0, 1, 2, 5]
+
+
+def test_validate_cid_reports_format_and_checksum():
+    cids = pd.Series([VALID_CID, '1101700203451', '12345', '110170020345x'], index=[3, 5, 7, 9])
+    reasons = validate_cid(cids)
+
+    assert reasons.index.tolist() == [3, 5, 7, 9]
+    assert reasons.tolist() == ['', CID_INVALID_CHECKSUM, CID_INVALID_FORMAT, CID_INVALID_FORMAT]
+
+
+def test_validate_cid_empty():
+    assert validate_cid(pd.Series([], dtype=object)).empty
@@ -0,0 +1,55 @@
+"""
+Bloom filter คีย์ของตาราง person ต้องไม่ตอบว่าไม่มีสำหรับคีย์ที่ MySQL ถือว่าเท่ากับค่าในตาราง
+(ตัวเลขที่มีศูนย์นำหน้า ตัวพิมพ์ต่างกัน ช่องว่างท้าย)
+"""
+
+from decimal import Decimal
+
+import pandas as pd
+
+from key_filter import KeyBloomFilter, PersonKeyFilter
+from linkage import db_key_forms, search_key_forms
+
+
+def make_filter(values):
+    key_filter = KeyBloomFilter.for_capacity(len(values), 0.001)
+    key_filter.add(pd.Series(values))
+    return key_filter
+
+
+def test_integer_column_matches_zero_padded_keys():
+    key_filter = make_filter([123, 456])
+    assert key_filter.might_contain(['123', '00123', '456', '123.0']).tolist() == [True, True, True, True]
+
+
+def test_decimal_and_object_numeric_values():
+    key_filter = make_filter(pd.Series([Decimal('10.50'), 7, None], dtype=object))
+    assert key_filter.might_contain(['10.5', '010.500', '007']).tolist() == [True, True, True]
+
+
+def test_text_column_matches_case_and_trailing_space():
+    key_filter = make_filter(['AB12 ', 'xy9'])
+    assert key_filter.might_contain(['ab12', 'AB12', 'XY9']).tolist() == [True, True, True]
+
+
+def test_text_column_does_not_coerce_numbers():
+    # คอลัมน์ข้อความ '00123' ไม่ตรงกับคีย์ '123' ใน MySQL (เทียบเป็นข้อความ)
+    assert db_key_forms(pd.Series(['00123'])).tolist() == ['s:00123']
+    assert sorted(search_key_forms(pd.Series(['123'])).tolist()) == ['n:123', 's:123']
+
+
+def test_missing_keys_are_rejected():
+    key_filter = make_filter(list(range(1000)))
+    assert not key_filter.might_contain(['abc', 'def', 'ghi']).any()
+    assert key_filter.might_contain([]).tolist() == []
+
+
+def test_build_and_load_round_trip(tmp_path):
+    person_filter = PersonKeyFilter(str(tmp_path), 'HOSXP', {'host': 'db', 'port': 3306, 'database': 'hos'})
+    person_filter.build([pd.DataFrame({'hn': [1, 2], 'cid': ['A1', None]})], ['hn', 'cid'])
+
+    loaded = PersonKeyFilter(str(tmp_path), 'HOSXP', {'host': 'db', 'port': 3306, 'database': 'hos'})
+    loaded.load()
+    assert loaded.might_contain('hn', ['0001', '02']).tolist() == [True, True]
+    assert loaded.might_contain('cid', ['a1']).tolist() == [True]
+    assert loaded.might_contain('pid', ['9']).tolist() == [True]
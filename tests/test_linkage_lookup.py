@@ -0,0 +1,76 @@
+"""
+การค้นหาแบบกลุ่ม (IN-list): แปลงแถวที่ฐานข้อมูลคืนมากลับเป็นคีย์ที่ค้นหาและเก็บค่าผลลัพธ์
+"""
+
+from decimal import Decimal
+
+from linkage import _SearchKeyIndex, lookup_in_list
+
+
+class FakeCursor:
+    """cursor ที่คืนแถวที่กำหนดไว้ และจำ query/params ที่ execute ล่าสุด"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, query, params):
+        self.executed.append((query, params))
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    """MySQLConnection ที่ให้เฉพาะ prepared_cursor"""
+
+    def __init__(self, rows):
+        self.cursor = FakeCursor(rows)
+
+    def prepared_cursor(self, query):
+        return self.cursor
+
+    def discard_prepared_cursor(self, query):
+        pass
+
+
+COLUMNS = ['person_id', 'cid', 'fname', 'lname', 'hn']
+
+
+def lookup(rows, keys, counts=None):
+    return lookup_in_list(FakeConnection(rows), 'person', COLUMNS, 'hn', keys, counts)
+
+
+def test_falsy_values_are_kept():
+    # 0 และ Decimal(0) เป็นค่าจริง มีเพียง NULL ที่เป็น ''
+    rows = [('A1', 0, None, 'สมชาย', '', Decimal(0))]
+    assert lookup(rows, ['A1']) == {'A1': (0, '', 'สมชาย', '', Decimal(0))}
+
+
+def test_search_key_index_precedence():
+    index = _SearchKeyIndex(['ABC', 'abc', '00123', '123', 'X1'])
+
+    assert index.search_keys('ABC') == ['ABC']
+    assert index.search_keys('X1 ') == ['X1']
+    assert sorted(index.search_keys('Abc')) == ['ABC', 'abc']
+    assert index.search_keys(b'abc') == ['abc']
+    assert sorted(index.search_keys(123)) == ['00123', '123']
+    assert sorted(index.search_keys(Decimal('123.00'))) == ['00123', '123']
+    assert index.search_keys(True) == []
+    assert index.search_keys('zzz') == []
+
+
+def test_lookup_in_list_maps_db_values_to_searched_keys():
+    # hn ชนิด int และค่าที่ต่างตัวพิมพ์/มีช่องว่างท้าย ต้องคืนผลให้คีย์ที่ค้นหา
+    rows = [(123, 1, '', 'ก', 'ข', 123), ('ab12 ', 2, '', 'ค', 'ง', 'ab12 '), (123, 3, '', 'จ', 'ฉ', 123)]
+    counts = {}
+    results = lookup(rows, ['00123', 'AB12', '999'], counts)
+
+    assert results == {'00123': (1, '', 'ก', 'ข', 123), 'AB12': (2, '', 'ค', 'ง', 'ab12 ')}
+    assert counts == {'00123': 2, 'AB12': 1}
+
+
+def test_lookup_in_list_empty_keys():
+    connection = FakeConnection([])
+    assert lookup_in_list(connection, 'person', COLUMNS, 'hn', []) == {}
+    assert connection.cursor.executed == []
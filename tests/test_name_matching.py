@@ -0,0 +1,68 @@
+"""
+การจับคู่ชื่อ-นามสกุลแบบ fuzzy: คะแนน Dice ต้องคำนวณจาก bigram จริง (ไม่มี bigram ต่างกันที่ชนกัน)
+และแถวที่มีคนชื่อคล้ายหลายคนต้องถูกนับไว้สำหรับ flag คีย์กำกวม
+"""
+
+import numpy as np
+import pandas as pd
+
+from linkage import MATCH_COUNT_COLUMN, NAME_SCORE_COLUMN
+from name_matching import BigramSets, _dice, best_name_matches, name_candidates
+
+
+def make_snapshot(names):
+    return pd.DataFrame({'pid': list(range(1, len(names) + 1)), 'cid': '', 'hn': '',
+                         'fname': [fname for fname, _ in names], 'lname': [lname for _, lname in names]})
+
+
+def dice(left, right):
+    names, others = BigramSets.pair(pd.Series([left]), pd.Series([right]))
+    return _dice(names, others, np.array([0]), np.array([0]))[0]
+
+
+def test_dice_counts_only_identical_bigrams():
+    assert dice('abcd', 'abcd') == 1.0
+    # ไม่มี bigram ร่วมกันเลยนอกจากไม่มี -> 0 (hash ลงช่องจำกัดอาจชนกันได้)
+    assert dice('abcd', 'wxyz') == 0.0
+    # ^a ab bc c$ กับ ^a ab bd d$ มีร่วมกัน 2 จาก 4 + 4
+    assert dice('abc', 'abd') == 0.5
+
+
+def test_dice_counts_repeated_bigrams_as_multiset():
+    # ^a aa aa a$ กับ ^a aa a$: ร่วมกัน 3 จาก 4 + 3
+    assert dice('aaa', 'aa') == 2 * 3 / 7
+
+
+def test_dice_with_many_distinct_characters_has_no_collisions():
+    # ชื่อที่มีตัวอักษรต่างกันมาก (bigram หลายร้อยตัว) ต้องไม่ได้คะแนนจากการชนกันของ hash
+    left = ''.join(chr(0x0E01 + i) for i in range(40))
+    right = ''.join(chr(0x4E00 + i) for i in range(300))
+    assert dice(left, right) == 0.0
+
+
+def test_name_candidates_finds_similar_names_in_block():
+    snapshot = make_snapshot([('สมชาย', 'ใจดี'), ('สมชัย', 'ใจดี'), ('มานะ', 'ใจดี')])
+    candidates = name_candidates(pd.Series(['นาย สมชาย'], index=[10]), pd.Series(['ใจดี'], index=[10]),
+                                 snapshot, min_score=0.6)
+
+    assert candidates['row'].tolist() == [10, 10]
+    assert candidates['person'].tolist() == [0, 1]
+    assert candidates['score'].iloc[0] == 1.0
+
+
+def test_best_name_matches_flags_multiple_candidates():
+    snapshot = make_snapshot([('สมชาย', 'ใจดี'), ('สมชาย', 'ใจดี'), ('มานี', 'มีนา')])
+    fnames = pd.Series(['สมชาย', 'มานี'], index=[0, 1])
+    lnames = pd.Series(['ใจดี', 'มีนา'], index=[0, 1])
+    matches = best_name_matches(name_candidates(fnames, lnames, snapshot), snapshot)
+
+    # คะแนนเท่ากัน: เลือกคนแรกใน snapshot และนับว่ามี 2 คน
+    assert matches.loc[0, 'pid_found'] == 1
+    assert matches[MATCH_COUNT_COLUMN].tolist() == [2, 1]
+    assert matches[NAME_SCORE_COLUMN].tolist() == [1.0, 1.0]
+
+
+def test_name_candidates_empty_when_no_block_matches():
+    snapshot = make_snapshot([('สมชาย', 'ใจดี')])
+    candidates = name_candidates(pd.Series(['มานะ']), pd.Series(['รักดี']), snapshot)
+    assert candidates.empty
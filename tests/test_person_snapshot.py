@@ -0,0 +1,73 @@
+"""
+การจับคู่กับ snapshot ในเครื่องต้องได้ผลเหมือนการค้นหาใน MySQL
+(ไม่แยกตัวพิมพ์ ไม่สนช่องว่างท้าย แปลงชนิดเมื่อคอลัมน์เป็นตัวเลข ค่าว่างเป็น '')
+"""
+
+import pandas as pd
+
+from linkage import FOUND_COLUMNS
+from person_snapshot import match_snapshot, merge_snapshot_changes
+
+
+def make_snapshot(rows):
+    return pd.DataFrame(rows, columns=['pid', 'cid', 'fname', 'lname', 'hn'])
+
+
+def test_integer_key_matches_zero_padded_keys():
+    snapshot = make_snapshot([[123, None, 'สมชาย', 'ใจดี', 'A1'], [456, None, 'สมหญิง', 'ใจงาม', 'A2']])
+    counts = {}
+    matched = match_snapshot(['00123', '123', '789'], snapshot, 'pid', counts)
+
+    assert sorted(matched.index) == ['00123', '123']
+    assert matched.loc['00123', 'fname_found'] == 'สมชาย'
+    assert counts == {'00123': 1, '123': 1}
+
+
+def test_text_key_ignores_case_and_trailing_space():
+    snapshot = make_snapshot([[1, '', 'สมชาย', 'ใจดี', 'AB12 '], [2, '', 'สมศรี', 'ใจเย็น', 'cd34']])
+    matched = match_snapshot(['ab12', 'CD34'], snapshot, 'hn')
+
+    assert matched.loc['ab12', 'pid_found'] == 1
+    assert matched.loc['CD34', 'pid_found'] == 2
+
+
+def test_exact_key_preferred_over_case_variant():
+    # ค้นหาทั้ง 'ABC' และ 'abc': ค่า 'ABC' เป็นของคีย์ 'ABC' เท่านั้น ค่า 'Abc' ตรงกับทั้งสองคีย์
+    snapshot = make_snapshot([[1, '', '', '', 'ABC'], [2, '', '', '', 'Abc']])
+    counts = {}
+    matched = match_snapshot(['ABC', 'abc'], snapshot, 'hn', counts)
+
+    assert matched.loc['ABC', 'pid_found'] == 1
+    assert matched.loc['abc', 'pid_found'] == 2
+    assert counts == {'ABC': 2, 'abc': 1}
+
+
+def test_text_key_column_is_not_coerced_to_number():
+    snapshot = make_snapshot([[1, '00123', '', '', '']])
+    assert match_snapshot(['123'], snapshot, 'cid').empty
+
+
+def test_missing_values_become_empty_strings():
+    snapshot = make_snapshot([[1, None, 'สมชาย', None, None]])
+    matched = match_snapshot(['1'], snapshot, 'pid')
+
+    assert list(matched.columns) == FOUND_COLUMNS
+    assert matched.loc['1'].tolist() == [1, '', 'สมชาย', '', '']
+
+
+def test_first_row_kept_for_duplicate_keys():
+    snapshot = make_snapshot([[1, '', 'แรก', '', 'H1'], [2, '', 'สอง', '', 'h1']])
+    counts = {}
+    matched = match_snapshot(['H1'], snapshot, 'hn', counts)
+
+    assert matched.loc['H1', 'fname_found'] == 'แรก'
+    assert counts == {'H1': 2}
+
+
+def test_merge_snapshot_changes_replaces_rows_by_pid():
+    snapshot = make_snapshot([[1, '', 'เดิม', '', ''], [2, '', 'คงเดิม', '', '']])
+    changes = make_snapshot([[1, '', 'ใหม่', '', ''], [3, '', 'เพิ่ม', '', '']])
+    merged = merge_snapshot_changes(snapshot, changes)
+
+    assert merged.set_index('pid')['fname'].sort_index().tolist() == ['ใหม่', 'คงเดิม', 'เพิ่ม']
+    assert merge_snapshot_changes(snapshot, changes.iloc[:0]) is snapshot
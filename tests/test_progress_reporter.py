@@ -0,0 +1,74 @@
+"""
+การรวมการแจ้ง progress จาก worker thread ให้ส่งไปยัง GUI ไม่เกินอัตราที่กำหนด
+"""
+
+import pytest
+
+import utils
+from utils import ProgressReporter, format_duration
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(utils.time, 'monotonic', fake)
+    return fake
+
+
+def make_reporter():
+    emitted = []
+    reporter = ProgressReporter(lambda *args: emitted.append(args), max_rate_hz=10, unit='คีย์')
+    return reporter, emitted
+
+
+def test_counted_reports_are_throttled(clock):
+    reporter, emitted = make_reporter()
+    reporter.report('ค้นหา', 0, 100)
+    for done in range(1, 10):
+        clock.now += 0.01
+        reporter.report('ค้นหา', done, 100)
+
+    assert [args[1] for args in emitted] == [0]
+    clock.now += 0.1
+    reporter.report('ค้นหา', 20, 100)
+    assert [args[1] for args in emitted] == [0, 20]
+
+
+def test_step_messages_and_completion_are_sent_immediately(clock):
+    reporter, emitted = make_reporter()
+    reporter.report('ค้นหา', 0, 100)
+    reporter.report('เริ่มขั้นถัดไป')
+    reporter.report('ค้นหา', 100, 100)
+
+    assert [args[0].split(' - ')[0] for args in emitted] == ['ค้นหา', 'เริ่มขั้นถัดไป', 'ค้นหา']
+    assert emitted[-1][1:] == (100, 100)
+
+
+def test_rate_and_remaining_time_are_appended(clock):
+    reporter, emitted = make_reporter()
+    reporter.report('ค้นหา', 0, 1000)
+    clock.now += 2.0
+    reporter.report('ค้นหา', 100, 1000)
+
+    assert emitted[-1][0] == f"ค้นหา - 50 คีย์/วินาที, เหลือประมาณ {format_duration(18)}"
+
+
+def test_flush_sends_pending_report(clock):
+    reporter, emitted = make_reporter()
+    reporter.report('ค้นหา', 0, 100)
+    clock.now += 0.01
+    reporter.report('ค้นหา', 5, 100)
+    assert len(emitted) == 1
+
+    reporter.flush()
+    assert emitted[-1][1] == 5
+    reporter.flush()
+    assert len(emitted) == 2
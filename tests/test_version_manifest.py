@@ -0,0 +1,99 @@
+"""
+การดึงข้อมูลเวอร์ชันโดยใช้ cache บนดิสก์ (conditional request, 304 และ cache เดิมเมื่อติดต่อ server ไม่ได้)
+"""
+
+import time
+
+import pytest
+
+requests = pytest.importorskip('requests')
+pytest.importorskip('psutil')
+pytest.importorskip('packaging')
+pytest.importorskip('PyQt5')
+
+import auto_updater  # noqa: E402
+from auto_updater import AutoUpdater, VersionManifestCache  # noqa: E402
+
+MANIFEST = [{'version': '1.0.0', 'version_code': 1}, {'version': '1.1.0', 'version_code': 2}]
+
+
+class FakeResponse:
+    def __init__(self, status_code, manifest=None, headers=None):
+        self.status_code = status_code
+        self.manifest = manifest
+        self.headers = headers or {}
+
+    def json(self):
+        return self.manifest
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}")
+
+
+@pytest.fixture
+def updater(tmp_path):
+    updater = AutoUpdater()
+    updater.manifest_cache = VersionManifestCache(str(tmp_path / 'version_manifest.json'))
+    return updater
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """แทน requests.get ด้วยคำตอบที่กำหนด และจำ headers ที่ส่งไป"""
+    calls = []
+    responses = []
+
+    def get(url, headers=None, timeout=None):
+        calls.append(headers or {})
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(auto_updater.requests, 'get', get)
+    return calls, responses
+
+
+def test_downloads_and_caches_manifest(updater, server):
+    calls, responses = server
+    responses.append(FakeResponse(200, MANIFEST, {'ETag': '"v2"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}))
+
+    assert updater.fetch_version_manifest() == MANIFEST
+    entry = updater.manifest_cache.load()
+    assert entry['etag'] == '"v2"'
+    # ตรวจสอบซ้ำภายใน min_check_hours ใช้ cache โดยไม่ติดต่อ server
+    assert updater.fetch_version_manifest() == MANIFEST
+    assert len(calls) == 1
+
+
+def test_not_modified_reuses_cache(updater, server):
+    calls, responses = server
+    updater.manifest_cache.save({'manifest': MANIFEST, 'etag': '"v2"', 'last_modified': None, 'checked_at': 0})
+    responses.append(FakeResponse(304))
+
+    assert updater.fetch_version_manifest() == MANIFEST
+    assert calls == [{'If-None-Match': '"v2"'}]
+    assert time.time() - updater.manifest_cache.load()['checked_at'] < 60
+
+
+def test_stale_cache_used_when_server_unreachable(updater, server):
+    _, responses = server
+    updater.manifest_cache.save({'manifest': MANIFEST, 'checked_at': 0})
+    responses.append(requests.exceptions.ConnectionError('offline'))
+
+    assert updater.fetch_version_manifest() == MANIFEST
+
+
+def test_errors_raised_without_stale_cache(updater, server):
+    _, responses = server
+    updater.manifest_cache.save({'manifest': MANIFEST, 'checked_at': 0})
+    responses.append(FakeResponse(500))
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        updater.fetch_version_manifest(max_age_hours=0, use_stale_cache=False)
+
+
+def test_latest_version_by_version_code(updater):
+    assert updater._latest_version_data(MANIFEST)['version'] == '1.1.0'
+    assert updater._latest_version_data([]) is None
@@ -7,7 +7,7 @@ Generated from excel_reader.ui file
 
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QFrame, QLabel,
-    QLineEdit, QPushButton, QComboBox, QTableView, QMenuBar, QMenu,
+    QLineEdit, QPushButton, QComboBox, QCheckBox, QTableView, QMenuBar, QMenu,
     QStatusBar, QAction, QSizePolicy, QSpacerItem
 )
 from PyQt5.QtCore import Qt, QSize
@@ -129,11 +129,39 @@ class ExchangeUnsenUI(QMainWindow):
         self.setup_combo_box_style()
         self.buttonLayout.addWidget(self.columnComboBox)
         
+        # Strategy combo box - วิธีการเชื่อมโยง (hidden by default)
+        self.strategyComboBox = QComboBox(self.buttonFrame)
+        self.setup_strategy_combo_box_style()
+        self.buttonLayout.addWidget(self.strategyComboBox)
+        
+        # Bypass cache check box (hidden by default)
+        self.bypassCacheCheckBox = QCheckBox("ไม่ใช้แคช", self.buttonFrame)
+        self.bypassCacheCheckBox.setFont(self.columnLabel.font())
+        self.bypassCacheCheckBox.setVisible(False)
+        self.buttonLayout.addWidget(self.bypassCacheCheckBox)
+        
+        # Fuzzy name matching check box (hidden by default)
+        self.fuzzyNameCheckBox = QCheckBox("จับคู่ชื่อ-สกุล", self.buttonFrame)
+        self.fuzzyNameCheckBox.setFont(self.columnLabel.font())
+        self.fuzzyNameCheckBox.setVisible(False)
+        self.buttonLayout.addWidget(self.fuzzyNameCheckBox)
+        
+        # Multi-source (HOSXP + JHCIS) check box (hidden by default)
+        self.multiSourceCheckBox = QCheckBox("ค้นหาทุกระบบ", self.buttonFrame)
+        self.multiSourceCheckBox.setFont(self.columnLabel.font())
+        self.multiSourceCheckBox.setVisible(False)
+        self.buttonLayout.addWidget(self.multiSourceCheckBox)
+        
         # Search population button (hidden by default)
         self.searchPopulationButton = QPushButton("เชื่อมโยงข้อมูล", self.buttonFrame)
         self.setup_search_button_style()
         self.buttonLayout.addWidget(self.searchPopulationButton)
         
+        # Cancel search button (แสดงเฉพาะระหว่างเชื่อมโยงข้อมูล)
+        self.cancelSearchButton = QPushButton("ยกเลิก", self.buttonFrame)
+        self.setup_cancel_search_button_style()
+        self.buttonLayout.addWidget(self.cancelSearchButton)
+        
         # Horizontal spacer
         spacer = QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum)
         self.buttonLayout.addItem(spacer)
@@ -186,6 +214,14 @@ class ExchangeUnsenUI(QMainWindow):
         """
         self.columnComboBox.setStyleSheet(combo_style)
         
+    def setup_strategy_combo_box_style(self):
+        """ตั้งค่า style สำหรับ combo box เลือกวิธีการเชื่อมโยง"""
+        self.strategyComboBox.setMinimumSize(QSize(170, 35))
+        self.strategyComboBox.setFont(self.columnComboBox.font())
+        self.strategyComboBox.setVisible(False)
+        # ใช้ style เดียวกับ combo box เลือกคอลัมน์
+        self.strategyComboBox.setStyleSheet(self.columnComboBox.styleSheet())
+        
     def setup_search_button_style(self):
         """ตั้งค่า style สำหรับ search button"""
         font = QFont()
@@ -216,6 +252,33 @@ class ExchangeUnsenUI(QMainWindow):
         """
         self.searchPopulationButton.setStyleSheet(search_style)
         
+    def setup_cancel_search_button_style(self):
+        """ตั้งค่า style สำหรับ cancel search button"""
+        self.cancelSearchButton.setFont(self.searchPopulationButton.font())
+        self.cancelSearchButton.setMinimumSize(QSize(100, 35))
+        self.cancelSearchButton.setVisible(False)
+        
+        cancel_style = """
+        QPushButton {
+            background-color: #757575;
+            color: white;
+            border: none;
+            border-radius: 5px;
+            padding: 8px 16px;
+        }
+        QPushButton:hover {
+            background-color: #616161;
+        }
+        QPushButton:pressed {
+            background-color: #424242;
+        }
+        QPushButton:disabled {
+            background-color: #CCCCCC;
+            color: #666666;
+        }
+        """
+        self.cancelSearchButton.setStyleSheet(cancel_style)
+        
     def setup_clear_button_style(self):
         """ตั้งค่า style สำหรับ clear button"""
         font = QFont()
@@ -341,6 +404,28 @@ class ExchangeUnsenUI(QMainWindow):
         
         self.statusLayout.addWidget(self.updateButton, 5)  # 5% ความกว้าง
         
+        # ปุ่มยกเลิกการเชื่อมต่อ MySQL (แสดงเฉพาะระหว่างกำลังเชื่อมต่อ)
+        self.cancelConnectButton = QPushButton("ยกเลิกการเชื่อมต่อ", self.centralwidget)
+        self.cancelConnectButton.setFont(font)
+        self.cancelConnectButton.setVisible(False)
+        
+        cancel_connect_style = """
+        QPushButton {
+            color: white;
+            background-color: #E53935;
+            border: 1px solid #C62828;
+            border-radius: 3px;
+            padding: 5px 10px;
+            font-weight: bold;
+        }
+        QPushButton:hover {
+            background-color: #C62828;
+        }
+        """
+        self.cancelConnectButton.setStyleSheet(cancel_connect_style)
+        
+        self.statusLayout.addWidget(self.cancelConnectButton, 5)
+        
         # เพิ่ม horizontal layout ลงใน main vertical layout
         self.verticalLayout.addLayout(self.statusLayout)
         
@@ -413,6 +498,7 @@ class ExchangeUnsenUI(QMainWindow):
         self.menuSettings.addAction(self.actionMySQLSettings)
         self.menuSettings.addAction(self.actionConnectMySQL)
         self.menuSettings.addAction(self.actionDisconnectMySQL)
+        self.menuSettings.addAction(self.actionCancelConnectMySQL)
         
         self.menuHelp.addAction(self.actionAbout)
         
@@ -442,5 +528,8 @@ class ExchangeUnsenUI(QMainWindow):
         self.actionDisconnectMySQL = QAction("ตัดการเชื่อมต่อ MySQL", self)
         self.actionDisconnectMySQL.setShortcut("F7")
         
+        self.actionCancelConnectMySQL = QAction("ยกเลิกการเชื่อมต่อ MySQL", self)
+        self.actionCancelConnectMySQL.setEnabled(False)  # ใช้ได้เฉพาะระหว่างกำลังเชื่อมต่อ
+        
         # Help actions
         self.actionAbout = QAction("เกี่ยวกับ", self)
@@ -4,30 +4,82 @@ Utility functions สำหรับ Excel Reader Application
 
 import os
 import sys
+import time
+import atexit
+import hashlib
+import queue
 import pandas as pd
-from typing import Optional, Tuple, List
+from typing import Callable, Optional, Tuple, List
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 
 
-def setup_logging():
-    """ตั้งค่า logging สำหรับแอปพลิเคชัน"""
+# ชื่อ logger หลักของแอปพลิเคชัน และ logger แยกตามขั้นตอนการทำงาน
+LOGGER_NAME = 'exchange_unsen'
+STAGE_LOAD = 'load'
+STAGE_LINK = 'link'
+STAGE_EXPORT = 'export'
+STAGE_UPDATE = 'update'  # ตรวจสอบและดาวน์โหลดอัปเดตโปรแกรม
+
+_log_listener = None  # QueueListener ที่เขียน log ใน background thread
+
+
+def setup_logging(level: int = logging.INFO):
+    """
+    ตั้งค่า logging สำหรับแอปพลิเคชัน
+    
+    ทุก logger ส่ง record เข้า queue (ไม่รอ I/O) แล้ว QueueListener เขียนลงไฟล์และ console
+    ใน background thread เรียกซ้ำได้โดยไม่เพิ่ม handler ซ้ำ
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return logging.getLogger(LOGGER_NAME)
+    
     log_dir = "logs"
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
     
     log_filename = os.path.join(log_dir, f"excel_reader_{datetime.now().strftime('%Y%m%d')}.log")
     
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_filename, encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(threadName)s - %(message)s')
+    handlers = [logging.FileHandler(log_filename, encoding='utf-8')]
+    if sys.stdout is not None:  # โปรแกรมแบบ windowed (PyInstaller) ไม่มี console
+        handlers.append(logging.StreamHandler(sys.stdout))
+    for handler in handlers:
+        handler.setFormatter(formatter)
     
-    return logging.getLogger(__name__)
+    log_queue = queue.Queue(-1)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(level)
+    root_logger.addHandler(QueueHandler(log_queue))
+    
+    _log_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(stop_logging)
+    
+    return logging.getLogger(LOGGER_NAME)
+
+
+def stop_logging():
+    """หยุด QueueListener และเขียน log ที่ค้างอยู่ให้หมด"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+
+def get_stage_logger(stage: str) -> logging.Logger:
+    """
+    ดึง logger ของขั้นตอนการทำงาน
+    
+    Args:
+        stage: STAGE_LOAD, STAGE_LINK, STAGE_EXPORT หรือ STAGE_UPDATE
+        
+    Returns:
+        logging.Logger: logger ชื่อ "exchange_unsen.<stage>"
+    """
+    return logging.getLogger(f"{LOGGER_NAME}.{stage}")
 
 
 def validate_excel_file(file_path: str) -> Tuple[bool, str]:
@@ -170,6 +222,24 @@ def get_excel_sheets(file_path: str) -> Tuple[Optional[List[str]], str]:
         return None, f"เกิดข้อผิดพลาด: {str(e)}"
 
 
+def file_sha1(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    คำนวณ SHA-1 ของไฟล์ (อ่านทีละ chunk ไม่โหลดทั้งไฟล์ในหน่วยความจำ)
+    
+    Args:
+        file_path: เส้นทางไฟล์
+        chunk_size: จำนวน bytes ต่อการอ่าน
+        
+    Returns:
+        str: ค่า hash แบบ hex
+    """
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
 def format_file_size(size_bytes: int) -> str:
     """
     แปลงขนาดไฟล์เป็นรูปแบบที่อ่านง่าย
@@ -250,3 +320,97 @@ def get_dataframe_info(df: pd.DataFrame) -> dict:
     }
     
     return info
+
+
+def format_duration(seconds: float) -> str:
+    """
+    แปลงจำนวนวินาทีเป็นข้อความที่อ่านง่าย
+    
+    Args:
+        seconds: จำนวนวินาที
+        
+    Returns:
+        str: ระยะเวลา เช่น "45 วินาที", "3 นาที 05 วินาที", "1 ชั่วโมง 20 นาที"
+    """
+    seconds = int(max(seconds, 0))
+    if seconds < 60:
+        return f"{seconds} วินาที"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes} นาที {seconds:02d} วินาที"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} ชั่วโมง {minutes:02d} นาที"
+
+
+class ProgressReporter:
+    """
+    รวมการแจ้ง progress จาก worker thread ให้ส่งไปยัง GUI ไม่เกิน max_rate_hz ครั้งต่อวินาที
+    
+    การแจ้งที่มีจำนวนทั้งหมด (total > 0) จะถูกรวมเหลือครั้งล่าสุดและต่อท้ายด้วยความเร็วและเวลาที่เหลือ
+    ส่วนข้อความบอกขั้นตอน (total = 0) และการแจ้งครั้งสุดท้าย (done >= total) จะส่งทันทีเสมอ
+    """
+    
+    def __init__(self, emit: Callable[[str, int, int], None], max_rate_hz: float = 10.0,
+                 unit: str = 'รายการ'):
+        """
+        Args:
+            emit: ฟังก์ชันส่งข้อความ(ข้อความ, ค่าปัจจุบัน, ค่าสูงสุด) เช่น pyqtSignal.emit
+            max_rate_hz: จำนวนครั้งสูงสุดที่ส่งต่อวินาที
+            unit: หน่วยที่ใช้แสดงความเร็ว
+        """
+        self._emit = emit
+        self._interval = 1.0 / max_rate_hz if max_rate_hz > 0 else 0.0
+        self.unit = unit
+        self._last_emit = 0.0
+        self._pending = None
+        self._total = 0
+        self._done = 0
+        self._started = 0.0
+        self._start_done = 0
+    
+    def report(self, message: str, done: int = 0, total: int = 0, force: bool = False):
+        """
+        แจ้ง progress (ใช้เป็น callback on_progress ได้โดยตรง)
+        
+        Args:
+            message: ข้อความสถานะ
+            done: จำนวนที่ทำเสร็จแล้ว
+            total: จำนวนทั้งหมด (0 = ข้อความบอกขั้นตอน ไม่มีการนับ)
+            force: ส่งทันทีโดยไม่รอรอบถัดไป
+        """
+        now = time.monotonic()
+        if total <= 0:
+            self._pending = None
+            self._emit(message, done, total)
+            self._last_emit = now
+            return
+        
+        if total != self._total or done < self._done:
+            # เริ่มขั้นตอนใหม่ เริ่มจับเวลาความเร็วใหม่
+            self._total = total
+            self._started = now
+            self._start_done = done
+        self._done = done
+        self._pending = (message, done, total)
+        
+        if force or done >= total or now - self._last_emit >= self._interval:
+            self._send(now)
+    
+    def flush(self):
+        """ส่งการแจ้งล่าสุดที่ยังค้างอยู่ (เรียกก่อนจบงาน)"""
+        if self._pending:
+            self._send(time.monotonic())
+    
+    def _send(self, now: float):
+        message, done, total = self._pending
+        self._pending = None
+        
+        elapsed = now - self._started
+        rate = (done - self._start_done) / elapsed if elapsed > 0 else 0
+        if rate > 0:
+            message += f" - {rate:,.0f} {self.unit}/วินาที"
+            if done < total:
+                message += f", เหลือประมาณ {format_duration((total - done) / rate)}"
+        
+        self._emit(message, done, total)
+        self._last_emit = now